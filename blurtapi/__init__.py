@@ -6,4 +6,20 @@ __all__ = [
     "rpcutils",
     "graphenerpc",
     "node",
+    "asyncrpc",
+    "wsmultiplexer",
+    "rpcbatch",
+    "hedging",
+    "codec",
+    "responsecache",
+    "singleflight",
+    "ratelimit",
+    "chaincache",
+    "telemetry",
+    "cassette",
+    "httppool",
+    "localnode",
+    "scheduler",
+    "batchsize",
+    "streamjson",
 ]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from .graphenerpc import GrapheneRPC
+from .noderpc import NodeRPC
+
+log = logging.getLogger(__name__)
+
+
+class AsyncGrapheneRPC(GrapheneRPC):
+    """ Asyncio front-end for :class:`blurtapi.graphenerpc.GrapheneRPC`
+
+        All rpc methods are mapped dynamically as in ``GrapheneRPC``, but each
+        call returns a coroutine. Calls are executed on a worker pool that
+        shares the HTTP connection pool of each node, so many requests can be
+        in flight at the same time while the ``Nodes`` failover and retry
+        handling stays the same as for the blocking class.
+
+        :param str urls: Either a single Websocket/Http URL, or a list of URLs
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+        :param int max_in_flight: Maximum number of concurrent requests; this is
+            also the size of the HTTP connection pool of each node (default is 16)
+
+        All other parameters are passed to ``GrapheneRPC``.
+
+        Usage:
+
+        .. code-block:: python
+
+            import asyncio
+            from blurtapi.asyncrpc import AsyncGrapheneRPC
+
+            async def main():
+                async with AsyncGrapheneRPC("https://rpc.beblurt.com") as rpc:
+                    blocks = await asyncio.gather(
+                        *[rpc.get_block({"block_num": n}, api="block") for n in range(1, 101)])
+
+            asyncio.run(main())
+
+        .. note:: The chain detection in the constructor is still done
+                  synchronously. Websocket connections carry only one
+                  request at a time, calls on them are serialized unless
+                  ``ws_multiplex=True`` is set.
+
+    """
+
+    def __init__(self, urls, user=None, password=None, **kwargs):
+        self.max_in_flight = kwargs.pop("max_in_flight", 16)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        kwargs.setdefault("pool_maxsize", self.max_in_flight)
+        super(AsyncGrapheneRPC, self).__init__(urls, user=user, password=password, **kwargs)
+
+    def close(self):
+        """Stops the worker pool and closes all connections"""
+        self._executor.shutdown(wait=True)
+        self.rpcclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    def __getattr__(self, name):
+        """Map all methods to RPC coroutines and pass through the arguments."""
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            if kwargs.get("add_to_queue", False):
+                raise ValueError("add_to_queue is not supported by %s" % self.__class__.__name__)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(self.rpccall, name, *args, **kwargs))
+        return method
+
+
+class AsyncNodeRPC(AsyncGrapheneRPC, NodeRPC):
+    """ Asyncio version of :class:`blurtapi.noderpc.NodeRPC`
+
+        Same as ``AsyncGrapheneRPC``, but with the Blurt specific error
+        handling of ``NodeRPC``.
+
+        .. code-block:: python
+
+            from blurtapi.asyncrpc import AsyncNodeRPC
+            rpc = AsyncNodeRPC(["https://rpc.beblurt.com", "https://blurt-rpc.saboin.com"])
+            props = await rpc.get_dynamic_global_properties(api="database")
+
+    """
+    pass
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+#: Upper bounds of the batch sizes for which the throughput is reported
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class NodeBatchSize(object):
+    """Batch size and throughput counters of one node"""
+    def __init__(self, size):
+        self.size = size
+        self.slow_start = True
+        self.batches = 0
+        self.items = 0
+        self.seconds = 0
+        self.errors = 0
+        self.decreases = 0
+        # items and seconds per batch size bucket
+        self.buckets = {}
+
+    def snapshot(self):
+        sizes = {}
+        best_size = None
+        best_throughput = 0
+        for bound in sorted(self.buckets, key=lambda b: float(b)):
+            items, seconds, batches = self.buckets[bound]
+            throughput = items / seconds if seconds > 0 else 0
+            sizes[bound] = {"batches": batches, "items": items, "throughput": throughput}
+            if throughput > best_throughput:
+                best_size, best_throughput = bound, throughput
+        return {"size": int(self.size), "batches": self.batches, "items": self.items,
+                "errors": self.errors, "decreases": self.decreases,
+                "throughput": self.items / self.seconds if self.seconds > 0 else 0,
+                "best_size": best_size, "sizes": sizes}
+
+
+class AdaptiveBatchSize(object):
+    """ Tunes the batch size of a backfill per node (additive increase,
+        multiplicative decrease)
+
+        The size starts at ``initial`` and is doubled after each good batch
+        until the first problem (slow start), afterwards it grows by ``increase``.
+        It is multiplied by ``decrease`` when a batch
+
+        * failed or its reply was truncated (fewer results than requested),
+        * took longer than ``target_latency`` seconds or
+        * had a reply larger than ``max_reply_bytes``.
+
+        ``stats()`` returns the current size, the achieved throughput (items
+        per second) and the throughput per batch size bucket of each node, and
+        ``best_size`` is the bucket with the highest throughput, which can be
+        used as fixed default.
+
+        .. code-block:: python
+
+            from blurtapi.batchsize import AdaptiveBatchSize
+            from blurtpy.blockchain import Blockchain
+
+            controller = AdaptiveBatchSize(max_size=500)
+            for block in Blockchain().blocks(start=1, stop=100000, max_batch_size=500, adaptive_batch=controller):
+                pass
+            print(controller.stats())
+
+        :param int initial: first batch size of a node (default is 10)
+        :param int min_size: smallest batch size (default is 1)
+        :param int max_size: largest batch size (default is 1000)
+        :param float target_latency: batches which take longer are too large (default is 2 s)
+        :param int max_reply_bytes: replies which are larger are too large (default is 8 MiB)
+        :param int increase: additive increase per good batch (default is 10)
+        :param float decrease: factor for a bad batch (default is 0.5)
+
+    """
+    def __init__(self, initial=10, min_size=1, max_size=1000, target_latency=2.,
+                 max_reply_bytes=8 * 1024 * 1024, increase=10, decrease=0.5):
+        if min_size < 1 or max_size < min_size:
+            raise ValueError("min_size must be at least 1 and not larger than max_size")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        self.initial = min(max(initial, min_size), max_size)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.max_reply_bytes = max_reply_bytes
+        self.increase = increase
+        self.decrease = decrease
+        self.lock = threading.Lock()
+        self.nodes = {}
+
+    def _node(self, url):
+        node = self.nodes.get(url)
+        if node is None:
+            node = NodeBatchSize(self.initial)
+            self.nodes[url] = node
+        return node
+
+    def get(self, url, limit=None):
+        """ Returns the batch size for the next batch to ``url``
+
+            :param int limit: largest batch size of the caller, the size of the node is
+                reduced to it (default is None)
+        """
+        with self.lock:
+            node = self._node(url)
+            if limit is not None and node.size > limit:
+                node.size = max(self.min_size, limit)
+            return int(node.size)
+
+    def record(self, url, size, latency, error=False, truncated=False, reply_bytes=0):
+        """ Updates the batch size of ``url`` after a batch
+
+            :param str url: node which answered the batch
+            :param int size: number of requested items
+            :param float latency: duration of the batch in seconds
+            :param bool error: True when the batch failed
+            :param bool truncated: True when results are missing in the reply
+            :param int reply_bytes: size of the reply, 0 when unknown
+        """
+        with self.lock:
+            node = self._node(url)
+            node.batches += 1
+            if error:
+                node.errors += 1
+            else:
+                node.items += size
+                node.seconds += latency
+                bound = SIZE_BUCKETS[bisect.bisect_left(SIZE_BUCKETS, size)] \
+                    if size <= SIZE_BUCKETS[-1] else "+Inf"
+                items, seconds, batches = node.buckets.get(bound, (0, 0, 0))
+                node.buckets[bound] = (items + size, seconds + latency, batches + 1)
+            too_large = error or truncated or latency > self.target_latency or \
+                (self.max_reply_bytes is not None and reply_bytes > self.max_reply_bytes)
+            if too_large:
+                node.slow_start = False
+                node.decreases += 1
+                node.size = max(self.min_size, min(node.size, size) * self.decrease)
+                log.debug("Batch size of %s decreased to %d" % (url, node.size))
+            elif size >= int(node.size):
+                # only a batch of the full size shows that the size can grow
+                if node.slow_start:
+                    node.size = min(self.max_size, node.size * 2)
+                else:
+                    node.size = min(self.max_size, node.size + self.increase)
+
+    def stats(self):
+        """Returns the batch size and throughput counters of each node"""
+        with self.lock:
+            return dict((url, node.snapshot()) for url, node in self.nodes.items())
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+from .codec import get_codec
+from .exceptions import CassetteMiss
+from .rpcutils import get_call_key
+
+log = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette(object):
+    """ Records JSON-RPC request/reply pairs and replays them without network
+
+        In ``record`` mode every successful request is appended to the
+        cassette file as one JSON line. Requests are stored without their id,
+        batches are stored request by request, so a replay can serve the same
+        calls in other batch compositions. Files ending with ``.gz`` are
+        gzip compressed.
+
+        In ``replay`` mode the rpc does not open any connection, all requests
+        are answered from the cassette. When the same request was recorded
+        several times (e.g. ``get_dynamic_global_properties`` while
+        streaming), the replies are served in the recorded order and the last
+        one is repeated afterwards. Requests which are not in the cassette
+        raise :class:`blurtapi.exceptions.CassetteMiss`.
+
+        :param str path: cassette file
+        :param str mode: ``record`` or ``replay`` (default is ``replay``)
+        :param float/str latency: simulated latency per request in seconds for
+            replays, or ``recorded`` to replay the recorded latencies (default is None)
+
+        .. code-block:: python
+
+            from blurt import Blurt
+            from blurtapi.cassette import Cassette
+            from blurtpy.account import Account
+            blurt = Blurt(node="https://rpc.beblurt.com", cassette=Cassette("history.jsonl.gz", mode="record"))
+            list(Account("blurtpy", blockchain_instance=blurt).history(only_ops=["transfer"]))
+
+            blurt = Blurt(node="https://rpc.beblurt.com", cassette=Cassette("history.jsonl.gz", latency=0.05))
+            list(Account("blurtpy", blockchain_instance=blurt).history(only_ops=["transfer"]))
+
+    """
+    def __init__(self, path, mode="replay", latency=None):
+        if mode not in ["record", "replay"]:
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.codec = get_codec()
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.positions = {}
+        self.recorded_cnt = 0
+        self.replayed_cnt = 0
+        self._file = None
+        if mode == "replay":
+            self.load()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def __len__(self):
+        return sum(len(replies) for replies in self.entries.values())
+
+    def load(self):
+        """Reads all entries of the cassette file"""
+        if not os.path.isfile(self.path):
+            raise IOError("Cassette %s does not exist" % self.path)
+        with _open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = self.codec.loads(line)
+                if "version" in entry:
+                    if entry["version"] > CASSETTE_VERSION:
+                        raise ValueError("Cassette version %d is not supported" % entry["version"])
+                    continue
+                self.entries.setdefault(entry["key"], []).append(entry)
+
+    def _write(self, entries):
+        with self.lock:
+            if self._file is None:
+                is_new = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+                self._file = _open(self.path, "a")
+                if is_new:
+                    self._file.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+            for entry in entries:
+                self._file.write(self.codec.dumps(entry).decode("utf8") + "\n")
+            self._file.flush()
+            self.recorded_cnt += len(entries)
+
+    def record(self, payload, reply, latency=0.):
+        """ Stores the decoded ``reply`` of ``payload``
+
+            :param dict/list payload: JSON-RPC request or batch
+            :param dict/list reply: decoded reply
+            :param float latency: seconds the node needed for the reply
+        """
+        if isinstance(payload, list):
+            if not isinstance(reply, list):
+                return
+            replies = {}
+            for r in reply:
+                if isinstance(r, dict):
+                    replies[r.get("id")] = r
+            entries = []
+            for request in payload:
+                r = replies.get(request.get("id"))
+                if r is not None:
+                    entries.append(self._entry(request, r, latency / len(payload)))
+        else:
+            entries = [self._entry(payload, reply, latency)]
+        self._write(entries)
+
+    def _entry(self, request, reply, latency):
+        if isinstance(reply, dict):
+            reply = dict((k, v) for k, v in reply.items() if k != "id")
+        return {"key": get_call_key(request), "reply": reply, "latency": round(latency, 4)}
+
+    def _next_entry(self, request):
+        key = get_call_key(request)
+        with self.lock:
+            replies = self.entries.get(key)
+            if not replies:
+                raise CassetteMiss("Request is not in cassette %s: %s" % (self.path, key))
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            self.replayed_cnt += 1
+            return replies[min(position, len(replies) - 1)]
+
+    def _reply(self, request, entry):
+        reply = entry["reply"]
+        if isinstance(reply, dict):
+            reply = dict(reply)
+            reply["id"] = request.get("id")
+        return self.codec.loads(self.codec.dumps(reply))
+
+    def replay(self, payload):
+        """ Returns the decoded reply of ``payload`` from the cassette, after
+            the simulated latency
+        """
+        if isinstance(payload, list):
+            entries = [self._next_entry(request) for request in payload]
+            ret = [self._reply(request, entry) for request, entry in zip(payload, entries)]
+            recorded_latency = sum(entry.get("latency", 0.) for entry in entries)
+        else:
+            entry = self._next_entry(payload)
+            ret = self._reply(payload, entry)
+            recorded_latency = entry.get("latency", 0.)
+        if self.latency == "recorded":
+            time.sleep(recorded_latency)
+        elif self.latency:
+            time.sleep(self.latency)
+        return ret
+
+    def rewind(self):
+        """Starts the replay again from the first recorded reply"""
+        with self.lock:
+            self.positions = {}
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class ChainCache(object):
+    """ Stores the chain detection result (``get_config`` reply and rpc
+        protocol) of each node url
+
+        A connect to a node which is in the cache skips the ``get_config``
+        round trip. Entries expire after ``ttl`` seconds. When ``path`` is
+        set, the entries are also stored in this JSON file and are used by
+        the next process, too.
+
+        :param str path: JSON file for the entries (default is None, memory only)
+        :param float ttl: seconds after which an entry is detected again (default is 86400)
+        :param float revalidate_after: age in seconds after which an entry is checked
+            again in the background on connect (default is 300)
+
+        .. code-block:: python
+
+            >>> cache = ChainCache()
+            >>> cache.set("https://rpc.example", {"BLURT_CHAIN_ID": "cd8d"}, "appbase")
+            >>> cache.get("https://rpc.example")["rpc_method"]
+            'appbase'
+
+    """
+    def __init__(self, path=None, ttl=86400, revalidate_after=300):
+        self.path = path
+        self.ttl = ttl
+        self.revalidate_after = revalidate_after
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.revalidating = set()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+
+    def load(self):
+        """Reads the entries from the JSON file"""
+        if self.path is None or not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (IOError, ValueError) as e:
+            log.warning("Could not read chain cache %s: %s" % (self.path, str(e)))
+            return
+        with self.lock:
+            for url, entry in entries.items():
+                if url not in self.entries or self.entries[url]["time"] < entry["time"]:
+                    self.entries[url] = entry
+
+    def save(self):
+        """Writes all entries to the JSON file"""
+        if self.path is None:
+            return
+        with self.lock:
+            data = json.dumps(self.entries)
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            log.warning("Could not write chain cache %s: %s" % (self.path, str(e)))
+
+    def get(self, url):
+        """Returns a copy of the entry of ``url``, or None when it is unknown or expired"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None or time.time() - entry["time"] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry)
+
+    def set(self, url, props, rpc_method):
+        """ Stores the detection result of ``url``
+
+            :param str url: node url
+            :param dict props: ``get_config`` reply of the node
+            :param str rpc_method: detected protocol, ``appbase``, ``wsappbase`` or ``ws``
+        """
+        with self.lock:
+            self.entries[url] = {"props": props, "rpc_method": rpc_method, "time": time.time()}
+        self.save()
+
+    def invalidate(self, url):
+        """Removes the entry of ``url``"""
+        with self.lock:
+            removed = self.entries.pop(url, None) is not None
+        if removed:
+            self.save()
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+        self.save()
+
+    def needs_revalidation(self, url):
+        """ Returns True once per ``revalidate_after`` interval for a cached url,
+            the caller is expected to check the entry and call
+            :meth:`revalidation_done` afterwards
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None or url in self.revalidating:
+                return False
+            if time.time() - entry.get("checked", entry["time"]) < self.revalidate_after:
+                return False
+            self.revalidating.add(url)
+            return True
+
+    def revalidation_done(self, url, props=None):
+        """ Ends a revalidation. When ``props`` changed, the entry is updated,
+            when the chain id changed, it is removed.
+        """
+        changed = False
+        with self.lock:
+            self.revalidating.discard(url)
+            entry = self.entries.get(url)
+            if entry is None or props is None:
+                return
+            entry["checked"] = time.time()
+            if get_chain_id(props) != get_chain_id(entry["props"]):
+                log.warning("Node %s changed its chain, it is detected again on the next connect" % url)
+                del self.entries[url]
+                changed = True
+            elif props != entry["props"]:
+                entry["props"] = props
+                entry["time"] = time.time()
+                changed = True
+        if changed:
+            self.save()
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+def get_chain_id(props):
+    """Returns the chain id of a ``get_config`` reply"""
+    for key in props:
+        if key[-8:] == "CHAIN_ID":
+            return props[key]
+    return None
+
+
+class ChainCacheInstance(object):
+    """Singelton for the process wide ChainCache instances, one per file"""
+    instances = {}
+    lock = threading.Lock()
+
+
+def shared_chain_cache_instance(path=None):
+    """Returns the process wide chain cache which belongs to ``path`` (None for memory only)"""
+    with ChainCacheInstance.lock:
+        if path not in ChainCacheInstance.instances:
+            ChainCacheInstance.instances[path] = ChainCache(path=path)
+        return ChainCacheInstance.instances[path]
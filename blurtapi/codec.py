@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+JSON_MODULES = {}
+try:
+    import orjson
+    JSON_MODULES["orjson"] = orjson
+except ImportError:
+    pass
+try:
+    import ujson
+    JSON_MODULES["ujson"] = ujson
+except ImportError:
+    pass
+try:
+    import simdjson
+    JSON_MODULES["simdjson"] = simdjson
+except ImportError:
+    pass
+
+log = logging.getLogger(__name__)
+
+
+class JSONCodec(object):
+    """ Encodes JSON-RPC requests and decodes replies with the stdlib ``json`` module
+
+        Requests are encoded to UTF-8 ``bytes``, replies can be given as
+        ``bytes`` or ``str``, so HTTP replies are decoded directly from
+        ``response.content`` without building the text first.
+
+        .. code-block:: python
+
+            >>> codec = JSONCodec()
+            >>> codec.dumps({"id": 1, "method": "call"})
+            b'{"id": 1, "method": "call"}'
+            >>> codec.loads(b'{"id": 1, "result": "\\xc3\\xa9"}')
+            {'id': 1, 'result': 'é'}
+
+    """
+    name = "json"
+
+    def dumps(self, obj):
+        """Returns ``obj`` as UTF-8 encoded JSON"""
+        return json.dumps(obj, ensure_ascii=False).encode('utf8')
+
+    def loads(self, data):
+        """ Decodes a JSON reply
+
+            Control characters inside strings are accepted, as some nodes
+            send them unescaped.
+
+            :raises ValueError: if ``data`` is not valid JSON
+        """
+        return json.loads(data, strict=False)
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec based on ``orjson``"""
+    name = "orjson"
+
+    def dumps(self, obj):
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers with more than 64 bit
+            return JSONCodec.dumps(self, obj)
+
+    def loads(self, data):
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # orjson rejects unescaped control characters
+            return JSONCodec.loads(self, data)
+
+
+class UjsonCodec(JSONCodec):
+    """JSON codec based on ``ujson``"""
+    name = "ujson"
+
+    def dumps(self, obj):
+        try:
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf8')
+        except (TypeError, OverflowError):
+            return JSONCodec.dumps(self, obj)
+
+    def loads(self, data):
+        try:
+            return ujson.loads(data)
+        except ValueError:
+            return JSONCodec.loads(self, data)
+
+
+class SimdjsonCodec(JSONCodec):
+    """JSON codec based on ``pysimdjson``, requests are encoded with ``json``"""
+    name = "simdjson"
+
+    def loads(self, data):
+        try:
+            return simdjson.loads(data)
+        except ValueError:
+            return JSONCodec.loads(self, data)
+
+
+CODECS = {
+    "orjson": OrjsonCodec,
+    "ujson": UjsonCodec,
+    "simdjson": SimdjsonCodec,
+    "json": JSONCodec,
+}
+
+
+def available_codecs():
+    """Returns the names of all installed codecs, fastest first"""
+    return [name for name in CODECS if name == "json" or name in JSON_MODULES]
+
+
+def get_codec(codec=None):
+    """ Returns a JSON codec
+
+        :param str/JSONCodec codec: codec name (``orjson``, ``ujson``,
+            ``simdjson`` or ``json``) or codec instance. When None, the
+            fastest installed codec is used.
+
+        .. code-block:: python
+
+            >>> get_codec("json").name
+            'json'
+
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None:
+        codec = available_codecs()[0]
+    if codec not in CODECS:
+        raise ValueError("Unknown JSON codec %s, use one of %s" % (codec, ", ".join(CODECS)))
+    if codec not in available_codecs():
+        raise ImportError("JSON codec %s is not installed" % codec)
+    return CODECS[codec]()
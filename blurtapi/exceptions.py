@@ -42,6 +42,12 @@ class RPCError(Exception):
     pass
 
 
+class BatchedCallsNotSupported(RPCError):
+    """The node answered a batch request with a single error instead of a list"""
+
+    pass
+
+
 class RPCErrorDoRetry(Exception):
     """RPCErrorDoRetry Exception."""
 
@@ -60,6 +66,12 @@ class CallRetriesReached(Exception):
     pass
 
 
+class CassetteMiss(Exception):
+    """A replayed request is not in the cassette"""
+
+    pass
+
+
 class MissingRequiredActiveAuthority(RPCError):
     pass
 
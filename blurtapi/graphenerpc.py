@@ -2,7 +2,6 @@
 from itertools import cycle
 import threading
 import sys
-import json
 import signal
 import logging
 import ssl
@@ -10,14 +9,29 @@ import re
 import time
 import warnings
 import six
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait, FIRST_COMPLETED
 from .exceptions import (
-    UnauthorizedError, RPCConnection, RPCError, RPCErrorDoRetry, NumRetriesReached, CallRetriesReached, WorkingNodeMissing, TimeoutException
+    UnauthorizedError, RPCConnection, RPCError, RPCErrorDoRetry, NumRetriesReached, CallRetriesReached, WorkingNodeMissing, TimeoutException,
+    CassetteMiss, BatchedCallsNotSupported
 )
 from .rpcutils import (
     is_network_appbase_ready,
-    get_api_name, get_query
+    get_api_name, get_query, get_call_key
 )
 from .node import Nodes
+from .wsmultiplexer import WebsocketMultiplexer
+from .rpcbatch import RPCBatch, get_error_message
+from .hedging import HedgePolicy, get_method_name, is_broadcast
+from .singleflight import SingleFlight
+from .ratelimit import parse_retry_after
+from .chaincache import ChainCache, shared_chain_cache_instance, get_chain_id
+from .telemetry import Telemetry
+from .scheduler import PriorityScheduler, PRIORITIES
+from .httppool import shared_node_session, get_pool_stats
+from .codec import get_codec
+from .responsecache import ResponseCache
+from .streamjson import CHUNK_SIZE, Projection, get_path, iter_json_array
 from blurtgraphenebase.version import version as blurtpy_version
 from blurtgraphenebase.chains import known_chains
 from _thread import interrupt_main
@@ -42,6 +56,22 @@ if not REQUEST_MODULE:
 
 log = logging.getLogger(__name__)
 
+HTTP_SERVER_ERRORS = {
+    429: (RPCErrorDoRetry, "Too Many Requests"),
+    500: (RPCErrorDoRetry, "Internal Server Error"),
+    501: (RPCError, "Not Implemented"),
+    502: (RPCErrorDoRetry, "Bad Gateway"),
+    503: (RPCErrorDoRetry, "Service Temporarily Unavailable"),
+    504: (RPCErrorDoRetry, "Gateway Time-out"),
+    505: (RPCError, "HTTP Version not supported"),
+    506: (RPCError, "Variant Also Negotiates"),
+    507: (RPCError, "Insufficient Storage"),
+    508: (RPCError, "Loop Detected"),
+    509: (RPCError, "Bandwidth Limit Exceeded"),
+    510: (RPCError, "Not Extended"),
+    511: (RPCError, "Network Authentication Required"),
+}
+
 
 class SessionInstance(object):
     """Singelton for the Session Instance"""
@@ -91,6 +121,54 @@ class GrapheneRPC(object):
         0.19.4 or higher. The settings has no effect on nodes with version of 0.19.3 or lower.
     :param bool use_tor: When set to true, 'socks5h://localhost:9050' is set as proxy
     :param dict custom_chains: custom chain which should be added to the known chains
+    :param bool ws_multiplex: When set to true, calls on ws/wss nodes are pipelined over one
+        socket by a background reader which matches replies by their id (default is False)
+    :param str node_selection: ``adaptive`` routes calls to the node with the best latency
+        and error rate and opens a circuit breaker on failing nodes, ``round_robin`` rotates
+        through the nodes on errors only (default is ``round_robin``). See :class:`blurtapi.node.Nodes`.
+    :param float rate_limit: Maximum requests per second per node. Without a limit, a node is only
+        slowed down after it answered with HTTP 429 (``Retry-After`` is honored). See
+        :class:`blurtapi.ratelimit.TokenBucket` (default is None)
+    :param bool/HedgePolicy hedge: When set, read calls on https nodes which take longer than the
+        95th latency percentile of their method are sent again to a second node and the first
+        reply wins. A :class:`blurtapi.hedging.HedgePolicy` can be given to tune this (default is False)
+    :param str json_codec: JSON codec for requests and replies, ``orjson``, ``ujson``, ``simdjson``
+        or ``json``. When not set, the fastest installed codec is used. See :mod:`blurtapi.codec`.
+    :param bool/str/ResponseCache response_cache: Caches results of calls on irreversible blocks. When
+        a file name is given, results are also stored in this SQLite file. See
+        :class:`blurtapi.responsecache.ResponseCache` (default is False)
+    :param bool/str/ChainCache chain_cache: Remembers the chain detection (``get_config`` reply and
+        protocol) of each node process wide, so that connects and failovers to a known node skip the
+        ``get_config`` round trip. Only the detection on connect uses it, ``get_config`` calls are
+        always sent to the node. The entry is checked again in the background. When a file name is
+        given, the entries are also stored in this JSON file. See :class:`blurtapi.chaincache.ChainCache`
+        (default is False)
+    :param bool/Telemetry telemetry: Records latency histograms, byte counts, errors, retries,
+        failovers and batch sizes per method and node, see :class:`blurtapi.telemetry.Telemetry`.
+        An instance can be shared between several rpc instances (default is False)
+    :param bool/PriorityScheduler scheduler: Sends requests by priority class (``interactive``,
+        ``normal`` or ``bulk``), each class with its own concurrency limit, so that interactive
+        calls do not queue behind background backfills. The priority is set with
+        ``priority="bulk"`` per call or with ``rpc.priority("bulk")`` for a block of code.
+        See :class:`blurtapi.scheduler.PriorityScheduler`. An instance can be shared between
+        several rpc instances (default is False)
+    :param int pool_connections: Number of hosts for which the session of a node keeps connections (default is 2)
+    :param int pool_maxsize: Number of kept-alive http connections per node, should be at least the
+        number of threads which use the instance at the same time (default is 10)
+    :param bool pool_block: When True, threads wait for a free connection of the node instead of
+        opening a new one which is closed afterwards (default is False)
+    :param int race_connect: Number of nodes which are asked for ``get_config`` at the same
+        time on startup. The node which answers first is used, the other nodes which answer
+        are kept as standby with their detected chain and a warm connection, so a failover
+        to them does not wait for a new detection. Not used with ``use_tor``. (default is 0,
+        the nodes are tried one after another)
+    :param Cassette cassette: Records all requests and replies to a cassette file, or replays them
+        from it without network access, see :class:`blurtapi.cassette.Cassette`. The chain cache
+        is not used with a cassette, so that the chain detection is recorded (default is None)
+    :param bool coalesce_calls: When an identical read call is already in flight from another
+        thread, wait for its result instead of sending the request again. Counters are
+        available with ``rpc.single_flight.stats()``. The callers get copies of the shared
+        result (default is False)
 
     Available APIs:
 
@@ -117,15 +195,79 @@ class GrapheneRPC(object):
 
     def __init__(self, urls, user=None, password=None, **kwargs):
         """Init."""
+        self._local = threading.local()
+        self._kwargs = kwargs
         self.rpc_methods = {'offline': -1, 'ws': 0, 'jsonrpc': 1, 'wsappbase': 2, 'appbase': 3}
         self.current_rpc = self.rpc_methods["ws"]
         self._request_id = 0
+        self._request_id_lock = threading.Lock()
         self.timeout = kwargs.get('timeout', 60)
         num_retries = kwargs.get("num_retries", 100)
         num_retries_call = kwargs.get("num_retries_call", 5)
         self.use_condenser = kwargs.get("use_condenser", False)
         self.use_tor = kwargs.get("use_tor", False)
         self.disable_chain_detection = kwargs.get("disable_chain_detection", False)
+        self.ws_multiplex = kwargs.get("ws_multiplex", False)
+        self.ws_multiplexer = None
+        hedge = kwargs.get("hedge", False)
+        if isinstance(hedge, HedgePolicy):
+            self.hedge_policy = hedge
+        elif hedge:
+            self.hedge_policy = HedgePolicy()
+        else:
+            self.hedge_policy = None
+        self._hedge_executor = None
+        self.codec = get_codec(kwargs.get("json_codec", None))
+        response_cache = kwargs.get("response_cache", False)
+        if isinstance(response_cache, ResponseCache):
+            self.response_cache = response_cache
+        elif isinstance(response_cache, six.string_types):
+            self.response_cache = ResponseCache(path=response_cache)
+        elif response_cache:
+            self.response_cache = ResponseCache()
+        else:
+            self.response_cache = None
+        chain_cache = kwargs.get("chain_cache", False)
+        if isinstance(chain_cache, ChainCache):
+            self.chain_cache = chain_cache
+        elif isinstance(chain_cache, six.string_types):
+            self.chain_cache = shared_chain_cache_instance(chain_cache)
+        elif chain_cache:
+            self.chain_cache = shared_chain_cache_instance()
+        else:
+            self.chain_cache = None
+        telemetry = kwargs.get("telemetry", False)
+        if isinstance(telemetry, Telemetry):
+            self.telemetry = telemetry
+        elif telemetry:
+            self.telemetry = Telemetry()
+        else:
+            self.telemetry = None
+        scheduler = kwargs.get("scheduler", False)
+        if isinstance(scheduler, PriorityScheduler):
+            self.scheduler = scheduler
+        elif scheduler:
+            self.scheduler = PriorityScheduler()
+        else:
+            self.scheduler = None
+        self.cassette = kwargs.get("cassette", None)
+        if self.cassette is not None:
+            # the chain detection must reach the cassette
+            self.chain_cache = None
+        self.race_connect = kwargs.get("race_connect", 0)
+        self.standby = {}
+        self._standby_lock = threading.Lock()
+        # chain detections of this instance, handed to clones when no chain cache is set
+        self._detections = {}
+        self._connect_lock = threading.RLock()
+        self._ws_lock = threading.Lock()
+        self.pool_kwargs = {"pool_connections": kwargs.get("pool_connections", 2),
+                            "pool_maxsize": kwargs.get("pool_maxsize", 10),
+                            "pool_block": kwargs.get("pool_block", False)}
+        if kwargs.get("coalesce_calls", False):
+            self.single_flight = SingleFlight()
+        else:
+            self.single_flight = None
         self.known_chains = known_chains
         custom_chain = kwargs.get("custom_chains", {})
         if len(custom_chain) > 0:
@@ -133,7 +275,12 @@ class GrapheneRPC(object):
                 if c not in self.known_chains:
                     self.known_chains[c] = custom_chain[c]
 
-        self.nodes = Nodes(urls, num_retries, num_retries_call)
+        node_kwargs = {}
+        for key in ["node_selection", "switch_ratio", "ewma_alpha", "failure_threshold", "backoff_base", "backoff_max",
+                    "rate_limit", "rate_burst"]:
+            if key in kwargs:
+                node_kwargs[key] = kwargs[key]
+        self.nodes = Nodes(urls, num_retries, num_retries_call, **node_kwargs)
         if self.nodes.working_nodes_count == 0:
             self.current_rpc = self.rpc_methods["offline"]
 
@@ -141,6 +288,8 @@ class GrapheneRPC(object):
         self.password = password
         self.ws = None
         self.url = None
+        # chain id of the current node, None when the chain is not detected
+        self.chain_id = None
         self.session = None
         self.rpc_queue = []
         if kwargs.get("autoconnect", True):
@@ -150,6 +299,42 @@ class GrapheneRPC(object):
     def num_retries(self):
         return self.nodes.num_retries
 
+    @property
+    def rpc_queue(self):
+        """Calls queued with ``add_to_queue=True`` by the current thread"""
+        if not hasattr(self._local, "rpc_queue"):
+            self._local.rpc_queue = []
+        return self._local.rpc_queue
+
+    @rpc_queue.setter
+    def rpc_queue(self, rpc_queue):
+        self._local.rpc_queue = rpc_queue
+
+    @property
+    def last_reply_size(self):
+        """Size in bytes of the last reply received by the current thread, 0 when unknown"""
+        return getattr(self._local, "reply_size", 0)
+
+    def get_priority(self):
+        """Returns the priority class of the calls of the current thread"""
+        return getattr(self._local, "priority", "normal")
+
+    @contextmanager
+    def priority(self, priority):
+        """ Sets the priority class of all calls of the current thread
+            inside the ``with`` block, see :class:`blurtapi.scheduler.PriorityScheduler`
+
+            :param str priority: ``interactive``, ``normal`` or ``bulk``
+        """
+        if priority not in PRIORITIES:
+            raise ValueError("Unknown priority %s" % str(priority))
+        stored_priority = self.get_priority()
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = stored_priority
+
     @property
     def num_retries_call(self):
         return self.nodes.num_retries_call
@@ -164,8 +349,9 @@ class GrapheneRPC(object):
 
     def get_request_id(self):
         """Get request id."""
-        self._request_id += 1
-        return self._request_id
+        with self._request_id_lock:
+            self._request_id += 1
+            return self._request_id
 
     def next(self):
         """Switches to the next node url"""
@@ -176,6 +362,36 @@ class GrapheneRPC(object):
                 log.warning(str(e))
         self.rpcconnect()
 
+    def clone(self):
+        """ Returns a new rpc instance for the working nodes of this instance, starting
+            with the current node, e.g. for the use in another thread
+
+            The chain cache, response cache, telemetry, scheduler and the http connection
+            pools of the nodes are shared. The node state, the current node, the retry
+            counters and the websocket connection belong to the new instance. Without a
+            chain cache, the new instance gets the chain detections of this instance in a
+            private :class:`blurtapi.chaincache.ChainCache`, so that it does not send
+            ``get_config`` again.
+        """
+        chain_cache = self.chain_cache
+        if chain_cache is None and self.cassette is None and len(self._detections) > 0:
+            chain_cache = ChainCache()
+            for url, (props, rpc_method) in list(self._detections.items()):
+                chain_cache.set(url, props, rpc_method)
+        kwargs = dict(self._kwargs)
+        kwargs.update({"num_retries": self.num_retries,
+                       "num_retries_call": self.num_retries_call,
+                       "chain_cache": chain_cache if chain_cache is not None else False,
+                       "response_cache": self.response_cache if self.response_cache is not None else False,
+                       "telemetry": self.telemetry if self.telemetry is not None else False,
+                       "scheduler": self.scheduler if self.scheduler is not None else False,
+                       "race_connect": 0})
+        urls = self.nodes.export_working_nodes()
+        if self.url in urls:
+            urls.remove(self.url)
+            urls.insert(0, self.url)
+        return self.__class__(urls, self.user, self.password, **kwargs)
+
     def is_appbase_ready(self):
         """Check if node is appbase ready"""
         return self.current_rpc in [self.rpc_methods['wsappbase'], self.rpc_methods['appbase']]
@@ -184,26 +400,57 @@ class GrapheneRPC(object):
         """Returns True if appbase ready and appbase calls are set"""
         return not self.use_condenser and self.is_appbase_ready()
 
-    def rpcconnect(self, next_url=True):
-        """Connect to next url in a loop."""
+    def rpcconnect(self, next_url=True, url=None):
+        """Connect to next url in a loop.
+
+        :param str url: node which is tried first, e.g. when the node selection moves the
+            calls to it. The next nodes are tried when it fails (default is None)
+        """
+        with self._connect_lock:
+            connecting = getattr(self._local, "connecting", False)
+            self._local.connecting = True
+            try:
+                self._rpcconnect(next_url, url)
+            finally:
+                self._local.connecting = connecting
+
+    def _rpcconnect(self, next_url, target_url=None):
         if self.nodes.working_nodes_count == 0:
             return
+        if target_url is None and next_url and self.url is None and self.race_connect > 1 and not self.use_tor and \
+           not self.nodes.freeze_current_node and (self.cassette is None or not self.cassette.replaying):
+            target_url = self._race_connect()
         while True:
+            self._close_ws_multiplexer()
+            standby_ws = None
             if next_url:
-                self.url = next(self.nodes)
+                last_url = self.url
+                if target_url is not None:
+                    self.url = self.nodes.select_url(target_url)
+                    target_url = None
+                else:
+                    self.url = next(self.nodes)
+                if self.telemetry is not None and last_url is not None and last_url != self.url:
+                    self.telemetry.record_failover(last_url, self.url)
                 self.nodes.reset_error_cnt_call()
+                self.chain_id = None
                 log.debug("Trying to connect to node %s" % self.url)
-                if self.url[:3] == "wss":
-                    self.ws = create_ws_instance(use_ssl=True)
+                if self.cassette is not None and self.cassette.replaying:
+                    self.ws = None
+                    self.current_rpc = self.rpc_methods["appbase"]
+                elif self.url[:3] == "wss":
+                    standby_ws = self._get_standby_ws(self.url)
+                    self.ws = standby_ws or create_ws_instance(use_ssl=True)
                     self.ws.settimeout(self.timeout)
                     self.current_rpc = self.rpc_methods["wsappbase"]
                 elif self.url[:2] == "ws":
-                    self.ws = create_ws_instance(use_ssl=False)
+                    standby_ws = self._get_standby_ws(self.url)
+                    self.ws = standby_ws or create_ws_instance(use_ssl=False)
                     self.ws.settimeout(self.timeout)
                     self.current_rpc = self.rpc_methods["wsappbase"]
                 else:
                     self.ws = None
-                    self.session = shared_session_instance()
+                    self.session = self._get_session(self.url)
                     if self.use_tor:
                         self.session.proxies = {}
                         self.session.proxies['http'] = 'socks5h://localhost:9050'
@@ -213,7 +460,10 @@ class GrapheneRPC(object):
                                     'content-type': 'application/json; charset=utf-8'}
             try:
                 if self.ws:
-                    self.ws.connect(self.url)
+                    if self.ws is not standby_ws:
+                        self.ws.connect(self.url)
+                    if self.ws_multiplex:
+                        self.ws_multiplexer = WebsocketMultiplexer(self.ws, self.url, timeout=self.timeout, codec=self.codec)
                     self.rpclogin(self.user, self.password)
                 if self.disable_chain_detection:
                     # Set to appbase rpc format
@@ -222,12 +472,27 @@ class GrapheneRPC(object):
                     else:
                         self.current_rpc = self.rpc_methods['appbase']
                     break
+                with self._standby_lock:
+                    standby = self.standby.pop(self.url, None)
+                if standby is not None:
+                    self.current_rpc = self.rpc_methods[standby["rpc_method"]]
+                    self.chain_id = get_chain_id(standby["props"])
+                    break
+                if self.chain_cache is not None:
+                    entry = self.chain_cache.get(self.url)
+                    if entry is not None:
+                        self.current_rpc = self.rpc_methods[entry["rpc_method"]]
+                        self.chain_id = get_chain_id(entry["props"])
+                        replaying = self.cassette is not None and self.cassette.replaying
+                        if not replaying and self.chain_cache.needs_revalidation(self.url):
+                            self._revalidate_chain_detection(self.url)
+                        break
                 try:
                     props = None
                     if not self.use_condenser:
-                        props = self.get_config(api="database")
+                        props = self.rpccall("get_config", api="database")
                     else:
-                        props = self.get_config()
+                        props = self.rpccall("get_config")
                 except Exception as e:
                     if re.search("Bad Cast:Invalid cast from type", str(e)):
                         # retry with not appbase
@@ -235,14 +500,18 @@ class GrapheneRPC(object):
                             self.current_rpc = self.rpc_methods['ws']
                         else:
                             self.current_rpc = self.rpc_methods['appbase']
-                        props = self.get_config(api="database")
+                        props = self.rpccall("get_config", api="database")
                 if props is None:
                     raise RPCError("Could not receive answer for get_config")
+                self.chain_id = get_chain_id(props)
                 if is_network_appbase_ready(props):
                     if self.ws:
                         self.current_rpc = self.rpc_methods["wsappbase"]
                     else:
                         self.current_rpc = self.rpc_methods["appbase"]
+                for rpc_method in self.rpc_methods:
+                    if self.rpc_methods[rpc_method] == self.current_rpc:
+                        self._store_detection(self.url, props, rpc_method)
                 break
             except KeyboardInterrupt:
                 raise
@@ -252,39 +521,249 @@ class GrapheneRPC(object):
                 self.nodes.sleep_and_check_retries(str(e), sleep=do_sleep)
                 next_url = True
 
+    def _store_detection(self, url, props, rpc_method):
+        """Remembers the chain detection of ``url`` for later connects and for clones"""
+        if self.chain_cache is not None:
+            self.chain_cache.set(url, props, rpc_method)
+        else:
+            self._detections[url] = (props, rpc_method)
+
+    def _revalidate_chain_detection(self, url):
+        """Checks the cached chain detection of ``url`` on a separate connection in the background"""
+        def revalidate():
+            props = None
+            try:
+                rpc = GrapheneRPC(url, self.user, self.password, disable_chain_detection=True, chain_cache=False,
+                                  num_retries=0, num_retries_call=0, timeout=self.timeout, use_tor=self.use_tor)
+                if self.use_condenser:
+                    props = rpc.get_config()
+                else:
+                    props = rpc.get_config(api="database")
+                rpc.rpcclose()
+            except Exception as e:
+                log.debug("Revalidation of %s failed: %s" % (url, str(e)))
+            finally:
+                self.chain_cache.revalidation_done(url, props)
+        thread = threading.Thread(target=revalidate, name="chain-revalidation")
+        thread.daemon = True
+        thread.start()
+
     def rpclogin(self, user, password):
         """Login into Websocket"""
         if self.ws and self.current_rpc == self.rpc_methods['ws'] and user and password:
-            self.login(user, password, api="login_api")
+            self.rpccall("login", user, password, api="login_api")
 
     def rpcclose(self):
         """Close Websocket"""
+        with self._standby_lock:
+            standby, self.standby = self.standby, {}
+        for entry in standby.values():
+            if entry["ws"] is not None:
+                entry["ws"].close()
         if self.ws is None:
             return
+        if self.ws_multiplexer is not None:
+            self._close_ws_multiplexer()
+            return
         # if self.ws.connected:
         self.ws.close()
 
-    def request_send(self, payload):
+    def _race_connect(self):
+        """ Sends ``get_config`` to the first ``race_connect`` working nodes at the
+            same time and returns the url of the first valid reply, or None
+        """
+        candidates = [self.nodes[i].url for i in range(len(self.nodes)) if self.nodes._is_working(self.nodes[i])]
+        candidates = candidates[:self.race_connect]
+        if len(candidates) < 2:
+            return None
+        self.headers = {'User-Agent': 'blurtpy v%s' % (blurtpy_version),
+                        'content-type': 'application/json; charset=utf-8'}
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        futures = dict((executor.submit(self._probe_node, url), url) for url in candidates)
+        # the other probes finish in the background and fill the standby list
+        executor.shutdown(wait=False)
+        start_time = time.time()
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(start_time + self.timeout - time.time(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    log.debug("Node %s answered first" % future.result())
+                    # nodes which are still probed must not look like unknown (fast) nodes
+                    # to the scheduler until their probe is measured
+                    for f in pending:
+                        self.nodes.record_latency_bound(self.timeout, url=futures[f])
+                    return future.result()
+        return None
+
+    def _probe_node(self, url):
+        """ Detects the chain of ``url`` with a ``get_config`` call, records the
+            latency and keeps the node as standby
+        """
+        node = None
+        for i in range(len(self.nodes)):
+            if self.nodes[i].url == url:
+                node = self.nodes[i]
+        data = self.codec.dumps(get_query(True, 1, "database_api", "get_config", []))
+        ws = None
+        start_time = time.time()
+        try:
+            if url[:2] == "ws":
+                ws = create_ws_instance(use_ssl=url[:3] == "wss")
+                ws.settimeout(self.timeout)
+                ws.connect(url)
+                ws.send(data)
+                reply = ws.recv()
+            else:
+                reply = self.request_send(data, url=url).content
+            props = self.codec.loads(reply)["result"]
+            if get_chain_id(props) is None:
+                raise RPCError("Invalid get_config reply")
+        except Exception as e:
+            log.debug("Node %s failed to answer get_config: %s" % (url, str(e)))
+            if ws is not None:
+                ws.close()
+            self.nodes.record_failure(node)
+            raise
+        self.nodes.record_success(time.time() - start_time, node)
+        rpc_method = "appbase"
+        if ws is not None:
+            rpc_method = "wsappbase" if is_network_appbase_ready(props) else "ws"
+        self._store_detection(url, props, rpc_method)
+        with self._standby_lock:
+            self.standby[url] = {"rpc_method": rpc_method, "props": props, "ws": ws}
+        return url
+
+    def _get_standby_ws(self, url):
+        """Returns the connected websocket of a standby node, or None"""
+        with self._standby_lock:
+            entry = self.standby.get(url)
+            if entry is None or entry["ws"] is None:
+                return None
+            ws, entry["ws"] = entry["ws"], None
+            return ws
+
+    def _close_ws_multiplexer(self):
+        if self.ws_multiplexer is None:
+            return
+        self.ws_multiplexer.close()
+        self.ws_multiplexer = None
+
+    def _get_session(self, url):
+        """ Returns the session of ``url``. Each node has its own connection pool,
+            unless a session was set with :func:`set_session_instance`.
+        """
+        if SessionInstance.instance is not None:
+            return SessionInstance.instance
+        return shared_node_session(url, **self.pool_kwargs)
+
+    def pool_stats(self):
+        """Returns the connection reuse counters of the HTTP connection pool of each node"""
+        stats = {}
+        for i in range(len(self.nodes)):
+            url = self.nodes[i].url
+            if url[:4] == "http":
+                stats[url] = get_pool_stats(self._get_session(url))
+        return stats
+
+    def request_send(self, payload, url=None, stream=False):
+        if url is None:
+            url = self.url
+        # the session belongs to the node which is called, also when the node was changed
+        session = self._get_session(url)
+        if self.use_tor:
+            session.proxies = {'http': 'socks5h://localhost:9050', 'https': 'socks5h://localhost:9050'}
         if self.user is not None and self.password is not None:
-            response = self.session.post(self.url,
-                                         data=payload,
-                                         headers=self.headers,
-                                         timeout=self.timeout,
-                                         auth=(self.user, self.password))
+            response = session.post(url,
+                                    data=payload,
+                                    headers=self.headers,
+                                    timeout=self.timeout,
+                                    auth=(self.user, self.password),
+                                    stream=stream)
         else:
-            response = self.session.post(self.url,
-                                         data=payload,
-                                         headers=self.headers,
-                                         timeout=self.timeout)
+            response = session.post(url,
+                                    data=payload,
+                                    headers=self.headers,
+                                    timeout=self.timeout,
+                                    stream=stream)
         if response.status_code == 401:
             raise UnauthorizedError
         return response
 
+    def hedged_request_send(self, payload, data):
+        """ Sends a http request and sends it again to a second node, when the
+            reply takes longer than the hedge delay of the method. The first
+            reply is returned.
+
+            :param dict payload: JSON-RPC request
+            :param bytes data: encoded request
+        """
+        policy = self.hedge_policy
+        api, name = get_method_name(payload)
+        if not policy.is_hedgeable(api, name):
+            return self.request_send(data)
+        start_time = time.time()
+        delay = policy.get_delay(name)
+        if delay is None or len(self.nodes) < 2:
+            response = self.request_send(data)
+            policy.record(name, time.time() - start_time)
+            policy.count(name)
+            return response
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=16)
+
+        def record_primary(future):
+            if not future.cancelled() and future.exception() is None:
+                policy.record(name, time.time() - start_time)
+        primary = self._hedge_executor.submit(self.request_send, data, self.url)
+        primary.add_done_callback(record_primary)
+        try:
+            response = primary.result(timeout=delay)
+            policy.count(name)
+            return response
+        except FuturesTimeoutError:
+            pass
+        primary_index = None
+        for i in range(len(self.nodes)):
+            if self.nodes[i].url == self.url:
+                primary_index = i
+        index = self.nodes.best_node_index(exclude=primary_index)
+        if index is None:
+            policy.count(name)
+            return primary.result()
+        node = self.nodes[index]
+        if not node.rate_limiter.try_acquire():
+            policy.count(name)
+            return primary.result()
+        log.debug("Hedging %s on node %s after %.3f s" % (name, node.url, delay))
+        hedge_start_time = time.time()
+        backup = self._hedge_executor.submit(self.request_send, data, node.url)
+        done, not_done = wait([primary, backup], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else backup
+        if winner.exception() is not None:
+            winner = backup if winner is primary else primary
+        if winner is backup and backup.exception() is None and backup.result().status_code == 429:
+            # the 429 is charged to the node of the backup request, the primary reply is used
+            node.rate_limiter.on_throttled(parse_retry_after(backup.result().headers.get("Retry-After")))
+            winner = primary
+        loser = backup if winner is primary else primary
+        # requests can not abort a running post, the reply of the loser is dropped
+        loser.cancel()
+        response = winner.result()
+        if winner is backup:
+            self.nodes.record_success(time.time() - hedge_start_time, node)
+        policy.count(name, hedged=True, won=winner is backup)
+        return response
+
     def ws_send(self, payload):
-        if self.ws is None:
-            raise RPCConnection("No websocket available!")
-        self.ws.send(payload)
-        reply = self.ws.recv()
+        with self._ws_lock:
+            if self.ws is None:
+                raise RPCConnection("No websocket available!")
+            self.ws.send(payload)
+            reply = self.ws.recv()
         return reply
 
     def version_string_to_int(self, network_version):
@@ -296,7 +775,7 @@ class GrapheneRPC(object):
             dictionary with keys chain_id, core_symbol and prefix
         """
         if props is None:
-            props = self.get_config(api="database")
+            props = self.rpccall("get_config", api="database")
         chain_id = None
         network_version = None
         blockchain_name = None
@@ -352,8 +831,18 @@ class GrapheneRPC(object):
         else:
             return highest_version_chain
 
-    def _check_for_server_error(self, reply):
-        """Checks for server error message in reply"""
+    def _check_for_server_error(self, reply, status_code=None):
+        """ Raises the error which belongs to a reply which is not valid JSON
+
+            :param str reply: reply text
+            :param int status_code: HTTP status code of the reply. When it is a known
+                server error, the reply text is not searched.
+        """
+        if status_code in HTTP_SERVER_ERRORS:
+            error_class, message = HTTP_SERVER_ERRORS[status_code]
+            raise error_class(message)
+        if isinstance(reply, bytes):
+            reply = reply.decode('utf8', errors='replace')
         if re.search("Internal Server Error", reply) or re.search("500", reply):
             raise RPCErrorDoRetry("Internal Server Error")
         elif re.search("Not Implemented", reply) or re.search("501", reply):
@@ -383,31 +872,110 @@ class GrapheneRPC(object):
         else:
             raise RPCError("Client returned invalid format. Expected JSON!")
 
-    def rpcexec(self, payload):
+    def _get_telemetry_method(self, payload):
+        """Returns the method label of a request for the telemetry"""
+        if isinstance(payload, list):
+            return "batch"
+        api, name = get_method_name(payload)
+        if api is None:
+            return name
+        return "%s.%s" % (api, name)
+
+    def _sort_batch_reply(self, payload, ret):
+        """Returns the replies of a batch in the order of the requests"""
+        order = {}
+        for i, p in enumerate(payload):
+            if isinstance(p, dict) and p.get("id") not in order:
+                order[p.get("id")] = i
+        if len(order) < len(payload) or not all(isinstance(r, dict) and r.get("id") in order for r in ret):
+            return ret
+        return sorted(ret, key=lambda r: order[r["id"]])
+
+    def _send(self, payload, data):
+        """Sends one request to the current node and returns ``(ret, reply, response)``"""
+        ret = None
+        response = None
+        if self.cassette is not None and self.cassette.replaying:
+            ret = self.cassette.replay(payload)
+            reply = ret
+        elif self.ws_multiplexer is not None:
+            ret = self.ws_multiplexer.call(payload)
+            reply = ret
+        elif self.current_rpc == self.rpc_methods['ws'] or \
+           self.current_rpc == self.rpc_methods['wsappbase']:
+            reply = self.ws_send(data)
+        elif self.hedge_policy is not None:
+            response = self.hedged_request_send(payload, data)
+            reply = response.content
+        else:
+            response = self.request_send(data)
+            reply = response.content
+        return ret, reply, response
+
+    def rpcexec(self, payload, raw=False):
         """
         Execute a call by sending the payload.
 
         :param json payload: Payload data
+        :param bool raw: When True, the decoded reply is returned as it is. Errors
+            of single items in a batch reply are not raised (default is False)
         :raises ValueError: if the server does not respond in proper JSON format
         :raises RPCError: if the server returns an error
         """
-        log.debug(json.dumps(payload))
+        data = self.codec.dumps(payload)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(data.decode('utf8'))
         if self.nodes.working_nodes_count == 0:
             raise WorkingNodeMissing
         if self.url is None:
             raise RPCConnection("RPC is not connected!")
         reply = {}
+        ret = None
         response = None
+        telemetry = self.telemetry
+        if telemetry is not None:
+            method = self._get_telemetry_method(payload)
+        attempt = 0
         while True:
+            # the chain detection of a new node is not moved again
+            if self.ws is None and not getattr(self._local, "connecting", False) and self.nodes.select_node():
+                self.rpcconnect(url=self.nodes.url)
+            if telemetry is not None and attempt > 0:
+                telemetry.record_retry(method, self.url)
+            attempt += 1
             self.nodes.increase_error_cnt_call()
+            node = self.nodes.node
+            if node is not None:
+                node.rate_limiter.acquire()
+            start_time = time.time()
             try:
-                if self.current_rpc == self.rpc_methods['ws'] or \
-                   self.current_rpc == self.rpc_methods['wsappbase']:
-                    reply = self.ws_send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
+                if self.scheduler is None:
+                    ret, reply, response = self._send(payload, data)
                 else:
-                    response = self.request_send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
-                    reply = response.text
-                if not bool(reply):
+                    ticket = self.scheduler.acquire(self.get_priority())
+                    start_time = ticket.started
+                    try:
+                        ret, reply, response = self._send(payload, data)
+                    finally:
+                        self.scheduler.release(ticket)
+                if response is not None and response.status_code == 429:
+                    if telemetry is not None:
+                        telemetry.record_error(method, self.url, "TooManyRequests")
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    node.rate_limiter.on_throttled(retry_after)
+                    if self.nodes.node_selection == "round_robin" and self.nodes.has_uncooled_node():
+                        # the call moves to a node which is not throttled instead of waiting for the cooldown
+                        self.rpcconnect()
+                    else:
+                        try:
+                            self.nodes.sleep_and_check_retries("Too Many Requests", sleep=False, call_retry=True)
+                        except CallRetriesReached:
+                            self.nodes.increase_error_cnt()
+                            self.nodes.sleep_and_check_retries("Too Many Requests", sleep=False, call_retry=False)
+                            self.rpcconnect()
+                elif not bool(reply):
+                    if telemetry is not None:
+                        telemetry.record_error(method, self.url, "EmptyReply")
                     try:
                         self.nodes.sleep_and_check_retries("Empty Reply", call_retry=True)
                     except CallRetriesReached:
@@ -415,10 +983,13 @@ class GrapheneRPC(object):
                         self.nodes.sleep_and_check_retries("Empty Reply", sleep=False, call_retry=False)
                         self.rpcconnect()
                 else:
+                    latency = time.time() - start_time
                     break
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, CassetteMiss):
                 raise
             except WebSocketConnectionClosedException as e:
+                if telemetry is not None:
+                    telemetry.record_error(method, self.url, e)
                 if self.nodes.num_retries_call_reached:
                     self.nodes.increase_error_cnt()
                     self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
@@ -427,30 +998,56 @@ class GrapheneRPC(object):
                     # self.nodes.sleep_and_check_retries(str(e), sleep=True, call_retry=True)
                     self.rpcconnect(next_url=False)
             except ConnectionError as e:
+                if telemetry is not None:
+                    telemetry.record_error(method, self.url, e)
                 self.nodes.increase_error_cnt()
                 self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
                 self.rpcconnect()
             except WebSocketTimeoutException as e:
+                if telemetry is not None:
+                    telemetry.record_error(method, self.url, e)
                 self.nodes.increase_error_cnt()
                 self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
                 self.rpcconnect()
             except Exception as e:
+                if telemetry is not None:
+                    telemetry.record_error(method, self.url, e)
                 self.nodes.increase_error_cnt()
                 self.nodes.sleep_and_check_retries(str(e), sleep=False, call_retry=False)
                 self.rpcconnect()
 
-        ret = {}
-        try:
-            if response is None:
-                ret = json.loads(reply, strict=False, encoding="utf-8")
-            else:
-                ret = response.json()
-        except ValueError:
-            self._check_for_server_error(reply)
+        if ret is None:
+            ret = {}
+            try:
+                ret = self.codec.loads(reply)
+            except ValueError:
+                self.nodes.record_failure(node)
+                if telemetry is not None:
+                    telemetry.record_error(method, self.url, "InvalidJSON")
+                self._check_for_server_error(reply, status_code=None if response is None else response.status_code)
+        self.nodes.record_success(latency, node)
+        self._local.reply_size = len(reply) if isinstance(reply, (bytes, str)) else 0
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.record(payload, ret, latency)
+        if telemetry is not None:
+            telemetry.record_request(method, self.url, latency, request_bytes=len(data),
+                                     response_bytes=len(reply) if isinstance(reply, (bytes, str)) else 0,
+                                     batch_size=len(payload) if isinstance(payload, list) else None)
 
-        log.debug(json.dumps(reply))
+        if log.isEnabledFor(logging.DEBUG):
+            if isinstance(reply, bytes):
+                log.debug(reply.decode('utf8', errors='replace'))
+            else:
+                log.debug(reply)
 
+        if raw and isinstance(ret, list):
+            self.nodes.reset_error_cnt_call()
+            return ret
+        if isinstance(payload, list) and isinstance(ret, list):
+            ret = self._sort_batch_reply(payload, ret)
         if isinstance(ret, dict) and 'error' in ret:
+            if isinstance(payload, list):
+                raise BatchedCallsNotSupported(get_error_message(ret))
             if 'detail' in ret['error']:
                 raise RPCError(ret['error']['detail'])
             else:
@@ -480,32 +1077,143 @@ class GrapheneRPC(object):
                 return ret
         return ret
 
+    def rpcstream(self, payload, path=("result",), projection=None):
+        """ Sends the payload and yields the elements of the JSON array at ``path``
+            of the reply one at a time while the reply is received
+
+            On https nodes the reply is parsed incrementally, so only one element
+            is decoded at a time, see :func:`blurtapi.streamjson.iter_json_array`.
+            Websocket replies, and replies which fail before the first element,
+            are sent again with :meth:`rpcexec`, which handles retries and errors.
+
+            :param payload: JSON-RPC request or list of requests
+            :param tuple path: keys of the array in the reply, ``()`` for the items of
+                a batch reply (default is ``("result",)``)
+            :param list/dict/Projection projection: fields which are kept of each
+                element, see :class:`blurtapi.streamjson.Projection` (default is None)
+
+            .. code-block:: python
+
+                query = rpc.build_query("get_block_range", [{"starting_block_num": 1, "count": 100}], {"api": "block"})
+                for block in rpc.rpcstream(query, path=("result", "blocks"), projection=["block_id", "transactions.operations"]):
+                    print(block["block_id"])
+
+        """
+        if projection is not None:
+            projection = Projection(projection)
+        if self.url is None:
+            raise RPCConnection("RPC is not connected!")
+        if self.current_rpc in [self.rpc_methods['jsonrpc'], self.rpc_methods['appbase']] and self.hedge_policy is None and \
+           (self.cassette is None or not (self.cassette.replaying or self.cassette.recording)):
+            node = self.nodes.node
+            if node is not None:
+                node.rate_limiter.acquire()
+            data = self.codec.dumps(payload)
+            start_time = time.time()
+            response = None
+            yielded = False
+            try:
+                response = self.request_send(data, stream=True)
+                if response.status_code == 200:
+                    for item in iter_json_array(response.iter_content(CHUNK_SIZE), path, projection):
+                        yielded = True
+                        yield item
+                    self.nodes.record_success(time.time() - start_time, node)
+                    return
+            except Exception as e:
+                if yielded:
+                    raise
+                log.debug("Streamed reply failed, sending it again: %s" % str(e))
+            finally:
+                if response is not None:
+                    response.close()
+        if isinstance(payload, list):
+            document = self.rpcexec(payload, raw=True)
+        else:
+            document = {"result": self.rpcexec(payload)}
+        array = document if len(path) == 0 else get_path(document, path)
+        if not isinstance(array, list):
+            raise RPCError("The reply has no array at %s" % ".".join(path))
+        for item in array:
+            yield item if projection is None else projection.apply(item)
+
     # End of Deprecated methods
     ####################################################################
+    def batch(self, chunk_size=50):
+        """ Returns a context manager which collects rpc calls and sends
+            them as JSON-RPC batches when the block is left
+
+            :param int chunk_size: maximum number of requests per batch (default is 50)
+
+            Each call returns a ``concurrent.futures.Future``. See
+            :class:`blurtapi.rpcbatch.RPCBatch`.
+
+            .. code-block:: python
+
+                with rpc.batch(chunk_size=100) as b:
+                    futures = [b.get_block({"block_num": n}, api="block") for n in range(1, 1001)]
+                blocks = [f.result() for f in futures]
+
+        """
+        return RPCBatch(self, chunk_size=chunk_size)
+
+    def build_query(self, name, args, kwargs):
+        """Returns the JSON-RPC request for the rpc method ``name``"""
+        api_name = get_api_name(self.is_appbase_ready(), *args, **kwargs)
+        if self.is_appbase_ready() and self.use_condenser and api_name != "bridge":
+            api_name = "condenser_api"
+        if (api_name is None):
+            api_name = 'database_api'
+        return get_query(self.is_appbase_ready() and not self.use_condenser or api_name == "bridge", self.get_request_id(), api_name, name, args)
+
+    def rpccall(self, name, *args, **kwargs):
+        """Execute the rpc method ``name`` and return its result
+
+        This is the synchronous code path behind the dynamic method
+        mapping of :meth:`__getattr__`, i.e. ``rpc.get_block(1)`` is the
+        same as ``rpc.rpccall("get_block", 1)``.
+
+        :param str name: rpc method name
+
+        The keyword ``priority`` sets the priority class of this call, see
+        :meth:`priority`, and ``num_retries_call`` the retries of this call.
+        Both only apply to this call, so one instance can be used by several
+        threads with different settings.
+        """
+        if "priority" in kwargs:
+            priority = kwargs.pop("priority")
+            with self.priority(priority):
+                return self.rpccall(name, *args, **kwargs)
+        # let's be able to define the num_retries per query
+        with self.nodes.call_retries(kwargs.get("num_retries_call", None)):
+            return self._rpccall(name, args, kwargs)
+
+    def _rpccall(self, name, args, kwargs):
+        add_to_queue = kwargs.get("add_to_queue", False)
+        query = self.build_query(name, args, kwargs)
+        if add_to_queue:
+            self.rpc_queue.append(query)
+            return None
+        elif len(self.rpc_queue) > 0:
+            self.rpc_queue.append(query)
+            query = self.rpc_queue
+            self.rpc_queue = []
+        elif self.response_cache is not None:
+            cache_key = self.response_cache.get_key(query, chain_id=self.chain_id)
+            if cache_key is not None:
+                found, r = self.response_cache.get(cache_key)
+                if found:
+                    return r
+        if self.single_flight is not None and isinstance(query, dict) and not is_broadcast(*get_method_name(query)):
+            r = self.single_flight.do(get_call_key(query), self.rpcexec, query)
+        else:
+            r = self.rpcexec(query)
+        if self.response_cache is not None:
+            self.response_cache.update(query, r, rpc=self, chain_id=self.chain_id)
+        return r
+
     def __getattr__(self, name):
         """Map all methods to RPC calls and pass through the arguments."""
         def method(*args, **kwargs):
-
-            api_name = get_api_name(self.is_appbase_ready(), *args, **kwargs)
-            if self.is_appbase_ready() and self.use_condenser and api_name != "bridge":
-                api_name = "condenser_api"
-            if (api_name is None):
-                api_name = 'database_api'
-
-            # let's be able to define the num_retries per query
-            stored_num_retries_call = self.nodes.num_retries_call
-            self.nodes.num_retries_call = kwargs.get("num_retries_call", stored_num_retries_call)
-            add_to_queue = kwargs.get("add_to_queue", False)
-            query = get_query(self.is_appbase_ready() and not self.use_condenser or api_name == "bridge", self.get_request_id(), api_name, name, args)
-            if add_to_queue:
-                self.rpc_queue.append(query)
-                self.nodes.num_retries_call = stored_num_retries_call
-                return None
-            elif len(self.rpc_queue) > 0:
-                self.rpc_queue.append(query)
-                query = self.rpc_queue
-                self.rpc_queue = []
-            r = self.rpcexec(query)
-            self.nodes.num_retries_call = stored_num_retries_call
-            return r
+            return self.rpccall(name, *args, **kwargs)
         return method
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import collections
+import math
+import threading
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def get_method_name(payload):
+    """ Returns ``(api, method)`` of a JSON-RPC request
+
+        .. code-block:: python
+
+            >>> get_method_name({"method": "block_api.get_block", "params": {"block_num": 1}})
+            ('block_api', 'get_block')
+            >>> get_method_name({"method": "call", "params": ["condenser_api", "get_block", [1]]})
+            ('condenser_api', 'get_block')
+
+    """
+    if not isinstance(payload, dict):
+        return None, None
+    method = payload.get("method", "")
+    if method == "call":
+        params = payload.get("params", [])
+        if len(params) > 1:
+            return params[0], params[1]
+        return None, None
+    if "." in method:
+        api, name = method.split(".", 1)
+        return api, name
+    return None, method
+
+
+def is_broadcast(api, name):
+    """Returns True for calls which change the chain state"""
+    return "broadcast" in (name or "") or "broadcast" in (api or "")
+
+
+class HedgePolicy(object):
+    """ Decides when a read call is sent a second time to another node
+
+        When a call has not been answered after the ``percentile`` of the
+        latencies observed for its method, the same request is sent to the
+        next healthy node. The first reply wins. Broadcast calls and batches
+        are never hedged.
+
+        :param float percentile: latency percentile after which a call is hedged (default is 0.95)
+        :param int min_samples: number of observed calls of a method before hedging starts (default is 20)
+        :param int window: number of latest latencies kept per method (default is 200)
+        :param float min_delay: minimum hedge delay in seconds (default is 0)
+        :param list methods: when set, only these methods are hedged
+
+        .. code-block:: python
+
+            >>> policy = HedgePolicy(percentile=0.9, min_samples=10)
+            >>> for i in range(10):
+            ...     policy.record("get_block", (i + 1) / 10.)
+            >>> policy.get_delay("get_block")
+            0.9
+            >>> policy.is_hedgeable("network_broadcast_api", "broadcast_transaction")
+            False
+
+        Usage:
+
+        .. code-block:: python
+
+            from blurtapi.noderpc import NodeRPC
+            rpc = NodeRPC(["https://rpc.beblurt.com", "https://blurt-rpc.saboin.com"], hedge=True)
+            rpc.get_dynamic_global_properties(api="database")
+            print(rpc.hedge_policy.stats())
+
+    """
+    def __init__(self, percentile=0.95, min_samples=20, window=200, min_delay=0., methods=None):
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be between 0 and 1")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.methods = methods
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.counters = {}
+
+    def is_hedgeable(self, api, name):
+        """Returns True when calls of this method may be hedged"""
+        if name is None or is_broadcast(api, name):
+            return False
+        return self.methods is None or name in self.methods
+
+    def record(self, name, latency):
+        """Stores the latency of a completed call"""
+        with self.lock:
+            if name not in self.latencies:
+                self.latencies[name] = collections.deque(maxlen=self.window)
+            self.latencies[name].append(latency)
+
+    def get_delay(self, name):
+        """Returns the hedge delay in seconds for ``name``, or None while there are too few samples"""
+        with self.lock:
+            latencies = self.latencies.get(name)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            latencies = sorted(latencies)
+        index = max(int(math.ceil(self.percentile * len(latencies))) - 1, 0)
+        return max(latencies[index], self.min_delay)
+
+    def count(self, name, hedged=False, won=False):
+        """Counts a call and whether it was hedged and won by the hedge request"""
+        with self.lock:
+            if name not in self.counters:
+                self.counters[name] = {"calls": 0, "hedged": 0, "wins": 0}
+            counter = self.counters[name]
+            counter["calls"] += 1
+            if hedged:
+                counter["hedged"] += 1
+            if won:
+                counter["wins"] += 1
+
+    def stats(self):
+        """ Returns calls, hedged calls, hedge wins, the hedge and win rate and the
+            current hedge delay per method
+        """
+        with self.lock:
+            counters = {name: dict(c) for name, c in self.counters.items()}
+        for name, c in counters.items():
+            c["hedge_rate"] = c["hedged"] / c["calls"] if c["calls"] else 0.
+            c["win_rate"] = c["wins"] / c["hedged"] if c["hedged"] else 0.
+            c["delay"] = self.get_delay(name)
+        return counters
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+REQUEST_MODULE = None
+if not REQUEST_MODULE:
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.poolmanager import PoolManager
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+        REQUEST_MODULE = "requests"
+    except ImportError:
+        REQUEST_MODULE = None
+
+log = logging.getLogger(__name__)
+
+
+class PoolStats(object):
+    """Connection reuse counters of a node session"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.discarded_connections = 0
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_stats(self):
+        """ Returns requests, new and discarded connections and the share of
+            requests which were sent on a kept-alive connection
+        """
+        with self.lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {"requests": self.requests, "new_connections": self.new_connections,
+                    "discarded_connections": self.discarded_connections,
+                    "reuse_ratio": reused / self.requests if self.requests else 0.}
+
+
+if REQUEST_MODULE is not None:
+    class CountingPoolMixin(object):
+        """Counts new connections and connections which did not fit back into the pool"""
+        pool_stats = None
+
+        def _new_conn(self):
+            if self.pool_stats is not None:
+                self.pool_stats.count("new_connections")
+            return super(CountingPoolMixin, self)._new_conn()
+
+        def _put_conn(self, conn):
+            if self.pool_stats is not None and self.pool is not None and self.pool.full():
+                self.pool_stats.count("discarded_connections")
+            return super(CountingPoolMixin, self)._put_conn(conn)
+
+    class CountingHTTPConnectionPool(CountingPoolMixin, HTTPConnectionPool):
+        pass
+
+    class CountingHTTPSConnectionPool(CountingPoolMixin, HTTPSConnectionPool):
+        pass
+
+    class CountingPoolManager(PoolManager):
+        def __init__(self, *args, **kwargs):
+            self.pool_stats = kwargs.pop("pool_stats")
+            super(CountingPoolManager, self).__init__(*args, **kwargs)
+            self.pool_classes_by_scheme = {"http": CountingHTTPConnectionPool,
+                                           "https": CountingHTTPSConnectionPool}
+
+        def _new_pool(self, scheme, host, port, request_context=None):
+            pool = super(CountingPoolManager, self)._new_pool(scheme, host, port, request_context=request_context)
+            pool.pool_stats = self.pool_stats
+            return pool
+
+    class NodeHTTPAdapter(HTTPAdapter):
+        """ ``HTTPAdapter`` which counts requests, new connections and
+            connections discarded because the pool was full
+
+            :param int pool_connections: number of hosts for which connections are kept
+            :param int pool_maxsize: number of connections kept per host
+            :param bool pool_block: When True, requests wait for a free connection
+                instead of opening a connection which is discarded afterwards
+        """
+        def __init__(self, pool_connections=2, pool_maxsize=10, pool_block=False):
+            self.pool_stats = PoolStats()
+            super(NodeHTTPAdapter, self).__init__(pool_connections=pool_connections,
+                                                  pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+        def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+            self._pool_connections = connections
+            self._pool_maxsize = maxsize
+            self._pool_block = block
+            self.poolmanager = CountingPoolManager(num_pools=connections, maxsize=maxsize, block=block,
+                                                   pool_stats=self.pool_stats, **pool_kwargs)
+
+        def send(self, request, **kwargs):
+            self.pool_stats.count("requests")
+            return super(NodeHTTPAdapter, self).send(request, **kwargs)
+
+
+class NodeSessionInstances(object):
+    """Singelton for the process wide sessions, one per node url and pool setting"""
+    sessions = {}
+    lock = threading.Lock()
+
+
+def shared_node_session(url, pool_connections=2, pool_maxsize=10, pool_block=False):
+    """ Returns the process wide ``requests.Session`` of a node url
+
+        Each node gets its own connection pool, so that threads calling
+        different nodes do not push each other's connections out of the pool.
+        Instances with the same pool setting share the session and its
+        kept-alive connections.
+
+        :param str url: node url
+        :param int pool_connections: number of hosts for which connections are kept (default is 2)
+        :param int pool_maxsize: number of connections kept per host, should be at least the
+            number of threads which call the node at the same time (default is 10)
+        :param bool pool_block: When True, requests wait for a free connection (default is False)
+    """
+    if REQUEST_MODULE is None:
+        raise Exception()
+    key = (url, pool_connections, pool_maxsize, pool_block)
+    with NodeSessionInstances.lock:
+        session = NodeSessionInstances.sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = NodeHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                      pool_block=pool_block)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            NodeSessionInstances.sessions[key] = session
+        return session
+
+
+def get_pool_stats(session):
+    """Returns the connection reuse counters of a session from :func:`shared_node_session`, or None"""
+    if REQUEST_MODULE is None or session is None:
+        return None
+    adapter = session.get_adapter("https://")
+    if isinstance(adapter, NodeHTTPAdapter):
+        return adapter.pool_stats.get_stats()
+    return None
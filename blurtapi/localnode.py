@@ -0,0 +1,736 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+DEFAULT_CONFIG = {
+    "IS_TEST_NET": False,
+    "BLURT_ADDRESS_PREFIX": "BLT",
+    "BLURT_BLOCKCHAIN_VERSION": "0.8.2",
+    "BLURT_BLOCK_INTERVAL": 3,
+    "BLURT_CHAIN_ID": "cd8d90f29ae273abec3eaa7731e25934c63eb654d55080caff2ebb7f5df6381f",
+    "BLURT_SYMBOL": {"decimals": 3, "nai": "@@000000021"},
+    "VESTS_SYMBOL": {"decimals": 6, "nai": "@@000000037"},
+}
+
+DEFAULT_ACCOUNTS = ["alice", "bob", "carol", "dave", "eve"]
+
+#: api of each method in the appbase dialect, the condenser dialect serves all of them
+APPBASE_METHODS = {
+    "get_config": "database_api",
+    "get_dynamic_global_properties": "database_api",
+    "find_accounts": "database_api",
+    "get_block": "block_api",
+    "get_block_header": "block_api",
+    "get_block_range": "block_api",
+    "get_ops_in_block": "account_history_api",
+    "enum_virtual_ops": "account_history_api",
+    "get_account_history": "account_history_api",
+    "broadcast_transaction": "network_broadcast_api",
+    "broadcast_transaction_synchronous": "network_broadcast_api",
+}
+
+
+def _time_string(t):
+    return t.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _hash(*args):
+    return hashlib.sha1(("-".join(str(a) for a in args)).encode("utf-8")).hexdigest()
+
+
+class LocalChain(object):
+    """ Deterministic chain served by :class:`LocalNode`
+
+        Without a fixture, blocks are generated from their number: every
+        block contains ``transfers_per_block`` transfers between the
+        ``accounts`` and a ``producer_reward`` virtual operation, so the
+        same block number always returns the same block. A fixture is a
+        JSON file (or dict) with the optional keys ``config``,
+        ``dynamic_global_properties``, ``accounts`` (account objects) and
+        ``blocks`` (condenser ``get_block`` replies), which replace the
+        generated data.
+
+        Broadcast transactions are stored in :attr:`broadcasts` and are
+        included in the next block, which is created by
+        :meth:`produce_block` or, when ``block_interval`` is set, by the
+        passing time.
+
+        :param int head_block_num: head block at start (default is 1000, or the
+            last fixture block)
+        :param list accounts: account names (default is alice, bob, carol, dave, eve)
+        :param int transfers_per_block: transfers in each generated block (default is 2)
+        :param str public_key: key of the owner, active, posting and memo authorities of
+            the generated accounts, needed to sign transactions for them (default is None)
+        :param float block_interval: seconds per new head block, None for a fixed head (default is None)
+        :param str/dict fixture: JSON file or dict with chain data (default is None)
+        :param datetime genesis_time: timestamp of block 0 (default is 2024-01-01)
+    """
+    def __init__(self, head_block_num=None, accounts=None, transfers_per_block=2, public_key=None,
+                 block_interval=None, fixture=None, genesis_time=datetime(2024, 1, 1)):
+        self.lock = threading.RLock()
+        self.accounts = list(accounts or DEFAULT_ACCOUNTS)
+        self.transfers_per_block = transfers_per_block
+        self.public_key = public_key
+        self.block_interval = block_interval
+        self.genesis_time = genesis_time
+        self.config = dict(DEFAULT_CONFIG)
+        self.fixture_dgp = None
+        self.fixture_accounts = {}
+        self.fixture_blocks = {}
+        self.extra_transactions = {}
+        self.broadcasts = []
+        self.pending = []
+        self.history = {}
+        self.history_head = 0
+        if fixture is not None:
+            self.load_fixture(fixture)
+        if head_block_num is None:
+            head_block_num = max(self.fixture_blocks) if self.fixture_blocks else 1000
+        self.base_head = head_block_num
+        self.produced = 0
+        self.start_time = time.time()
+
+    def load_fixture(self, fixture):
+        if not isinstance(fixture, dict):
+            with open(fixture, "r") as f:
+                fixture = json.load(f)
+        self.config.update(fixture.get("config", {}))
+        self.fixture_dgp = fixture.get("dynamic_global_properties", None)
+        for account in fixture.get("accounts", []):
+            self.fixture_accounts[account["name"]] = account
+            if account["name"] not in self.accounts:
+                self.accounts.append(account["name"])
+        for block in fixture.get("blocks", []):
+            self.fixture_blocks[int(block["block_id"][:8], 16)] = block
+
+    @property
+    def head_block_num(self):
+        with self.lock:
+            head = self.base_head + self.produced
+            if self.block_interval:
+                head = max(head, self.base_head + int((time.time() - self.start_time) / self.block_interval))
+            return head
+
+    def block_time(self, block_num):
+        return self.genesis_time + timedelta(seconds=self.config["BLURT_BLOCK_INTERVAL"] * block_num)
+
+    def block_id(self, block_num):
+        return "%08x" % block_num + _hash("block", block_num)[:32]
+
+    def produce_block(self):
+        """Creates a new head block with all pending broadcast transactions, returns its number"""
+        with self.lock:
+            self.produced += 1
+            block_num = self.head_block_num
+            if self.pending:
+                self.extra_transactions[block_num] = self.pending
+                self.pending = []
+            return block_num
+
+    def _transfer_transactions(self, block_num):
+        n = len(self.accounts)
+        transactions = []
+        expiration = _time_string(self.block_time(block_num) + timedelta(seconds=60))
+        for i in range(self.transfers_per_block):
+            op = ["transfer", {"from": self.accounts[(block_num + i) % n],
+                               "to": self.accounts[(block_num + i + 1) % n],
+                               "amount": "%d.%03d BLURT" % (1 + i, block_num % 1000),
+                               "memo": "block %d" % block_num}]
+            transactions.append({"ref_block_num": (block_num - 1) & 0xffff,
+                                 "ref_block_prefix": int(_hash("prefix", block_num)[:8], 16),
+                                 "expiration": expiration, "operations": [op],
+                                 "extensions": [], "signatures": []})
+        return transactions
+
+    def get_block(self, block_num):
+        """Returns the block in the condenser format, or None when it does not exist"""
+        if block_num < 1 or block_num > self.head_block_num:
+            return None
+        if block_num in self.fixture_blocks:
+            return self.fixture_blocks[block_num]
+        transactions = self._transfer_transactions(block_num)
+        transaction_ids = [_hash("trx", block_num, i) for i in range(len(transactions))]
+        for trx in self.extra_transactions.get(block_num, []):
+            transactions.append(trx["transaction"])
+            transaction_ids.append(trx["id"])
+        return {"previous": self.block_id(block_num - 1),
+                "timestamp": _time_string(self.block_time(block_num)),
+                "witness": self.accounts[block_num % len(self.accounts)],
+                "transaction_merkle_root": _hash("merkle", block_num),
+                "extensions": [],
+                "witness_signature": "1f" + _hash("signature", block_num) * 3 + "00" * 5,
+                "transactions": transactions,
+                "block_id": self.block_id(block_num),
+                "signing_key": self.public_key or "",
+                "transaction_ids": transaction_ids}
+
+    def get_ops_in_block(self, block_num, only_virtual=False):
+        """Returns the operations of a block in the condenser format"""
+        block = self.get_block(block_num)
+        if block is None:
+            return []
+        ops = []
+        if not only_virtual:
+            for trx_in_block, trx in enumerate(block["transactions"]):
+                for op_in_trx, op in enumerate(trx["operations"]):
+                    ops.append({"trx_id": block["transaction_ids"][trx_in_block], "block": block_num,
+                                "trx_in_block": trx_in_block, "op_in_trx": op_in_trx, "virtual_op": 0,
+                                "timestamp": block["timestamp"], "op": op})
+        ops.append({"trx_id": "0" * 40, "block": block_num, "trx_in_block": len(block["transactions"]),
+                    "op_in_trx": 0, "virtual_op": 1, "timestamp": block["timestamp"],
+                    "op": ["producer_reward", {"producer": block["witness"], "vesting_shares": "1.000000 VESTS"}]})
+        return ops
+
+    def enum_virtual_ops(self, block_range_begin, block_range_end, operation_begin=0, limit=150000):
+        """ Returns the virtual operations of the blocks ``block_range_begin`` to
+            ``block_range_end - 1`` with an ``operation_id`` of at least ``operation_begin``,
+            up to ``limit`` operations, and where the next page starts
+        """
+        ops = []
+        for block_num in range(block_range_begin, min(block_range_end, self.head_block_num + 1)):
+            for index, op in enumerate(self.get_ops_in_block(block_num, only_virtual=True)):
+                op["operation_id"] = block_num * 1000 + index
+                if op["operation_id"] < operation_begin:
+                    continue
+                if len(ops) == limit:
+                    return ops, block_num, op["operation_id"]
+                ops.append(op)
+        return ops, block_range_end, 0
+
+    def _update_history(self):
+        head = self.head_block_num
+        while self.history_head < head:
+            self.history_head += 1
+            for op in self.get_ops_in_block(self.history_head):
+                value = op["op"][1]
+                for name in set([value.get("from"), value.get("to"), value.get("producer")]):
+                    if name is not None:
+                        self.history.setdefault(name, []).append(op)
+
+    def get_account_history(self, account, start=-1, limit=100, operation_filter=None):
+        """ Returns ``[index, op]`` items with ``index <= start``, up to ``limit + 1``
+            items as the node does. ``operation_filter`` is a set of operation names.
+        """
+        with self.lock:
+            self._update_history()
+            history = self.history.get(account, [])
+        if start < 0 or start >= len(history):
+            start = len(history) - 1
+        ret = []
+        index = start
+        while index >= 0 and len(ret) <= limit:
+            op = history[index]
+            if operation_filter is None or op["op"][0] in operation_filter:
+                ret.append([index, op])
+            index -= 1
+        return ret[::-1]
+
+    def get_account(self, name):
+        if name in self.fixture_accounts:
+            return self.fixture_accounts[name]
+        if name not in self.accounts:
+            return None
+        authority = {"weight_threshold": 1, "account_auths": [],
+                     "key_auths": [[self.public_key, 1]] if self.public_key else []}
+        created = _time_string(self.genesis_time)
+        return {"id": self.accounts.index(name), "name": name, "owner": authority, "active": authority,
+                "posting": authority, "memo_key": self.public_key or "", "json_metadata": "",
+                "posting_json_metadata": "", "proxy": "", "last_owner_update": created,
+                "last_account_update": created, "created": created, "mined": False,
+                "recovery_account": "", "reset_account": "null", "last_account_recovery": created,
+                "comment_count": 0, "lifetime_vote_count": 0, "post_count": 0, "can_vote": True,
+                "voting_manabar": {"current_mana": "1000000000", "last_update_time": 0},
+                "balance": "1000.000 BLURT", "savings_balance": "0.000 BLURT",
+                "savings_withdraw_requests": 0, "reward_blurt_balance": "0.000 BLURT",
+                "reward_vesting_balance": "0.000000 VESTS", "reward_vesting_blurt": "0.000 BLURT",
+                "vesting_shares": "1000000.000000 VESTS", "delegated_vesting_shares": "0.000000 VESTS",
+                "received_vesting_shares": "0.000000 VESTS", "vesting_withdraw_rate": "0.000000 VESTS",
+                "next_vesting_withdrawal": "1969-12-31T23:59:59", "withdrawn": 0, "to_withdraw": 0,
+                "withdraw_routes": 0, "curation_rewards": 0, "posting_rewards": 0,
+                "proxied_vsf_votes": [0, 0, 0, 0], "witnesses_voted_for": 0,
+                "last_post": created, "last_root_post": created, "last_vote_time": created,
+                "post_bandwidth": 0, "pending_claimed_accounts": 0}
+
+    def get_dynamic_global_properties(self):
+        head = self.head_block_num
+        if self.fixture_dgp is not None:
+            return dict(self.fixture_dgp, head_block_number=head, head_block_id=self.block_id(head))
+        return {"id": 0, "head_block_number": head, "head_block_id": self.block_id(head),
+                "time": _time_string(self.block_time(head)),
+                "current_witness": self.accounts[head % len(self.accounts)],
+                "total_pow": 0, "num_pow_witnesses": 0,
+                "virtual_supply": "500000000.000 BLURT", "current_supply": "500000000.000 BLURT",
+                "total_vesting_fund_blurt": "250000000.000 BLURT",
+                "total_vesting_shares": "500000000000.000000 VESTS",
+                "total_reward_fund_blurt": "0.000 BLURT", "total_reward_shares2": "0",
+                "pending_rewarded_vesting_shares": "0.000000 VESTS",
+                "pending_rewarded_vesting_blurt": "0.000 BLURT",
+                "maximum_block_size": 65536, "required_actions_partition_percent": 0,
+                "current_aslot": head, "recent_slots_filled": "340282366920938463463374607431768211455",
+                "participation_count": 128, "last_irreversible_block_num": max(head - 15, 0),
+                "vote_power_reserve_rate": 10, "delegation_return_period": 432000,
+                "reverse_auction_seconds": 300, "available_account_subsidies": 0,
+                "next_maintenance_time": _time_string(self.block_time(head) + timedelta(hours=1)),
+                "last_budget_time": _time_string(self.block_time(head)),
+                "content_reward_percent": 6500, "vesting_reward_percent": 1500, "sps_fund_percent": 1000,
+                "sps_interval_ledger": "0.000 BLURT", "downvote_pool_percent": 2500}
+
+    def broadcast(self, transaction):
+        """Stores a broadcast transaction and returns its id and the block which will contain it"""
+        with self.lock:
+            trx_id = _hash("broadcast", json.dumps(transaction, sort_keys=True))
+            self.broadcasts.append(transaction)
+            self.pending.append({"id": trx_id, "transaction": transaction})
+            return trx_id, self.head_block_num + 1, len(self.pending) - 1
+
+
+class RPCMethodError(Exception):
+    pass
+
+
+def _condenser_args(args):
+    return list(args) if isinstance(args, (list, tuple)) else [args]
+
+
+class LocalNodeHandler(object):
+    """Answers JSON-RPC requests from a :class:`LocalChain` in the dialect of the request"""
+    def __init__(self, chain):
+        self.chain = chain
+
+    def parse_method(self, request):
+        """Returns api, method name, args and True for the appbase dialect"""
+        method = request.get("method", "")
+        params = request.get("params", [])
+        if method == "call":
+            api, name, args = params[0], params[1], params[2] if len(params) > 2 else []
+            return api, name, _condenser_args(args), False
+        if "." not in method:
+            raise RPCMethodError("Could not find method %s" % method)
+        api, name = method.split(".", 1)
+        if api == "condenser_api":
+            return api, name, _condenser_args(params), False
+        return api, name, params if isinstance(params, dict) else {}, True
+
+    def call(self, request):
+        api, name, args, appbase = self.parse_method(request)
+        if appbase:
+            if api not in APPBASE_METHODS.values():
+                raise RPCMethodError("Assert Exception:api_itr != _registered_apis.end(): Could not find API %s" % api)
+            if APPBASE_METHODS.get(name) != api:
+                raise RPCMethodError("Assert Exception:method_itr != api_itr->second.end(): Could not find method %s" % name)
+        elif name not in APPBASE_METHODS and name != "get_accounts":
+            raise RPCMethodError("Assert Exception:method_itr != api_itr->second.end(): Could not find method %s" % name)
+        return getattr(self, "_" + name)(args, appbase)
+
+    def _get_config(self, args, appbase):
+        return self.chain.config
+
+    def _get_dynamic_global_properties(self, args, appbase):
+        return self.chain.get_dynamic_global_properties()
+
+    def _get_block(self, args, appbase):
+        block = self.chain.get_block(int(args["block_num"] if appbase else args[0]))
+        if appbase:
+            return {"block": block} if block is not None else {}
+        return block
+
+    def _get_block_header(self, args, appbase):
+        block = self.chain.get_block(int(args["block_num"] if appbase else args[0]))
+        header = None
+        if block is not None:
+            header = dict((k, block[k]) for k in ["previous", "timestamp", "witness",
+                                                  "transaction_merkle_root", "extensions"])
+        if appbase:
+            return {"header": header} if header is not None else {}
+        return header
+
+    def _get_block_range(self, args, appbase):
+        start, count = (args["starting_block_num"], args["count"]) if appbase else (args[0], args[1])
+        blocks = []
+        for block_num in range(int(start), int(start) + int(count)):
+            block = self.chain.get_block(block_num)
+            if block is None:
+                break
+            blocks.append(block)
+        return {"blocks": blocks} if appbase else blocks
+
+    def _get_ops_in_block(self, args, appbase):
+        if appbase:
+            ops = self.chain.get_ops_in_block(int(args["block_num"]), args.get("only_virtual", False))
+            return {"ops": ops}
+        return self.chain.get_ops_in_block(int(args[0]), args[1] if len(args) > 1 else False)
+
+    def _enum_virtual_ops(self, args, appbase):
+        if appbase:
+            begin, end = int(args["block_range_begin"]), int(args["block_range_end"])
+            ops, next_begin, next_op = self.chain.enum_virtual_ops(begin, end, int(args.get("operation_begin", 0)),
+                                                                   int(args.get("limit", 150000)))
+            return {"ops": ops, "next_block_range_begin": next_begin, "next_operation_begin": next_op}
+        return self.chain.enum_virtual_ops(int(args[0]), int(args[1]))[0]
+
+    def _get_account_history(self, args, appbase):
+        from blurtbase.operationids import operations
+        if appbase:
+            account, start, limit = args["account"], args["start"], args["limit"]
+            low, high = args.get("operation_filter_low"), args.get("operation_filter_high")
+        else:
+            account, start, limit = args[0], args[1], args[2]
+            low, high = (args[3] if len(args) > 3 else None), (args[4] if len(args) > 4 else None)
+        operation_filter = None
+        if low or high:
+            bits = (int(high or 0) << 64) | int(low or 0)
+            operation_filter = set(name for name, op_id in operations.items() if bits & (1 << op_id))
+        history = self.chain.get_account_history(account, int(start), int(limit), operation_filter)
+        return {"history": history} if appbase else history
+
+    def _find_accounts(self, args, appbase):
+        accounts = [self.chain.get_account(name) for name in args.get("accounts", [])] if appbase else \
+            [self.chain.get_account(name) for name in args[0]]
+        accounts = [a for a in accounts if a is not None]
+        return {"accounts": accounts} if appbase else accounts
+
+    _get_accounts = _find_accounts
+
+    def _broadcast_transaction(self, args, appbase):
+        self.chain.broadcast(args["trx"] if appbase else args[0])
+        return {}
+
+    def _broadcast_transaction_synchronous(self, args, appbase):
+        trx_id, block_num, trx_num = self.chain.broadcast(args["trx"] if appbase else args[0])
+        return {"id": trx_id, "block_num": block_num, "trx_num": trx_num, "expired": False}
+
+    def reply(self, request):
+        """Returns the JSON-RPC reply of one request"""
+        try:
+            result = self.call(request)
+        except RPCMethodError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32003, "message": str(e)}}
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32602, "message": "Invalid parameters: %s" % str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def handle(self, payload):
+        if isinstance(payload, list):
+            return [self.reply(request) for request in payload]
+        return self.reply(payload)
+
+
+def _ws_read_frame(rfile):
+    """Returns fin flag, opcode and unmasked data of the next frame"""
+    header = rfile.read(2)
+    if len(header) < 2:
+        return True, None, None
+    fin = bool(header[0] & 0x80)
+    opcode = header[0] & 0x0f
+    length = header[1] & 0x7f
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if header[1] & 0x80 else None
+    data = rfile.read(length)
+    if mask is not None:
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return fin, opcode, data
+
+
+def _ws_frame(opcode, data):
+    length = len(data)
+    if length < 126:
+        header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + data
+
+
+class LocalNode(object):
+    """ In-process JSON-RPC node which serves a :class:`LocalChain`
+        over http and websocket on the same port
+
+        Requests are answered in the appbase or condenser dialect which
+        :func:`blurtapi.rpcutils.get_query` produces, batches are supported.
+        Served methods are ``get_config``, ``get_dynamic_global_properties``,
+        ``get_block``, ``get_block_header``, ``get_block_range``, ``get_ops_in_block``, ``enum_virtual_ops``,
+        ``get_account_history``, ``find_accounts`` (``get_accounts``) and
+        ``broadcast_transaction`` (``broadcast_transaction_synchronous``),
+        other methods return the "Could not find method" error of a node.
+
+        Faults are injected before a request is answered: ``error_rate`` and
+        ``throttle_rate`` are the probabilities of an HTTP ``error_status``
+        or an HTTP 429 reply with ``Retry-After``, ``rate_limit`` answers
+        requests above this number per second with HTTP 429 and
+        :meth:`inject` sets the replies of the next requests. Websocket
+        connections are closed instead. Random faults use ``seed``, so a run
+        can be repeated.
+
+        :param LocalChain chain: served chain (default is a new ``LocalChain()``)
+        :param float latency: seconds before each reply (default is 0)
+        :param float error_rate: share of requests which fail (default is 0)
+        :param int error_status: HTTP status of failed requests (default is 503)
+        :param float throttle_rate: share of requests which get HTTP 429 (default is 0)
+        :param float rate_limit: requests per second before HTTP 429, None for no limit (default is None)
+        :param float retry_after: ``Retry-After`` seconds of HTTP 429 replies (default is 1)
+        :param int seed: seed of the fault injection (default is 0)
+
+        .. code-block:: python
+
+            from blurtapi.localnode import LocalNode
+            from blurtapi.noderpc import NodeRPC
+            with LocalNode(latency=0.01) as node:
+                rpc = NodeRPC([node.url, node.ws_url])
+                print(rpc.get_block({"block_num": 1}, api="block"))
+
+    """
+    def __init__(self, chain=None, latency=0., error_rate=0., error_status=503, throttle_rate=0.,
+                 rate_limit=None, retry_after=1, seed=0, host="127.0.0.1", port=0):
+        self.chain = chain if chain is not None else LocalChain()
+        self.handler = LocalNodeHandler(self.chain)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.injected = []
+        self.window_start = time.time()
+        self.window_requests = 0
+        self.requests = 0
+        self.faults = 0
+        self.calls = {}
+        self.server = ThreadingHTTPServer((host, port), self._make_request_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://%s:%d" % self.server.server_address[:2]
+
+    @property
+    def ws_url(self):
+        return "ws://%s:%d" % self.server.server_address[:2]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def inject(self, status, count=1, retry_after=None):
+        """ Answers the next ``count`` requests with HTTP ``status`` (a
+            websocket connection is closed instead)
+
+            :param int status: HTTP status, e.g. 429, 502 or 503
+            :param int count: number of requests
+            :param float retry_after: ``Retry-After`` header of the replies
+        """
+        with self.lock:
+            self.injected.extend([(status, retry_after)] * count)
+
+    def get_stats(self):
+        """Returns the number of requests, injected faults and calls per method"""
+        with self.lock:
+            return {"requests": self.requests, "faults": self.faults, "calls": dict(self.calls)}
+
+    def _fault(self):
+        """Returns (status, retry_after) of an injected fault, or None"""
+        with self.lock:
+            self.requests += 1
+            fault = None
+            if self.injected:
+                fault = self.injected.pop(0)
+            elif self.rate_limit is not None:
+                now = time.time()
+                if now - self.window_start >= 1:
+                    self.window_start = now
+                    self.window_requests = 0
+                self.window_requests += 1
+                if self.window_requests > self.rate_limit:
+                    fault = (429, max(self.window_start + 1 - now, 0.))
+            if fault is None and self.throttle_rate and self.random.random() < self.throttle_rate:
+                fault = (429, self.retry_after)
+            if fault is None and self.error_rate and self.random.random() < self.error_rate:
+                fault = (self.error_status, None)
+            if fault is not None:
+                self.faults += 1
+            return fault
+
+    def _count_calls(self, payload):
+        with self.lock:
+            for request in payload if isinstance(payload, list) else [payload]:
+                if isinstance(request, dict):
+                    method = request.get("method", "")
+                    if method == "call" and len(request.get("params", [])) > 1:
+                        method = "%s.%s" % (request["params"][0], request["params"][1])
+                    self.calls[method] = self.calls.get(method, 0) + 1
+
+    def answer(self, body):
+        """Returns the encoded reply of an encoded request"""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return json.dumps({"jsonrpc": "2.0", "id": None,
+                               "error": {"code": -32700, "message": "Parse Error"}}).encode("utf-8")
+        self._count_calls(payload)
+        if self.latency:
+            time.sleep(self.latency)
+        return json.dumps(self.handler.handle(payload)).encode("utf-8")
+
+    def _make_request_handler(self):
+        node = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fault = node._fault()
+                if fault is not None:
+                    status, retry_after = fault
+                    data = ("<html><body><h1>%d</h1></body></html>" % status).encode("utf-8")
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header("Retry-After", "%d" % max(int(round(retry_after)), 0))
+                    self.send_header("Content-Type", "text/html")
+                else:
+                    data = node.answer(body)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.headers.get("Upgrade", "").lower() != "websocket":
+                    self.send_error(405)
+                    return
+                key = self.headers["Sec-WebSocket-Key"]
+                accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+                self.send_response(101)
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.wfile.flush()
+                self.close_connection = True
+                self.serve_websocket()
+
+            def serve_websocket(self):
+                send_lock = threading.Lock()
+                closed = threading.Event()
+
+                def send(opcode, data):
+                    with send_lock:
+                        try:
+                            self.wfile.write(_ws_frame(opcode, data))
+                            self.wfile.flush()
+                        except (OSError, ValueError):
+                            closed.set()
+
+                def answer(message):
+                    # requests are answered in parallel, as the multiplexed rpc expects
+                    if node._fault() is not None:
+                        closed.set()
+                        try:
+                            self.connection.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
+                        return
+                    send(0x1, node.answer(message))
+
+                message = b""
+                while not closed.is_set():
+                    try:
+                        fin, opcode, data = _ws_read_frame(self.rfile)
+                    except (OSError, ValueError, struct.error):
+                        break
+                    if opcode is None or opcode == 0x8:
+                        send(0x8, b"")
+                        break
+                    if opcode == 0x9:
+                        send(0xa, data)
+                    elif opcode in (0x0, 0x1, 0x2):
+                        message += data
+                        if not fin:
+                            continue
+                        threading.Thread(target=answer, args=(message,), daemon=True).start()
+                        message = b""
+
+            def log_message(self, *args):
+                pass
+
+        return RequestHandler
+
+
+def _serve(chain_kwargs, kwargs, port_queue):
+    node = LocalNode(chain=LocalChain(**chain_kwargs), **kwargs)
+    port_queue.put(node.server.server_address[1])
+    node.server.serve_forever()
+
+
+class LocalNodeProcess(object):
+    """ Runs a :class:`LocalNode` in a child process, so that the node does
+        not compete with the benchmarked client for the GIL
+
+        :param dict chain_kwargs: arguments of the :class:`LocalChain` of the node
+        :param kwargs: arguments of the :class:`LocalNode`
+    """
+    def __init__(self, chain_kwargs=None, **kwargs):
+        self.chain_kwargs = chain_kwargs or {}
+        self.kwargs = kwargs
+        self.process = None
+        self.port = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self.port
+
+    @property
+    def ws_url(self):
+        return "ws://127.0.0.1:%d" % self.port
+
+    def start(self):
+        port_queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=_serve, args=(self.chain_kwargs, self.kwargs, port_queue), daemon=True)
+        self.process.start()
+        self.port = port_queue.get(timeout=30)
+        return self
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
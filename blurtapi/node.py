@@ -2,32 +2,176 @@
 import json
 import re
 import time
+import random
+import threading
 import logging
+from contextlib import contextmanager
 from .exceptions import (
     UnauthorizedError, RPCConnection, RPCError, NumRetriesReached, CallRetriesReached
 )
+from .ratelimit import TokenBucket
 log = logging.getLogger(__name__)
 
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
 
 class Node(object):
+    """ Stores the URL of a node together with its error counts, an EWMA of
+        its latency and error rate and the state of its circuit breaker
+
+        :param str url: node url
+        :param float ewma_alpha: weight of the newest sample in the moving averages (default is 0.3)
+        :param int failure_threshold: consecutive failures which open the circuit (default is 3)
+        :param float backoff_base: seconds the circuit stays open after it opened the first time (default is 1)
+        :param float backoff_max: upper limit in seconds for the open circuit time (default is 60)
+        :param float rate_limit: requests per second sent to the node, None for no limit until
+            the node answers with HTTP 429 (default is None). See :class:`blurtapi.ratelimit.TokenBucket`.
+        :param int rate_burst: number of requests which can be sent at once (default is ``rate_limit``)
+
+        The open time doubles every time the circuit opens again without a
+        success in between and is jittered by +-50%. After it elapsed, the
+        circuit is half open and the node gets a single probe call: success
+        closes the circuit, failure opens it again.
+    """
     def __init__(
         self,
-        url
+        url,
+        ewma_alpha=0.3,
+        failure_threshold=3,
+        backoff_base=1.,
+        backoff_max=60.,
+        rate_limit=None,
+        rate_burst=None
     ):
         self.url = url
         self.error_cnt = 0
-        self.error_cnt_call = 0
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency = None
+        self.latency_is_bound = False
+        self.error_rate = 0.
+        self.success_cnt = 0
+        self.failure_cnt = 0
+        self.consecutive_failures = 0
+        self.circuit = CIRCUIT_CLOSED
+        self.circuit_open_cnt = 0
+        self.open_until = 0.
+        self.rate_limiter = TokenBucket(rate=rate_limit, burst=rate_burst)
 
     def __repr__(self):
         return self.url
 
+    def record_success(self, latency):
+        """Adds a successful call with ``latency`` seconds to the moving averages"""
+        if self.latency is None or self.latency_is_bound:
+            self.latency = latency
+            self.latency_is_bound = False
+        else:
+            self.latency += self.ewma_alpha * (latency - self.latency)
+        self.error_rate -= self.ewma_alpha * self.error_rate
+        self.success_cnt += 1
+        self.consecutive_failures = 0
+        if self.circuit != CIRCUIT_CLOSED:
+            log.info("Circuit of node %s is closed again" % self.url)
+        self.circuit = CIRCUIT_CLOSED
+        self.circuit_open_cnt = 0
+        self.rate_limiter.on_success()
+
+    def record_failure(self):
+        """Adds a failed call to the error rate and opens the circuit when needed"""
+        self.error_rate += self.ewma_alpha * (1. - self.error_rate)
+        self.failure_cnt += 1
+        self.consecutive_failures += 1
+        if self.circuit == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.open_circuit()
+
+    def open_circuit(self):
+        """Stops routing calls to this node for a jittered, exponentially growing time"""
+        backoff = min(self.backoff_base * 2 ** self.circuit_open_cnt, self.backoff_max)
+        backoff *= random.uniform(0.5, 1.5)
+        self.circuit = CIRCUIT_OPEN
+        self.circuit_open_cnt += 1
+        self.open_until = time.time() + backoff
+        log.warning("Circuit of node %s is open for %.1f s" % (self.url, backoff))
+
+    def is_available(self, now=None):
+        """Returns False while the circuit is open"""
+        if self.circuit != CIRCUIT_OPEN:
+            return True
+        if now is None:
+            now = time.time()
+        if now >= self.open_until:
+            self.circuit = CIRCUIT_HALF_OPEN
+            return True
+        return False
+
+    @property
+    def score(self):
+        """ Expected cost of a call in seconds, lower is better. Every failure
+            adds a penalty of up to one second, nodes without calls score 0.
+        """
+        if self.latency is None:
+            return self.error_rate
+        return self.latency * (1. + 10. * self.error_rate) + self.error_rate
+
+    def get_stats(self):
+        """Returns the scheduler data of this node as dict"""
+        return {"url": self.url, "score": self.score, "latency": self.latency,
+                "error_rate": self.error_rate, "circuit": self.circuit,
+                "success_cnt": self.success_cnt, "failure_cnt": self.failure_cnt,
+                "error_cnt": self.error_cnt, "rate_limit": self.rate_limiter.get_stats()}
+
 
 class Nodes(list):
-    """Stores Node URLs and error counts"""
-    def __init__(self, urls, num_retries, num_retries_call):
+    """ Stores Node URLs and error counts and selects the node for the next call
+
+        :param str/list urls: node urls
+        :param int num_retries: Try x times to num_retries to a node on disconnect, -1 for indefinitely
+        :param int num_retries_call: Repeat num_retries_call times a rpc call on node error
+        :param str node_selection: ``adaptive`` routes to the node with the best
+            latency and error rate and skips nodes with an open circuit breaker,
+            ``round_robin`` rotates through the urls in the given order on errors (default is ``round_robin``)
+        :param float switch_ratio: in adaptive mode, calls are moved to another node when the
+            current node scores worse than ``switch_ratio`` times the best node (default is 1.5)
+
+        The remaining keyword arguments are passed to :class:`Node`.
+
+        The node errors are shared by all threads. The call retry counter
+        (``error_cnt_call``) and the ``num_retries_call`` set with
+        :meth:`call_retries` belong to the calling thread, so a call from one
+        thread does not use up or change the retries of a call from another thread.
+
+        .. code-block:: python
+
+            >>> from blurtapi.node import Nodes
+            >>> nodes = Nodes(["https://node1.example", "https://node2.example"], 5, 5, node_selection="adaptive")
+            >>> next(nodes)
+            'https://node1.example'
+            >>> nodes.record_success(0.5)
+            >>> next(nodes)
+            'https://node2.example'
+            >>> nodes.record_success(0.1)
+            >>> next(nodes)
+            'https://node2.example'
+    """
+    def __init__(self, urls, num_retries, num_retries_call, node_selection="round_robin", switch_ratio=1.5, **kwargs):
+        if node_selection not in ["adaptive", "round_robin"]:
+            raise ValueError("node_selection must be 'adaptive' or 'round_robin'")
+        self.node_kwargs = {}
+        for key in ["ewma_alpha", "failure_threshold", "backoff_base", "backoff_max", "rate_limit", "rate_burst"]:
+            if key in kwargs:
+                self.node_kwargs[key] = kwargs[key]
+        self.lock = threading.RLock()
+        self._local = threading.local()
         self.set_node_urls(urls)
         self.num_retries = num_retries
         self.num_retries_call = num_retries_call
+        self.node_selection = node_selection
+        self.switch_ratio = switch_ratio
 
     def set_node_urls(self, urls):
         if isinstance(urls, str):
@@ -42,7 +186,7 @@ class Nodes(list):
             url_list = [urls]
         else:
             url_list = []        
-        super(Nodes, self).__init__([Node(x) for x in url_list])
+        super(Nodes, self).__init__([Node(x, **self.node_kwargs) for x in url_list])
         self.current_node_index = -1
         self.freeze_current_node = False        
 
@@ -53,6 +197,12 @@ class Nodes(list):
         next_node_count = 0
         if self.freeze_current_node:
             return self.url
+        if self.node_selection == "adaptive":
+            with self.lock:
+                index = self.best_node_index(wait=True)
+                if index is not None:
+                    self.current_node_index = index
+                return self.url
         while next_node_count == 0 and (self.num_retries < 0 or self.node.error_cnt < self.num_retries):
             self.current_node_index += 1
             if self.current_node_index >= self.working_nodes_count:
@@ -60,10 +210,131 @@ class Nodes(list):
             next_node_count += 1
             if next_node_count > self.working_nodes_count + 1:
                 raise StopIteration
+        # nodes which are cooling down after HTTP 429 are skipped, unless all nodes are
+        now = time.time()
+        n = self.working_nodes_count
+        if n > 1 and self.node.rate_limiter.cooling_down(now):
+            start = max(self.current_node_index, 0)
+            for i in range(1, n):
+                index = (start + i) % n
+                if not self[index].rate_limiter.cooling_down(now):
+                    self.current_node_index = index
+                    break
         return self.url
 
     next = __next__  # Python 2
 
+    def _is_working(self, node):
+        return self.num_retries < 0 or node.error_cnt <= self.num_retries
+
+    def best_node_index(self, wait=False, exclude=None):
+        """ Returns the index of the node with the best score and a closed
+            (or half open) circuit. Equal scores are resolved in round robin
+            order, starting after the current node.
+
+            :param bool wait: When True and all circuits are open, sleeps until
+                the first one is half open instead of returning None
+            :param int exclude: index of a node which must not be returned
+
+            Nodes which are cooling down after HTTP 429 are only returned
+            when all other nodes are cooling down, too.
+        """
+        with self.lock:
+            n = len(self)
+            if n == 0:
+                return None
+            working = [i for i in range(n) if self._is_working(self[i]) and i != exclude]
+            if len(working) == 0:
+                return None
+            now = time.time()
+            available = [i for i in working if self[i].is_available(now)]
+            if len(available) == 0:
+                if not wait:
+                    return None
+                first = min(working, key=lambda i: self[i].open_until)
+                sleeptime = self[first].open_until - now
+                if sleeptime > 0:
+                    log.warning("All nodes have an open circuit, waiting %.1f s for %s" % (sleeptime, self[first].url))
+                    time.sleep(sleeptime)
+                self[first].is_available()
+                return first
+            start = self.current_node_index + 1
+            return min(available, key=lambda i: (self[i].rate_limiter.cooling_down(now), self[i].score, (i - start) % n))
+
+    def has_uncooled_node(self):
+        """ Returns True when a working node other than the current one is not
+            cooling down after HTTP 429
+        """
+        if self.freeze_current_node:
+            return False
+        with self.lock:
+            now = time.time()
+            for i in range(len(self)):
+                if i != self.current_node_index and self._is_working(self[i]) and \
+                   not self[i].rate_limiter.cooling_down(now):
+                    return True
+            return False
+
+    def select_url(self, url):
+        """Makes the node with ``url`` the current node and returns its url"""
+        with self.lock:
+            for i in range(len(self)):
+                if self[i].url == url:
+                    self.current_node_index = i
+            return self.url
+
+    def select_node(self):
+        """ Moves to the best node when the current node is clearly worse
+            (adaptive mode only). Returns True, when the node was changed.
+        """
+        if self.node_selection != "adaptive" or self.freeze_current_node or len(self) < 2:
+            return False
+        with self.lock:
+            node = self.node
+            index = self.best_node_index()
+            if index is None or index == self.current_node_index:
+                return False
+            best = self[index]
+            if self.current_node_index >= 0 and node.is_available() and self._is_working(node) and \
+               (not node.rate_limiter.cooling_down() or best.rate_limiter.cooling_down()):
+                if node.latency is None or node.score <= best.score * self.switch_ratio:
+                    return False
+            log.debug("Switching from node %s to %s" % (node.url, best.url))
+            self.current_node_index = index
+            return True
+
+    def record_success(self, latency, node=None):
+        """Stores a successful call of ``latency`` seconds for ``node`` (default: current node)"""
+        if node is None:
+            node = self.node
+        if node is not None:
+            with self.lock:
+                node.record_success(latency)
+
+    def record_latency_bound(self, latency, url):
+        """ Sets the latency of the node with ``url`` to ``latency`` until the
+            first call is measured, when it has no measured latency yet
+        """
+        with self.lock:
+            for i in range(len(self)):
+                if self[i].url == url and self[i].latency is None:
+                    self[i].latency = latency
+                    self[i].latency_is_bound = True
+
+    def record_failure(self, node=None):
+        """Stores a failed call for ``node`` (default: current node)"""
+        if node is None:
+            node = self.node
+        if node is not None:
+            with self.lock:
+                node.record_failure()
+
+    def scores(self):
+        """Returns the live scheduler data of all nodes, best node first"""
+        with self.lock:
+            stats = [self[i].get_stats() for i in range(len(self))]
+        return sorted(stats, key=lambda s: (s["circuit"] == CIRCUIT_OPEN, s["score"]))
+
     def export_working_nodes(self):
         nodes_list = []
         for i in range(len(self)):
@@ -112,7 +383,40 @@ class Nodes(list):
     def error_cnt_call(self):
         if self.node is None:
             return 0
-        return self.node.error_cnt_call
+        return self._call_errors().get(self.node.url, 0)
+
+    @property
+    def num_retries_call(self):
+        """Retries of a call of the current thread, see :meth:`call_retries`"""
+        return getattr(self._local, "num_retries_call", self._num_retries_call)
+
+    @num_retries_call.setter
+    def num_retries_call(self, num_retries_call):
+        self._num_retries_call = num_retries_call
+
+    @contextmanager
+    def call_retries(self, num_retries_call=None):
+        """ Sets ``num_retries_call`` for the calls of the current thread inside
+            the ``with`` block, None keeps the current value
+        """
+        if num_retries_call is None:
+            yield
+            return
+        stored = getattr(self._local, "num_retries_call", None)
+        self._local.num_retries_call = num_retries_call
+        try:
+            yield
+        finally:
+            if stored is None:
+                del self._local.num_retries_call
+            else:
+                self._local.num_retries_call = stored
+
+    def _call_errors(self):
+        """Call error counts of the current thread by node url"""
+        if not hasattr(self._local, "error_cnt_call"):
+            self._local.error_cnt_call = {}
+        return self._local.error_cnt_call
 
     @property
     def num_retries_call_reached(self):
@@ -121,22 +425,24 @@ class Nodes(list):
     def disable_node(self):
         """Disable current node"""
         if self.node is not None and self.num_retries_call >= 0:
-            self.node.error_cnt_call = self.num_retries_call
+            self._call_errors()[self.node.url] = self.num_retries_call
 
     def increase_error_cnt(self):
         """Increase node error count for current node"""
         if self.node is not None:
             self.node.error_cnt += 1
+            self.record_failure()
 
     def increase_error_cnt_call(self):
         """Increase call error count for current node"""
         if self.node is not None:
-            self.node.error_cnt_call += 1
+            errors = self._call_errors()
+            errors[self.node.url] = errors.get(self.node.url, 0) + 1
 
     def reset_error_cnt_call(self):
         """Set call error count for current node to zero"""
         if self.node is not None:
-            self.node.error_cnt_call = 0
+            self._call_errors().pop(self.node.url, None)
 
     def reset_error_cnt(self):
         """Set node error count for current node to zero"""
@@ -36,18 +36,42 @@ class NodeRPC(GrapheneRPC):
 
         """
         super(NodeRPC, self).__init__(*args, **kwargs)
-        self.next_node_on_empty_reply = False
+
+    @property
+    def next_node_on_empty_reply(self):
+        """Switch to next node on empty reply for the next rpc call of the current thread"""
+        return getattr(self._local, "next_node_on_empty_reply", False)
+
+    @next_node_on_empty_reply.setter
+    def next_node_on_empty_reply(self, next_node_on_empty_reply):
+        self._local.next_node_on_empty_reply = next_node_on_empty_reply
 
     def set_next_node_on_empty_reply(self, next_node_on_empty_reply=True):
-        """Switch to next node on empty reply for the next rpc call"""
+        """Switch to next node on empty reply for the next rpc call of the current thread"""
         self.next_node_on_empty_reply = next_node_on_empty_reply
 
-    def rpcexec(self, payload):
+    def rpccall(self, name, *args, **kwargs):
+        """ Execute the rpc method ``name`` and return its result
+
+            In addition to :meth:`blurtapi.graphenerpc.GrapheneRPC.rpccall`, the keyword
+            ``next_node_on_empty_reply`` switches to the next node when this call
+            gets an empty reply.
+        """
+        if "next_node_on_empty_reply" not in kwargs:
+            return super(NodeRPC, self).rpccall(name, *args, **kwargs)
+        self.next_node_on_empty_reply = kwargs.pop("next_node_on_empty_reply")
+        try:
+            return super(NodeRPC, self).rpccall(name, *args, **kwargs)
+        finally:
+            self.next_node_on_empty_reply = False
+
+    def rpcexec(self, payload, raw=False):
         """ Execute a call by sending the payload.
             It makes use of the GrapheneRPC library.
             In here, we mostly deal with Blurt specific error handling
 
             :param json payload: Payload data
+            :param bool raw: When True, the decoded reply is returned as it is (default is False)
             :raises ValueError: if the server does not respond in proper JSON format
             :raises RPCError: if the server returns an error
         """
@@ -59,7 +83,7 @@ class NodeRPC(GrapheneRPC):
             doRetry = False
             try:
                 # Forward call to GrapheneWebsocketRPC and catch+evaluate errors
-                reply = super(NodeRPC, self).rpcexec(payload)
+                reply = super(NodeRPC, self).rpcexec(payload, raw=raw)
                 if self.next_node_on_empty_reply and not bool(reply) and self.nodes.working_nodes_count > 1:
                     self._retry_on_next_node("Empty Reply")
                     doRetry = True
@@ -79,6 +103,9 @@ class NodeRPC(GrapheneRPC):
                     else:
                         self.next_node_on_empty_reply = False
                         raise exceptions.CallRetriesReached
+            except exceptions.BatchedCallsNotSupported:
+                self.next_node_on_empty_reply = False
+                raise
             except exceptions.RPCError as e:
                 try:
                     doRetry = self._check_error_message(e, self.error_cnt_call)
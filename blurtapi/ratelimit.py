@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import collections
+import email.utils
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def parse_retry_after(value):
+    """ Returns the seconds of a ``Retry-After`` header, or None
+
+        .. code-block:: python
+
+            >>> parse_retry_after("3")
+            3.0
+            >>> parse_retry_after(None) is None
+            True
+
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(float(value), 0.)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    return max(date.timestamp() - time.time(), 0.)
+
+
+class TokenBucket(object):
+    """ Client side rate limiter of a node
+
+        Every request takes one token. Tokens are refilled with ``rate`` per
+        second up to ``burst``. Callers which have to wait are served in the
+        order in which they arrived.
+
+        Without a ``rate`` the bucket does not limit until the node answers
+        with HTTP 429. Then the bucket waits for the ``Retry-After`` time
+        (or ``cooldown`` seconds) and limits the node to ``decrease`` times
+        the rate at which it was called. Every successful call raises the
+        rate by ``increase`` requests per second again, up to the configured
+        ``rate``. A bucket without ``rate`` is unlimited again when the rate
+        reaches the rate at which the node was called before the 429.
+
+        :param float rate: requests per second, None for no limit (default is None)
+        :param int burst: maximum number of tokens (default is ``rate``, at least 1)
+        :param float min_rate: lower limit for the adapted rate (default is 0.2)
+        :param float increase: rate increase per successful call (default is 0.05)
+        :param float decrease: factor applied to the rate on HTTP 429 (default is 0.5)
+        :param float cooldown: seconds to wait after HTTP 429 without ``Retry-After`` (default is 1)
+
+        .. code-block:: python
+
+            >>> bucket = TokenBucket(rate=2, burst=2)
+            >>> bucket.try_acquire(), bucket.try_acquire(), bucket.try_acquire()
+            (True, True, False)
+
+    """
+    def __init__(self, rate=None, burst=None, min_rate=0.2, increase=0.05, decrease=0.5, cooldown=1.):
+        self.max_rate = rate
+        self.rate = rate
+        if burst is None:
+            burst = max(int(rate), 1) if rate is not None else 1
+        self.burst = burst
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = float(burst)
+        self.last_refill = time.time()
+        self.cooldown_until = 0.
+        self.recover_rate = None
+        self.throttled_cnt = 0
+        self.requests = collections.deque(maxlen=100)
+        self.condition = threading.Condition(threading.Lock())
+        self._next_ticket = 0
+        self._serving = 0
+
+    def _take(self, now):
+        """Takes a token and returns 0, or returns the seconds until a token is available"""
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.rate is None:
+            return 0
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Waits for a token, callers are served first come first served"""
+        with self.condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while True:
+                if ticket == self._serving:
+                    now = time.time()
+                    wait_time = self._take(now)
+                    if wait_time == 0:
+                        self._serving += 1
+                        self.requests.append(now)
+                        self.condition.notify_all()
+                        return
+                    self.condition.wait(wait_time)
+                else:
+                    self.condition.wait()
+
+    def try_acquire(self):
+        """Takes a token when one is available without waiting, returns True on success"""
+        with self.condition:
+            if self._next_ticket != self._serving:
+                return False
+            now = time.time()
+            if self._take(now) > 0:
+                return False
+            self.requests.append(now)
+            return True
+
+    def cooling_down(self, now=None):
+        """Returns True while the node has to be left alone after HTTP 429"""
+        if now is None:
+            now = time.time()
+        return now < self.cooldown_until
+
+    def _observed_rate(self, now):
+        if len(self.requests) < 2:
+            return self.min_rate
+        return len(self.requests) / max(now - self.requests[0], 1.)
+
+    def on_throttled(self, retry_after=None):
+        """ Adapts the bucket to a HTTP 429 reply
+
+            :param float retry_after: seconds from the ``Retry-After`` header
+        """
+        with self.condition:
+            now = time.time()
+            if retry_after is None:
+                retry_after = self.cooldown
+            self.cooldown_until = max(self.cooldown_until, now + retry_after)
+            if self.rate is None:
+                rate = self._observed_rate(now)
+                self.recover_rate = rate
+            else:
+                rate = self.rate
+            self.rate = max(self.min_rate, rate * self.decrease)
+            self.tokens = 0.
+            self.last_refill = self.cooldown_until
+            self.throttled_cnt += 1
+            self.condition.notify_all()
+        log.warning("Node is rate limited, waiting %.1f s and reducing the rate to %.2f requests/s" % (retry_after, self.rate))
+
+    def on_success(self):
+        """Raises an adapted rate again after a successful call"""
+        if self.rate is None or self.rate == self.max_rate:
+            return
+        with self.condition:
+            if self.rate is None:
+                return
+            self.rate += self.increase
+            if self.max_rate is not None:
+                self.rate = min(self.rate, self.max_rate)
+            elif self.recover_rate is None or self.rate >= self.recover_rate:
+                # the node had no limit before the 429
+                self.rate = None
+                self.recover_rate = None
+
+    def get_stats(self):
+        """Returns rate, burst, waiting callers, throttle count and remaining cooldown"""
+        with self.condition:
+            return {"rate": self.rate, "burst": self.burst,
+                    "waiting": self._next_ticket - self._serving,
+                    "throttled_cnt": self.throttled_cnt,
+                    "cooldown": max(self.cooldown_until - time.time(), 0.)}
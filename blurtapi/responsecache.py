@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+import collections
+import logging
+import sqlite3
+import threading
+import time
+from .codec import get_codec
+from .hedging import get_method_name
+from .rpcutils import get_call_key
+
+log = logging.getLogger(__name__)
+
+#: Methods whose result never changes once their block is irreversible
+IRREVERSIBLE_METHODS = frozenset([
+    "get_block", "get_block_header", "get_ops_in_block", "get_block_range",
+    "enum_virtual_ops", "get_transaction",
+])
+
+
+def get_call_params(query):
+    """ Returns the parameters of a JSON-RPC request without the api and method name
+
+        .. code-block:: python
+
+            >>> get_call_params({"method": "call", "params": ["condenser_api", "get_block", [1]]})
+            [1]
+            >>> get_call_params({"method": "block_api.get_block", "params": {"block_num": 1}})
+            {'block_num': 1}
+
+    """
+    params = query.get("params")
+    if query.get("method") == "call" and isinstance(params, list) and len(params) > 2:
+        return params[2]
+    return params
+
+
+def get_dependent_block_num(name, params, result):
+    """ Returns the highest block number the result of a call depends on,
+        or None when the result can not be cached.
+
+        :param str name: method name
+        :param params: call parameters, see :func:`get_call_params`
+        :param result: result of the call
+    """
+    if not result:
+        return None
+    if isinstance(params, list) and len(params) == 1 and isinstance(params[0], dict):
+        params = params[0]
+    try:
+        if name in ["get_block", "get_block_header", "get_ops_in_block"]:
+            if isinstance(params, dict):
+                return int(params["block_num"])
+            return int(params[0])
+        elif name == "get_block_range":
+            return int(params["starting_block_num"]) + int(params["count"]) - 1
+        elif name == "enum_virtual_ops":
+            return int(params["block_range_end"]) - 1
+        elif name == "get_transaction":
+            if isinstance(result, dict) and "block_num" in result:
+                return int(result["block_num"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        pass
+    return None
+
+
+class ResponseCache(object):
+    """ Caches replies of rpc calls whose data is irreversible
+
+        Blocks, their operations, block ranges, virtual operations and
+        included transactions never change once their block is below the
+        last irreversible block (LIB). Only such results are admitted. The
+        cache keeps the LIB up to date from the
+        ``get_dynamic_global_properties`` replies which pass through the rpc,
+        and refreshes it itself (at most every ``lib_refresh_interval``
+        seconds) when a result is newer than the known LIB.
+
+        Results are kept JSON encoded in a LRU memory tier of at most
+        ``max_bytes`` bytes, so every hit returns a fresh object. When
+        ``path`` is set, results are also stored in a SQLite file and
+        survive restarts. The keys contain the chain id of the node, so a
+        cache file can be shared by instances on different chains.
+
+        :param str path: SQLite file for the disk tier (default is None, memory only)
+        :param int max_bytes: size of the memory tier in bytes (default is 64 MiB)
+        :param float lib_refresh_interval: minimum seconds between two LIB refreshes (default is 3)
+
+        .. code-block:: python
+
+            from blurt import Blurt
+            from blurtpy.block import Block
+            blurt = Blurt(response_cache="blurtpy_cache.sqlite")
+            Block(1, blockchain_instance=blurt)
+            print(blurt.rpc.response_cache.stats())
+
+    """
+    def __init__(self, path=None, max_bytes=64 * 1024 * 1024, lib_refresh_interval=3.):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lib_refresh_interval = lib_refresh_interval
+        self.codec = get_codec()
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.last_irreversible_block_num = None
+        self.lib_time = 0
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "rejected": 0}
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB)")
+            self.db.commit()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_key(self, query, chain_id=None):
+        """ Returns the cache key of a JSON-RPC request, or None when its
+            method is never cached
+
+            :param dict query: JSON-RPC request
+            :param str chain_id: chain id of the node which answers the request (default is None)
+        """
+        if not isinstance(query, dict):
+            return None
+        api, name = get_method_name(query)
+        if name not in IRREVERSIBLE_METHODS:
+            return None
+        if chain_id is None:
+            return get_call_key(query)
+        return "%s:%s" % (chain_id, get_call_key(query))
+
+    def get(self, key):
+        """Returns ``(True, result)`` for a cached key and ``(False, None)`` otherwise"""
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+            elif self.db is not None:
+                row = self.db.execute("SELECT value FROM responses WHERE key = ?", (key, )).fetchone()
+                if row is not None:
+                    data = bytes(row[0])
+                    self._add(key, data)
+                    self.counters["disk_hits"] += 1
+            if data is None:
+                self.counters["misses"] += 1
+                return False, None
+        return True, self.codec.loads(data)
+
+    def update(self, query, result, rpc=None, chain_id=None):
+        """ Observes the result of a call and stores it when it is irreversible
+
+            :param dict query: JSON-RPC request
+            :param result: result of the call
+            :param GrapheneRPC rpc: used to refresh the LIB when the result is newer than the known LIB
+            :param str chain_id: chain id of the node which answered the request (default is None)
+        """
+        if not isinstance(query, dict):
+            return
+        api, name = get_method_name(query)
+        if name == "get_dynamic_global_properties":
+            if isinstance(result, dict) and "last_irreversible_block_num" in result:
+                self.set_last_irreversible_block_num(result["last_irreversible_block_num"])
+            return
+        if name not in IRREVERSIBLE_METHODS:
+            return
+        block_num = get_dependent_block_num(name, get_call_params(query), result)
+        if block_num is None:
+            return
+        if (self.last_irreversible_block_num is None or block_num > self.last_irreversible_block_num) and \
+           rpc is not None and time.time() - self.lib_time > self.lib_refresh_interval:
+            self.lib_time = time.time()
+            try:
+                rpc.rpccall("get_dynamic_global_properties", api="database")
+            except Exception as e:
+                log.debug("Could not refresh the last irreversible block: %s" % str(e))
+        if self.last_irreversible_block_num is None or block_num > self.last_irreversible_block_num:
+            with self.lock:
+                self.counters["rejected"] += 1
+            return
+        self.put(self.get_key(query, chain_id=chain_id), result)
+
+    def set_last_irreversible_block_num(self, block_num):
+        with self.lock:
+            self.lib_time = time.time()
+            if self.last_irreversible_block_num is None or block_num > self.last_irreversible_block_num:
+                self.last_irreversible_block_num = block_num
+
+    def put(self, key, result):
+        """Stores a result, the caller has to make sure that it is irreversible"""
+        data = self.codec.dumps(result)
+        with self.lock:
+            if key in self.entries:
+                return
+            self._add(key, data)
+            self.counters["stored"] += 1
+            if self.db is not None:
+                self.db.execute("INSERT OR IGNORE INTO responses (key, value) VALUES (?, ?)", (key, data))
+                self.db.commit()
+
+    def _add(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            old_key, old_data = self.entries.popitem(last=False)
+            self.size -= len(old_data)
+
+    def clear(self):
+        """Removes all entries from the memory and the disk tier"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            if self.db is not None:
+                self.db.execute("DELETE FROM responses")
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+                self.db = None
+
+    def stats(self):
+        """Returns hit, miss and store counters, the number of entries and the memory size"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.size
+            stats["last_irreversible_block_num"] = self.last_irreversible_block_num
+        return stats
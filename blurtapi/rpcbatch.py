@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import logging
+from concurrent.futures import Future
+from .exceptions import RPCError, BatchedCallsNotSupported
+
+log = logging.getLogger(__name__)
+
+
+def get_error_message(reply):
+    """Returns the error message of a JSON-RPC error reply"""
+    error = reply["error"]
+    if isinstance(error, dict):
+        if 'detail' in error:
+            return error['detail']
+        return error.get('message', str(error))
+    return str(error)
+
+
+class BatchCall(object):
+    """A single call inside a :class:`RPCBatch`"""
+    def __init__(self, name, query):
+        self.name = name
+        self.is_list = isinstance(query, list)
+        self.requests = query if self.is_list else [query]
+        self.future = Future()
+
+    @property
+    def query(self):
+        if self.is_list:
+            return self.requests
+        return self.requests[0]
+
+
+class RPCBatch(object):
+    """ Collects rpc calls and sends them as JSON-RPC batch requests
+
+        Each call returns a ``concurrent.futures.Future`` which is resolved
+        when the batch is executed, i.e. when the ``with`` block is left or
+        :meth:`execute` is called. Replies are mapped back to their call by
+        the JSON-RPC ``id``, so the order in which the node answers does not
+        matter.
+
+        * Calls are split into batches of at most ``chunk_size`` calls.
+        * A call with an error reply is sent again on its own, so that it is
+          retried and moved to another node like a single call. When it
+          fails again, only the future of this call fails.
+        * Nodes which reject batch requests are called one request after
+          another instead. When a batch fails for another reason, only its
+          calls are sent one by one.
+
+        The collected calls belong to the batch object and not to the rpc
+        instance, so different threads can run their own batches at the same
+        time.
+
+        :param GrapheneRPC rpc: rpc instance which is used to send the batches
+        :param int chunk_size: maximum number of calls per batch request (default is 50)
+
+        .. code-block:: python
+
+            from blurtapi.noderpc import NodeRPC
+            rpc = NodeRPC("https://rpc.beblurt.com")
+            with rpc.batch(chunk_size=100) as b:
+                futures = [b.get_block({"block_num": n}, api="block") for n in range(1, 1001)]
+            blocks = [f.result()["block"] for f in futures]
+
+    """
+    def __init__(self, rpc, chunk_size=50):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.rpc = rpc
+        self.chunk_size = chunk_size
+        self.calls = []
+        self.batch_supported = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            for call in self.calls:
+                call.future.cancel()
+            self.calls = []
+        return False
+
+    def __len__(self):
+        return len(self.calls)
+
+    def __getattr__(self, name):
+        """Map all methods to queued RPC calls and pass through the arguments."""
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.add_call(name, *args, **kwargs)
+        return method
+
+    def add_call(self, name, *args, **kwargs):
+        """ Queues the rpc method ``name`` and returns a future for its result
+
+            :param str name: rpc method name
+        """
+        call = BatchCall(name, self.rpc.build_query(name, args, kwargs))
+        cache = getattr(self.rpc, "response_cache", None)
+        if cache is not None:
+            cache_key = cache.get_key(call.query, chain_id=getattr(self.rpc, "chain_id", None))
+            if cache_key is not None:
+                found, result = cache.get(cache_key)
+                if found:
+                    call.future.set_result(result)
+                    return call.future
+        self.calls.append(call)
+        return call.future
+
+    def execute(self):
+        """Sends all queued calls and resolves their futures"""
+        calls, self.calls = self.calls, []
+        for i in range(0, len(calls), self.chunk_size):
+            chunk = calls[i:i + self.chunk_size]
+            if self.batch_supported:
+                self._execute_batch(chunk)
+            else:
+                self._execute_sequential(chunk)
+
+    def _execute_batch(self, chunk):
+        requests = []
+        for call in chunk:
+            for request in call.requests:
+                request["id"] = len(requests) + 1
+                requests.append(request)
+        try:
+            reply = self.rpc.rpcexec(requests, raw=True)
+        except BatchedCallsNotSupported as e:
+            log.warning("Batch requests are not supported, falling back to single calls: %s" % str(e))
+            reply = None
+        except RPCError as e:
+            log.warning("Batch request failed, sending its calls one by one: %s" % str(e))
+            self._execute_sequential(chunk)
+            return
+        except Exception as e:
+            for call in chunk:
+                call.future.set_exception(e)
+            return
+        if not isinstance(reply, list):
+            self.batch_supported = False
+            self._execute_sequential(chunk)
+            return
+
+        replies = {}
+        for r in reply:
+            if isinstance(r, dict):
+                replies[r.get("id")] = r
+        missing = []
+        failed = []
+        for call in chunk:
+            results = []
+            error = None
+            for request in call.requests:
+                r = replies.get(request["id"])
+                if r is None:
+                    break
+                if "error" in r:
+                    error = get_error_message(r)
+                    break
+                results.append(r.get("result"))
+            if error is not None:
+                log.debug("Batch call %s failed, sending it again: %s" % (call.name, error))
+                failed.append(call)
+            elif len(results) < len(call.requests):
+                missing.append(call)
+            elif call.is_list:
+                call.future.set_result(results)
+            else:
+                self._update_cache(call.query, results[0])
+                call.future.set_result(results[0])
+        if len(missing) > 0:
+            log.warning("%d calls were missing in the batch reply, sending them again" % len(missing))
+            self._execute_sequential(missing)
+        self._execute_sequential(failed)
+
+    def _update_cache(self, query, result):
+        cache = getattr(self.rpc, "response_cache", None)
+        if cache is not None:
+            cache.update(query, result, rpc=self.rpc, chain_id=getattr(self.rpc, "chain_id", None))
+
+    def _execute_sequential(self, chunk):
+        for call in chunk:
+            try:
+                result = self.rpc.rpcexec(call.query)
+                self._update_cache(call.query, result)
+                call.future.set_result(result)
+            except Exception as e:
+                call.future.set_exception(e)
@@ -22,6 +22,19 @@ def is_network_appbase_ready(props):
         return False
 
 
+def get_call_key(query):
+    """ Returns a key which is the same for all requests of the same method
+        and parameters, independent of the request id
+
+        .. code-block:: python
+
+            >>> get_call_key({"method": "call", "params": ["condenser_api", "get_block", [1]], "id": 3})
+            '["call",["condenser_api","get_block",[1]]]'
+
+    """
+    return json.dumps([query.get("method"), query.get("params")], sort_keys=True, separators=(",", ":"))
+
+
 def get_query(appbase, request_id, api_name, name, args):
     query = []
     if not appbase or api_name == "condenser_api":
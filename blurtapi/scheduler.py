@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from collections import deque
+
+from .telemetry import Histogram, LATENCY_BUCKETS
+
+log = logging.getLogger(__name__)
+
+#: Priority classes, from the highest to the lowest priority
+PRIORITIES = ("interactive", "normal", "bulk")
+#: Default number of requests per class which are sent at the same time
+DEFAULT_LIMITS = {"interactive": 8, "normal": 4, "bulk": 2}
+
+
+class Ticket(object):
+    """Admission of one request, returned by :meth:`PriorityScheduler.acquire`"""
+    __slots__ = ["priority", "enqueued", "started"]
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.enqueued = time.time()
+        self.started = None
+
+
+class PriorityStats(object):
+    """Queue depth and latency counters of one priority class"""
+    def __init__(self):
+        self.wait = Histogram(LATENCY_BUCKETS)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.max_queued = 0
+        self.completed = 0
+
+    def snapshot(self):
+        return {"wait": self.wait.snapshot(), "latency": self.latency.snapshot(),
+                "max_queued": self.max_queued, "completed": self.completed}
+
+
+class PriorityScheduler(object):
+    """ Admission control for rpc requests with the priority classes
+        ``interactive``, ``normal`` and ``bulk``
+
+        Every request waits in the queue of its class until it may be sent:
+
+        * each class has its own limit of requests in flight
+        * ``max_in_flight`` limits the requests of all classes together
+        * a request is not started while a request of a higher class is waiting
+        * while interactive or normal requests are queued or in flight, at most
+          ``bulk_limit_busy`` bulk requests are sent at the same time
+
+        Bulk work is preempted at request boundaries: a running request is never
+        interrupted, but queued bulk requests, and the remaining chunks of a bulk
+        :meth:`blurtapi.graphenerpc.GrapheneRPC.batch`, wait until the higher
+        priority requests got their turn. Requests of the same class are started
+        in arrival order.
+
+        Enable it with ``GrapheneRPC(..., scheduler=True)`` or pass an instance,
+        which can be shared between rpc instances. The priority of a call is
+        ``normal`` unless it is set per call or for a block of code:
+
+        .. code-block:: python
+
+            from blurtapi.noderpc import NodeRPC
+            rpc = NodeRPC("https://rpc.beblurt.com", scheduler=True)
+            rpc.get_dynamic_global_properties(api="database", priority="interactive")
+            with rpc.priority("bulk"):
+                rpc.get_block({"block_num": 1}, api="block")
+            print(rpc.scheduler.stats())
+
+        :param dict limits: requests in flight per class, missing classes use
+            :data:`DEFAULT_LIMITS`
+        :param int max_in_flight: requests in flight of all classes together (default is None, no limit)
+        :param int bulk_limit_busy: bulk requests in flight while higher priority requests
+            are active (default is 1)
+
+    """
+    def __init__(self, limits=None, max_in_flight=None, bulk_limit_busy=1):
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits is not None:
+            for priority in limits:
+                if priority not in PRIORITIES:
+                    raise ValueError("Unknown priority %s" % str(priority))
+                self.limits[priority] = limits[priority]
+        for priority in PRIORITIES:
+            if self.limits[priority] < 1:
+                raise ValueError("The limit of %s must be at least 1" % priority)
+        self.max_in_flight = max_in_flight
+        self.bulk_limit_busy = max(1, bulk_limit_busy)
+        self.condition = threading.Condition()
+        self.queues = dict((priority, deque()) for priority in PRIORITIES)
+        self.in_flight = dict((priority, 0) for priority in PRIORITIES)
+        self.priority_stats = dict((priority, PriorityStats()) for priority in PRIORITIES)
+
+    def _limit(self, priority):
+        limit = self.limits[priority]
+        if priority == "bulk":
+            for higher in PRIORITIES[:-1]:
+                if self.in_flight[higher] > 0 or len(self.queues[higher]) > 0:
+                    return min(limit, self.bulk_limit_busy)
+        return limit
+
+    def _can_start(self, ticket):
+        priority = ticket.priority
+        if self.queues[priority][0] is not ticket:
+            return False
+        if self.in_flight[priority] >= self._limit(priority):
+            return False
+        if self.max_in_flight is not None and sum(self.in_flight.values()) >= self.max_in_flight:
+            return False
+        for higher in PRIORITIES[:PRIORITIES.index(priority)]:
+            if len(self.queues[higher]) > 0:
+                return False
+        return True
+
+    def acquire(self, priority="normal"):
+        """ Waits until a request of the class ``priority`` may be sent
+
+            :param str priority: ``interactive``, ``normal`` or ``bulk``
+            :returns: :class:`Ticket` which has to be passed to :meth:`release`
+        """
+        if priority not in PRIORITIES:
+            raise ValueError("Unknown priority %s" % str(priority))
+        ticket = Ticket(priority)
+        with self.condition:
+            queue = self.queues[priority]
+            queue.append(ticket)
+            stats = self.priority_stats[priority]
+            stats.max_queued = max(stats.max_queued, len(queue))
+            while not self._can_start(ticket):
+                self.condition.wait()
+            queue.popleft()
+            self.in_flight[priority] += 1
+            ticket.started = time.time()
+            stats.wait.observe(ticket.started - ticket.enqueued)
+            # the next request of this class may be allowed to start as well
+            self.condition.notify_all()
+        return ticket
+
+    def release(self, ticket):
+        """Marks the request of ``ticket`` as finished"""
+        with self.condition:
+            self.in_flight[ticket.priority] -= 1
+            stats = self.priority_stats[ticket.priority]
+            stats.latency.observe(time.time() - ticket.started)
+            stats.completed += 1
+            self.condition.notify_all()
+
+    def stats(self):
+        """ Returns the limit, the queue depth, the requests in flight and the
+            wait time and latency histograms (in seconds) of each class
+        """
+        with self.condition:
+            ret = {}
+            for priority in PRIORITIES:
+                stats = self.priority_stats[priority].snapshot()
+                stats["limit"] = self.limits[priority]
+                stats["queued"] = len(self.queues[priority])
+                stats["in_flight"] = self.in_flight[priority]
+                ret[priority] = stats
+            return ret
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import copy
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class Flight(object):
+    """A call which is in flight and the callers waiting for it"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """ Coalesces concurrent identical calls
+
+        While a call for ``key`` is in flight, all other callers with the same
+        key wait for its result instead of sending their own request. Each
+        waiter gets its own deep copy of the result, so callers can change it
+        without affecting each other. An exception is raised in all callers.
+
+        .. code-block:: python
+
+            >>> flights = SingleFlight()
+            >>> flights.do("get_config", lambda: {"BLURT_CHAIN_ID": "cd8d"})
+            {'BLURT_CHAIN_ID': 'cd8d'}
+            >>> flights.stats()["misses"]
+            1
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def in_flight(self):
+        """Number of distinct calls which are in flight"""
+        with self.lock:
+            return len(self.flights)
+
+    def do(self, key, func, *args, **kwargs):
+        """ Returns ``func(*args, **kwargs)``, or the result of the call with the
+            same ``key`` which is already in flight
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.hits += 1
+                leader = False
+            else:
+                flight = Flight()
+                self.flights[key] = flight
+                self.misses += 1
+                leader = True
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.event.set()
+        if flight.waiters > 0:
+            # waiters copy the result, the leader must not change it before
+            return copy.deepcopy(flight.result)
+        return flight.result
+
+    def stats(self):
+        """Returns the number of coalesced calls (hits) and sent calls (misses)"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.}
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+import codecs
+import json
+import logging
+import re
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+log = logging.getLogger(__name__)
+
+#: Size of the chunks which are read from a streamed reply
+CHUNK_SIZE = 65536
+
+_TOKEN = re.compile(r'\s*(?:([\[\]{}:,])|"((?:[^"\\]|\\.)*)"|([-+0-9.eE]+|true|false|null))', re.S)
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+class ArrayNotFound(ValueError):
+    """The reply has no array at the requested path, e.g. because it is an error reply"""
+    def __init__(self, path, document=None):
+        self.path = path
+        self.document = document
+        super(ArrayNotFound, self).__init__("No array at %s in the reply" % ".".join(path))
+
+
+class Projection(object):
+    """ Keeps only the given fields of decoded replies
+
+        The spec is a list of dotted field paths or a nested dict in which
+        ``True`` keeps the whole value. Lists are projected element by element.
+
+        .. code-block:: python
+
+            >>> p = Projection(["block_id", "transactions.operations"])
+            >>> p.spec
+            {'block_id': True, 'transactions': {'operations': True}}
+            >>> p.apply({"block_id": "01", "witness": "a", "transactions": [{"operations": [], "signatures": []}]})
+            {'block_id': '01', 'transactions': [{'operations': []}]}
+
+        :param list/dict spec: fields to keep
+
+    """
+    def __init__(self, spec):
+        if isinstance(spec, Projection):
+            spec = spec.spec
+        self.spec = self._build(spec)
+
+    @classmethod
+    def _build(cls, spec):
+        if spec is True:
+            return True
+        if isinstance(spec, dict):
+            return dict((key, cls._build(value)) for key, value in spec.items())
+        if isinstance(spec, (list, tuple, set)):
+            ret = {}
+            for path in spec:
+                node = ret
+                keys = path.split(".")
+                for key in keys[:-1]:
+                    if node.get(key) is True:
+                        break
+                    node = node.setdefault(key, {})
+                else:
+                    node[keys[-1]] = True
+            return ret
+        raise ValueError("Projection spec must be a list of field paths or a dict")
+
+    def include(self, *paths):
+        """Returns a new projection which keeps ``paths`` in addition"""
+        spec = Projection(list(paths)).spec
+        return Projection(_merge(self.spec, spec))
+
+    def apply(self, obj):
+        """Returns ``obj`` with the fields of the spec only"""
+        return _project(obj, self.spec)
+
+
+def _merge(spec, other):
+    if spec is True or other is True:
+        return True
+    ret = dict(spec)
+    for key, value in other.items():
+        ret[key] = _merge(ret[key], value) if key in ret else value
+    return ret
+
+
+def _project(obj, spec):
+    if spec is True:
+        return obj
+    if isinstance(obj, list):
+        return [_project(o, spec) for o in obj]
+    if isinstance(obj, dict):
+        return dict((key, _project(obj[key], value)) for key, value in spec.items() if key in obj)
+    return obj
+
+
+def get_path(document, path):
+    """Returns the value at ``path`` of a decoded reply, None when it does not exist"""
+    for key in path:
+        if not isinstance(document, dict) or key not in document:
+            return None
+        document = document[key]
+    return document
+
+
+def iter_json_array(chunks, path=("result",), projection=None, parser=None):
+    """ Yields the elements of the JSON array at ``path`` one at a time while
+        the document is read from ``chunks``
+
+        Only the element which is decoded, the unread rest of the current
+        chunk and the document before the array are held in memory, so the
+        peak memory does not depend on the length of the array.
+
+        :param chunks: iterable of ``bytes``, e.g. ``response.iter_content(CHUNK_SIZE)``
+        :param tuple path: keys of the array, ``()`` for a top level array (default is ``("result",)``)
+        :param Projection projection: applied to each element (default is None)
+        :param str parser: ``ijson`` or ``json``. When not set, ``ijson`` is used when it is installed.
+        :raises ArrayNotFound: when the document has no array at ``path``, the decoded
+            document is available as ``document`` when it is small enough to be kept
+    """
+    if parser is None:
+        parser = "ijson" if ijson is not None else "json"
+    if parser == "ijson":
+        if ijson is None:
+            raise ImportError("ijson is not installed")
+        items = _iter_ijson(chunks, path)
+    elif parser == "json":
+        items = _iter_json(chunks, path)
+    else:
+        raise ValueError("Unknown parser %s, use ijson or json" % parser)
+    for item in items:
+        if projection is not None:
+            item = projection.apply(item)
+        yield item
+
+
+class _ChunkReader(object):
+    """File like object on byte chunks, keeps what was read until the first element was decoded"""
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.record = []
+
+    def read(self, size=-1):
+        if size == 0:
+            return b""
+        for chunk in self.chunks:
+            if chunk:
+                if self.record is not None:
+                    self.record.append(chunk)
+                return chunk
+        return b""
+
+
+def _iter_ijson(chunks, path):
+    reader = _ChunkReader(chunks)
+    prefix = ".".join(list(path) + ["item"])
+    found = False
+    for item in ijson.items(reader, prefix, use_float=True):
+        found = True
+        reader.record = None
+        yield item
+    if not found:
+        # nothing was yielded, the document is small enough to check it
+        document = json.loads(b"".join(reader.record), strict=False)
+        array = document if len(path) == 0 else get_path(document, path)
+        if not isinstance(array, list):
+            raise ArrayNotFound(path, document)
+
+
+def _iter_json(chunks, path):
+    decoder = json.JSONDecoder(strict=False)
+    text_decoder = codecs.getincrementaldecoder("utf8")()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    final = False
+    # find the start of the array
+    stack = []
+    expect_key = False
+    found = False
+    while not found:
+        match = _TOKEN.match(buffer, pos)
+        if match is None or (match.end() == len(buffer) and match.group(3) is not None and not final):
+            if final:
+                document = None
+                try:
+                    document = json.loads(buffer, strict=False)
+                except ValueError:
+                    pass
+                raise ArrayNotFound(path, document)
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+                buffer += text_decoder.decode(b"", final=True)
+            else:
+                buffer += text_decoder.decode(chunk)
+            continue
+        pos = match.end()
+        token, key = match.group(1), match.group(2)
+        if token == "{":
+            stack.append(None)
+            expect_key = True
+        elif token == "[":
+            if tuple(stack) == tuple(path):
+                found = True
+            else:
+                # keys of arrays never match the path
+                stack.append(0)
+        elif token in ("}", "]"):
+            stack.pop()
+        elif token == ",":
+            expect_key = len(stack) > 0 and stack[-1] != 0
+        elif token == ":":
+            expect_key = False
+        elif key is not None and expect_key:
+            stack[-1] = json.loads('"%s"' % key)
+    # decode the elements one by one
+    retry_len = 0
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer) and (len(buffer) >= retry_len or final):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if final:
+                    raise
+                # read until the unparsed part has doubled before trying again
+                retry_len = len(buffer) + (len(buffer) - pos)
+            else:
+                if end < len(buffer) or final:
+                    yield item
+                    buffer = buffer[end:]
+                    pos = 0
+                    retry_len = 0
+                    continue
+        elif final:
+            raise ValueError("Incomplete JSON document")
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+            buffer += text_decoder.decode(b"", final=True)
+        else:
+            buffer += text_decoder.decode(chunk)
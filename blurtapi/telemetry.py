@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import bisect
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+#: Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+#: Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram(object):
+    """ Cumulative histogram in the Prometheus sense
+
+        .. code-block:: python
+
+            >>> h = Histogram((1, 5))
+            >>> h.observe(0.5)
+            >>> h.observe(3)
+            >>> h.snapshot()
+            {'buckets': {1: 1, 5: 2, '+Inf': 2}, 'count': 2, 'sum': 3.5}
+
+    """
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            buckets[bound] = total
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class MethodStats(object):
+    """Counters of one rpc method on one node"""
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.requests = 0
+        self.errors = {}
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def snapshot(self):
+        return {"latency": self.latency.snapshot(), "requests": self.requests,
+                "errors": dict(self.errors), "retries": self.retries,
+                "request_bytes": self.request_bytes, "response_bytes": self.response_bytes}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{%s}" % ",".join('%s="%s"' % (k, _escape(v)) for k, v in sorted(labels.items()))
+
+
+class Telemetry(object):
+    """ Records latency histograms, byte counts, errors, retries, failovers
+        and batch sizes of the rpc calls per method and node
+
+        Enable it with ``GrapheneRPC(..., telemetry=True)`` or pass an
+        instance, which can be shared between rpc instances. When telemetry
+        is not enabled, the rpc does not call into this class at all.
+
+        Hooks are called with the event name (``request``, ``error``,
+        ``retry`` or ``failover``) and a dict with the event data, e.g. to
+        forward the data to another metrics system. Exceptions in hooks are
+        logged and ignored.
+
+        .. code-block:: python
+
+            from blurtapi.noderpc import NodeRPC
+            rpc = NodeRPC("https://rpc.beblurt.com", telemetry=True)
+            rpc.telemetry.add_hook(lambda event, data: print(event, data))
+            rpc.get_dynamic_global_properties(api="database")
+            print(rpc.telemetry.snapshot())
+            print(rpc.telemetry.to_prometheus())
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods = {}
+        self.failovers = {}
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.hooks = []
+
+    def add_hook(self, hook):
+        """Registers ``hook(event, data)``"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _call_hooks(self, event, data):
+        for hook in self.hooks:
+            try:
+                hook(event, data)
+            except Exception as e:
+                log.warning("Telemetry hook %s failed: %s" % (str(hook), str(e)))
+
+    def _stats(self, method, node):
+        key = (method, node)
+        stats = self.methods.get(key)
+        if stats is None:
+            stats = MethodStats()
+            self.methods[key] = stats
+        return stats
+
+    def record_request(self, method, node, latency, request_bytes=0, response_bytes=0, batch_size=None):
+        """ Records a completed request
+
+            :param str method: rpc method, ``batch`` for batch requests
+            :param str node: node url
+            :param float latency: seconds from sending the request to receiving the reply
+            :param int request_bytes: size of the request
+            :param int response_bytes: size of the reply
+            :param int batch_size: number of calls in a batch request
+        """
+        with self.lock:
+            stats = self._stats(method, node)
+            stats.requests += 1
+            stats.latency.observe(latency)
+            stats.request_bytes += request_bytes
+            stats.response_bytes += response_bytes
+            if batch_size is not None:
+                self.batch_sizes.observe(batch_size)
+        if self.hooks:
+            self._call_hooks("request", {"method": method, "node": node, "latency": latency,
+                                         "request_bytes": request_bytes, "response_bytes": response_bytes,
+                                         "batch_size": batch_size})
+
+    def record_error(self, method, node, error):
+        """Records a failed request, ``error`` is the exception or its name"""
+        if isinstance(error, BaseException):
+            error = error.__class__.__name__
+        with self.lock:
+            stats = self._stats(method, node)
+            stats.errors[error] = stats.errors.get(error, 0) + 1
+        if self.hooks:
+            self._call_hooks("error", {"method": method, "node": node, "error": error})
+
+    def record_retry(self, method, node):
+        """Records that a request is sent again"""
+        with self.lock:
+            self._stats(method, node).retries += 1
+        if self.hooks:
+            self._call_hooks("retry", {"method": method, "node": node})
+
+    def record_failover(self, from_node, to_node):
+        """Records a switch from one node to another"""
+        with self.lock:
+            key = (from_node, to_node)
+            self.failovers[key] = self.failovers.get(key, 0) + 1
+        if self.hooks:
+            self._call_hooks("failover", {"from_node": from_node, "to_node": to_node})
+
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+            self.failovers = {}
+            self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    def snapshot(self):
+        """ Returns all data as dict:
+            ``{"methods": {method: {node: stats}}, "failovers": [...], "batch_sizes": histogram}``
+        """
+        with self.lock:
+            methods = {}
+            for (method, node), stats in self.methods.items():
+                methods.setdefault(method, {})[node] = stats.snapshot()
+            failovers = [{"from_node": k[0], "to_node": k[1], "count": v} for k, v in self.failovers.items()]
+            return {"methods": methods, "failovers": failovers, "batch_sizes": self.batch_sizes.snapshot()}
+
+    def to_prometheus(self, prefix="blurtpy_rpc"):
+        """Returns all data in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def add_histogram(name, labels, histogram):
+            for bound, count in histogram["buckets"].items():
+                lines.append("%s_bucket%s %d" % (name, _labels(le=bound, **labels), count))
+            lines.append("%s_sum%s %s" % (name, _labels(**labels), repr(float(histogram["sum"]))))
+            lines.append("%s_count%s %d" % (name, _labels(**labels), histogram["count"]))
+
+        counters = [
+            ("requests_total", "Number of requests", "requests"),
+            ("retries_total", "Number of repeated requests", "retries"),
+            ("request_bytes_total", "Bytes sent", "request_bytes"),
+            ("response_bytes_total", "Bytes received", "response_bytes"),
+        ]
+        lines.append("# HELP %s_request_duration_seconds Request latency" % prefix)
+        lines.append("# TYPE %s_request_duration_seconds histogram" % prefix)
+        for method, nodes in sorted(snapshot["methods"].items()):
+            for node, stats in sorted(nodes.items()):
+                add_histogram("%s_request_duration_seconds" % prefix, {"method": method, "node": node}, stats["latency"])
+        for name, help_text, key in counters:
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s counter" % (prefix, name))
+            for method, nodes in sorted(snapshot["methods"].items()):
+                for node, stats in sorted(nodes.items()):
+                    lines.append("%s_%s%s %d" % (prefix, name, _labels(method=method, node=node), stats[key]))
+        lines.append("# HELP %s_errors_total Number of failed requests" % prefix)
+        lines.append("# TYPE %s_errors_total counter" % prefix)
+        for method, nodes in sorted(snapshot["methods"].items()):
+            for node, stats in sorted(nodes.items()):
+                for error, count in sorted(stats["errors"].items()):
+                    lines.append("%s_errors_total%s %d" % (prefix, _labels(method=method, node=node, error=error), count))
+        lines.append("# HELP %s_failovers_total Number of node switches" % prefix)
+        lines.append("# TYPE %s_failovers_total counter" % prefix)
+        for failover in snapshot["failovers"]:
+            lines.append("%s_failovers_total%s %d" % (prefix, _labels(from_node=failover["from_node"], to_node=failover["to_node"]), failover["count"]))
+        lines.append("# HELP %s_batch_size Number of calls per batch request" % prefix)
+        lines.append("# TYPE %s_batch_size histogram" % prefix)
+        add_histogram("%s_batch_size" % prefix, {}, snapshot["batch_sizes"])
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import itertools
+import logging
+import threading
+import time
+from .exceptions import RPCConnection
+from .codec import get_codec
+WEBSOCKET_MODULE = None
+if not WEBSOCKET_MODULE:
+    try:
+        from websocket._exceptions import WebSocketConnectionClosedException, WebSocketTimeoutException
+        WEBSOCKET_MODULE = "websocket"
+    except ImportError:
+        WEBSOCKET_MODULE = None
+
+log = logging.getLogger(__name__)
+
+
+class PendingCall(object):
+    """A request which waits for its reply on a multiplexed websocket"""
+    def __init__(self, ids, original_ids, data):
+        self.ids = ids
+        self.original_ids = original_ids
+        self.data = data
+        self.reply = None
+        self.error = None
+        self.event = threading.Event()
+
+    def set_reply(self, reply):
+        self.reply = reply
+        self.event.set()
+
+    def set_error(self, error):
+        self.error = error
+        self.event.set()
+
+
+class WebsocketMultiplexer(object):
+    """ Pipelines many JSON-RPC calls over one websocket
+
+        A background reader thread receives all replies and hands each one to
+        the caller waiting for its JSON-RPC ``id``, so any number of threads
+        can have calls outstanding on the same socket. Request ids are
+        replaced by the multiplexer on the wire, which keeps them unique on
+        the socket even when several batches are sent at the same time; the
+        caller gets its own ids back in the reply.
+
+        When the connection is closed by the server, the socket is
+        reconnected and all pending requests are sent again. When this
+        fails ``max_reconnects`` times in a row, the waiting calls raise
+        ``WebSocketConnectionClosedException`` and failover is left to
+        :class:`blurtapi.graphenerpc.GrapheneRPC`.
+
+        :param websocket.WebSocket ws: connected websocket (``enable_multithread=True``)
+        :param str url: websocket url, used for reconnects
+        :param int timeout: seconds a call waits for its reply (default is 60)
+        :param int max_reconnects: reconnect attempts before giving up (default is 3)
+        :param JSONCodec codec: codec for requests and replies, see :mod:`blurtapi.codec`
+
+        .. code-block:: python
+
+            from blurtapi.graphenerpc import GrapheneRPC
+            rpc = GrapheneRPC("wss://rpc.blurt.blog", ws_multiplex=True)
+
+    """
+    def __init__(self, ws, url, timeout=60, max_reconnects=3, codec=None):
+        self.ws = ws
+        self.codec = get_codec(codec)
+        self.url = url
+        self.timeout = timeout
+        self.max_reconnects = max_reconnects
+        self.reconnect_cnt = 0
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._broken = None
+        self._reader = threading.Thread(target=self._read_loop, name="ws-multiplexer-reader")
+        self._reader.daemon = True
+        self._reader.start()
+
+    @property
+    def pending_count(self):
+        """Number of calls which are waiting for their reply"""
+        with self._lock:
+            return len(set(id(p) for p in self._pending.values()))
+
+    def call(self, payload):
+        """ Sends a JSON-RPC request (or a list of requests) and waits for the reply
+
+            :param dict/list payload: JSON-RPC request or batch
+            :returns: the decoded reply
+        """
+        if self._broken is not None:
+            raise self._broken
+        if self._closed:
+            raise RPCConnection("Websocket multiplexer is closed!")
+        if isinstance(payload, list):
+            payload = [dict(p) for p in payload]
+            requests = payload
+        else:
+            payload = dict(payload)
+            requests = [payload]
+        with self._lock:
+            ids = []
+            original_ids = {}
+            for p in requests:
+                request_id = next(self._ids)
+                original_ids[request_id] = p.get("id")
+                p["id"] = request_id
+                ids.append(request_id)
+            pending = PendingCall(ids, original_ids, self.codec.dumps(payload))
+            for i in ids:
+                self._pending[i] = pending
+        try:
+            with self._send_lock:
+                self.ws.send(pending.data)
+        except Exception as e:
+            # The reader reconnects and re-issues the call, unless the socket is gone for good
+            log.debug("Sending on websocket failed: %s" % str(e))
+        if not pending.event.wait(self.timeout):
+            self._discard(pending)
+            raise WebSocketTimeoutException("No reply within %d seconds" % self.timeout)
+        if pending.error is not None:
+            raise pending.error
+        return pending.reply
+
+    def close(self):
+        """Stops the reader thread and closes the socket"""
+        self._closed = True
+        try:
+            self.ws.shutdown()
+        except Exception:
+            pass
+        self._fail_pending(RPCConnection("Websocket multiplexer is closed!"))
+
+    def _discard(self, pending):
+        with self._lock:
+            for i in pending.ids:
+                if self._pending.get(i) is pending:
+                    del self._pending[i]
+
+    def _fail_pending(self, error):
+        with self._lock:
+            pending = list(set(self._pending.values()))
+            self._pending = {}
+        for p in pending:
+            p.set_error(error)
+
+    def _dispatch(self, reply):
+        try:
+            ret = self.codec.loads(reply)
+        except ValueError:
+            log.warning("Could not decode websocket reply: %s" % reply[:100])
+            return
+        replies = ret if isinstance(ret, list) else [ret]
+        pending = None
+        with self._lock:
+            for r in replies:
+                if isinstance(r, dict) and r.get("id") in self._pending:
+                    pending = self._pending[r["id"]]
+                    break
+            if pending is not None:
+                for i in pending.ids:
+                    self._pending.pop(i, None)
+        if pending is None:
+            log.warning("Received websocket reply for an unknown id: %s" % reply[:100])
+            return
+        for r in replies:
+            if isinstance(r, dict) and r.get("id") in pending.original_ids:
+                r["id"] = pending.original_ids[r["id"]]
+        pending.set_reply(ret)
+
+    def _reconnect(self):
+        while not self._closed:
+            self.reconnect_cnt += 1
+            try:
+                self.ws.connect(self.url)
+                with self._lock:
+                    pending = list(set(self._pending.values()))
+                with self._send_lock:
+                    for p in pending:
+                        self.ws.send(p.data)
+                log.warning("Reconnected to %s and re-issued %d pending calls" % (self.url, len(pending)))
+                return True
+            except Exception as e:
+                log.warning("Reconnect to %s failed: %s" % (self.url, str(e)))
+                if self.reconnect_cnt >= self.max_reconnects:
+                    return False
+                time.sleep(min(self.reconnect_cnt * 0.5, 2))
+        return False
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                reply = self.ws.recv()
+            except WebSocketTimeoutException:
+                continue
+            except Exception as e:
+                if self._closed:
+                    break
+                log.warning("Websocket connection to %s lost: %s" % (self.url, str(e)))
+                if self._reconnect():
+                    continue
+                self._broken = WebSocketConnectionClosedException(str(e))
+                self._fail_pending(self._broken)
+                break
+            if not reply:
+                continue
+            self.reconnect_cnt = 0
+            self._dispatch(reply)
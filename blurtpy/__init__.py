@@ -26,5 +26,6 @@ __all__ = [
     "profile",
     "nodelist",
     "imageuploader",
-    "blurtsigner"
+    "blurtsigner",
+    "checkpoint"
 ]
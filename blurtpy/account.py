@@ -5,10 +5,12 @@ import json
 from datetime import datetime, timezone, timedelta, date, time
 import math
 import random
+import time as timenow
 import logging
 from prettytable import PrettyTable
 from blurtpy.instance import shared_blockchain_instance
 from .exceptions import AccountDoesNotExistsException, OfflineHasNoRPCException
+from blurtapi.batchsize import AdaptiveBatchSize
 from blurtapi.exceptions import ApiNotSupported, MissingRequiredActiveAuthority, SupportedByBlurtmind, FilteredItemNotFound
 from .blockchainobject import BlockchainObject
 from .blockchain import Blockchain
@@ -2065,7 +2067,7 @@ class Account(BlockchainObject):
         return operation_filter_low, operation_filter_high
         
 
-    def get_account_history(self, index, limit, order=-1, start=None, stop=None, use_block_num=True, only_ops=[], exclude_ops=[], raw_output=False):
+    def get_account_history(self, index, limit, order=-1, start=None, stop=None, use_block_num=True, only_ops=[], exclude_ops=[], raw_output=False, priority=None, adaptive_batch=None):
         """ Returns a generator for individual account transactions. This call can be used in a
             ``for`` loop.
 
@@ -2086,6 +2088,10 @@ class Account(BlockchainObject):
             :param int order: 1 for chronological, -1 for reverse order
             :param bool raw_output: if False, the output is a dict, which
                 includes all values. Otherwise, the output is list.
+            :param str priority: priority class of the api call when the rpc has a
+                scheduler, see :class:`blurtapi.scheduler.PriorityScheduler` (*optional*)
+            :param AdaptiveBatchSize adaptive_batch: receives the latency, errors and reply
+                size of the api call, see :class:`blurtapi.batchsize.AdaptiveBatchSize` (*optional*)
 
             .. note::
 
@@ -2102,10 +2108,22 @@ class Account(BlockchainObject):
         operation_filter_high = None
         if self.blockchain.rpc.url == 'https://api.blurt.blog':
             operation_filter_low, operation_filter_high = self._get_operation_filter(only_ops=only_ops, exclude_ops=exclude_ops)
+        start_time = timenow.time()
         try:
-            txs = self._get_account_history(start=index, limit=limit, operation_filter_low=operation_filter_low, operation_filter_high=operation_filter_high)
+            if priority is not None and getattr(self.blockchain.rpc, "scheduler", None) is not None:
+                with self.blockchain.rpc.priority(priority):
+                    txs = self._get_account_history(start=index, limit=limit, operation_filter_low=operation_filter_low, operation_filter_high=operation_filter_high)
+            else:
+                txs = self._get_account_history(start=index, limit=limit, operation_filter_low=operation_filter_low, operation_filter_high=operation_filter_high)
         except FilteredItemNotFound:
             txs = []
+        except Exception:
+            if adaptive_batch is not None:
+                adaptive_batch.record(self.blockchain.rpc.url, limit, timenow.time() - start_time, error=True)
+            raise
+        if adaptive_batch is not None:
+            adaptive_batch.record(self.blockchain.rpc.url, limit, timenow.time() - start_time,
+                                  reply_bytes=self.blockchain.rpc.last_reply_size)
         if txs is None:
             return
         start = addTzInfo(start)
@@ -2176,9 +2194,21 @@ class Account(BlockchainObject):
             if not only_ops or op_type in only_ops:
                 yield construct_op(self["name"])
 
+    def _get_adaptive_batch(self, adaptive_batch, batch_size):
+        if adaptive_batch is True:
+            return AdaptiveBatchSize(max_size=batch_size)
+        elif isinstance(adaptive_batch, AdaptiveBatchSize):
+            return adaptive_batch
+        return None
+
+    def _get_batch_limit(self, adaptive_batch, batch_size):
+        if adaptive_batch is None or not self.blockchain.is_connected():
+            return batch_size
+        return adaptive_batch.get(self.blockchain.rpc.url, limit=batch_size)
+
     def history(
         self, start=None, stop=None, use_block_num=True,
-        only_ops=[], exclude_ops=[], batch_size=1000, raw_output=False
+        only_ops=[], exclude_ops=[], batch_size=1000, raw_output=False, adaptive_batch=False
     ):
         """ Returns a generator for individual account transactions. The
             earlist operation will be first. This call can be used in a
@@ -2197,6 +2227,10 @@ class Account(BlockchainObject):
             :param int batch_size: internal api call batch size (*optional*)
             :param bool raw_output: if False, the output is a dict, which
                 includes all values. Otherwise, the output is list.
+            :param bool/AdaptiveBatchSize adaptive_batch: When set, the api call batch size is
+                tuned per node between 1 and ``batch_size`` on latency, errors and reply size.
+                Pass a :class:`blurtapi.batchsize.AdaptiveBatchSize` to read the chosen sizes
+                and the throughput afterwards (*optional*)
 
             .. note::
                 only_ops and exclude_ops takes an array of strings:
@@ -2253,7 +2287,8 @@ class Account(BlockchainObject):
                 0
 
         """
-        _limit = batch_size
+        adaptive_batch = self._get_adaptive_batch(adaptive_batch, batch_size)
+        _limit = self._get_batch_limit(adaptive_batch, batch_size)
         max_index = self.virtual_op_count()
         if not max_index:
             return
@@ -2319,7 +2354,8 @@ class Account(BlockchainObject):
             elif first < _limit and self.blockchain.rpc.url != "https://api.blurt.blog":
                 first = _limit
             batch_count = 0
-            for item in self.get_account_history(first, _limit, start=None, stop=None, order=1, only_ops=only_ops, exclude_ops=exclude_ops, raw_output=raw_output):
+            for item in self.get_account_history(first, _limit, start=None, stop=None, order=1, only_ops=only_ops, exclude_ops=exclude_ops, raw_output=raw_output, priority="bulk",
+                                                 adaptive_batch=adaptive_batch):
                 batch_count += 1
                 if raw_output:
                     item_index, event = item
@@ -2358,6 +2394,8 @@ class Account(BlockchainObject):
                     if not only_ops or op_type in only_ops:
                         yield item                
                 last_item_index = item_index
+            if adaptive_batch is not None:
+                _limit = self._get_batch_limit(adaptive_batch, batch_size)
             if first < max_index and first + _limit >= max_index and not last_round:
                 _limit = max_index - first
                 first = max_index
@@ -2374,7 +2412,7 @@ class Account(BlockchainObject):
 
     def history_reverse(
         self, start=None, stop=None, use_block_num=True,
-        only_ops=[], exclude_ops=[], batch_size=1000, raw_output=False
+        only_ops=[], exclude_ops=[], batch_size=1000, raw_output=False, adaptive_batch=False
     ):
         """ Returns a generator for individual account transactions. The
             latest operation will be first. This call can be used in a
@@ -2395,6 +2433,10 @@ class Account(BlockchainObject):
             :param int batch_size: internal api call batch size (*optional*)
             :param bool raw_output: if False, the output is a dict, which
                 includes all values. Otherwise, the output is list.
+            :param bool/AdaptiveBatchSize adaptive_batch: When set, the api call batch size is
+                tuned per node between 1 and ``batch_size`` on latency, errors and reply size.
+                Pass a :class:`blurtapi.batchsize.AdaptiveBatchSize` to read the chosen sizes
+                and the throughput afterwards (*optional*)
 
             .. note::
                 only_ops and exclude_ops takes an array of strings:
@@ -2451,7 +2493,8 @@ class Account(BlockchainObject):
                 0
 
         """
-        _limit = batch_size
+        adaptive_batch = self._get_adaptive_batch(adaptive_batch, batch_size)
+        _limit = self._get_batch_limit(adaptive_batch, batch_size)
         first = self.virtual_op_count()
         start = addTzInfo(start)
         stop = addTzInfo(stop)
@@ -2502,7 +2545,8 @@ class Account(BlockchainObject):
             elif first - _limit < 0 and self.blockchain.rpc.url != 'https://api.blurt.blog':
                 _limit = first
             batch_count = 0
-            for item in self.get_account_history(first, _limit, start=None, stop=None, order=-1, only_ops=only_ops, exclude_ops=exclude_ops, raw_output=raw_output):
+            for item in self.get_account_history(first, _limit, start=None, stop=None, order=-1, only_ops=only_ops, exclude_ops=exclude_ops, raw_output=raw_output, priority="bulk",
+                                                 adaptive_batch=adaptive_batch):
                 batch_count += 1
                 if raw_output:
                     item_index, event = item
@@ -2547,6 +2591,8 @@ class Account(BlockchainObject):
                 first -= 2000
             else:
                 first -= (_limit)
+            if adaptive_batch is not None:
+                _limit = self._get_batch_limit(adaptive_batch, batch_size)
             if first < 1:
                 break
 
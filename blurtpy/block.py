@@ -6,6 +6,7 @@ from .utils import parse_time, formatTimeString
 from .blockchainobject import BlockchainObject
 from blurtpy.instance import shared_blockchain_instance
 from blurtapi.exceptions import ApiNotSupported
+from blurtapi.streamjson import Projection
 from blurtgraphenebase.py23 import bytes_types, integer_types, string_types, text_type
 
 
@@ -394,8 +395,12 @@ class Blocks(list):
             to fetch per call, defaults to 100
         :param Blurt/Blurt blockchain_instance: Blurt() or Blurt() instance to use when
             accessing a RPCcreator = Account(creator, blockchain_instance=self)
+        :param list/dict projection: (optional) block fields which are kept, e.g.
+            ``["timestamp", "transactions.operations"]``. The reply is then parsed
+            one block at a time and the other fields are dropped right away, see
+            :class:`blurtapi.streamjson.Projection`. ``block_id`` is always kept.
     """
-    def __init__(self, starting_block_num, count=1000, lazy=False, full=True, blockchain_instance=None, **kwargs):
+    def __init__(self, starting_block_num, count=1000, lazy=False, full=True, blockchain_instance=None, projection=None, **kwargs):
         
         if blockchain_instance is None:
             if kwargs.get("blurt_instance"):
@@ -408,7 +413,11 @@ class Blocks(list):
 
         self.blockchain.rpc.set_next_node_on_empty_reply(False)
 
-        blocks = self.blockchain.rpc.get_block_range({'starting_block_num': starting_block_num,  "count": count}, api="block")['blocks']
+        if projection is None:
+            blocks = self.blockchain.rpc.get_block_range({'starting_block_num': starting_block_num,  "count": count}, api="block")['blocks']
+        else:
+            query = self.blockchain.rpc.build_query("get_block_range", [{'starting_block_num': starting_block_num, "count": count}], {"api": "block"})
+            blocks = self.blockchain.rpc.rpcstream(query, path=("result", "blocks"), projection=Projection(projection).include("block_id"))
 
         super(Blocks, self).__init__(
             [
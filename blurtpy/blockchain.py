@@ -11,18 +11,20 @@ from datetime import datetime, timedelta
 from .utils import formatTimeString, addTzInfo
 from .block import Block, BlockHeader
 from blurtapi.node import Nodes
-from .exceptions import BatchedCallsNotSupported, BlockDoesNotExistsException, BlockWaitTimeExceeded, OfflineHasNoRPCException
-from blurtapi.exceptions import NumRetriesReached, UnknownTransaction
-from blurtgraphenebase.py23 import py23_bytes
-from blurtpy.instance import shared_blockchain_instance
+from blurtapi.batchsize import AdaptiveBatchSize
+from .exceptions import BlockDoesNotExistsException, BlockWaitTimeExceeded, OfflineHasNoRPCException
+from blurtapi.exceptions import NumRetriesReached, UnknownTransaction, NoMethodWithName, NoApiWithName, ApiNotSupported
+from blurtapi.rpcbatch import get_error_message
+from blurtapi.streamjson import Projection
+from blurtgraphenebase.py23 import py23_bytes, string_types
+from blurtpy.instance import shared_blockchain_instance, shared_instance_pool
 from .amount import Amount
-import blurtpy as stm
 log = logging.getLogger(__name__)
 from queue import Queue
 FUTURES_MODULE = None
 if not FUTURES_MODULE:
     try:
-        from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+        from concurrent.futures import ThreadPoolExecutor, wait
         FUTURES_MODULE = "futures"
         # FUTURES_MODULE = None
     except ImportError:
@@ -160,6 +162,75 @@ class Pool:
         return results
 
 
+def _get_op_name(op):
+    """Returns the name of an operation in the ``[name, value]`` or ``{"type": ..., "value": ...}`` format"""
+    if isinstance(op, dict):
+        op_type = op["type"]
+        if op_type[-10:] == "_operation":
+            return op_type[:-10]
+        return op_type
+    return op[0]
+
+
+class OperationRecord(object):
+    """ Operation yielded by :meth:`Blockchain.stream` with ``op_records=True``
+
+        The record holds the operation payload in ``op`` instead of copying it
+        into a new dict. ``_id`` and ``timestamp`` are computed when they are
+        read for the first time. Items can be read like in the dict output,
+        e.g. ``record["type"]`` or ``record["amount"]``, :meth:`to_dict` returns
+        the dict output.
+    """
+    __slots__ = ["type", "block_num", "trx_num", "trx_id", "op", "_event", "_hash", "_timestamp"]
+    fields = ("type", "_id", "timestamp", "block_num", "trx_num", "trx_id")
+
+    def __init__(self, op_type, op, event, timestamp, block_num, trx_num, trx_id):
+        self.type = op_type
+        self.op = op
+        self.block_num = block_num
+        self.trx_num = trx_num
+        self.trx_id = trx_id
+        self._event = event
+        self._hash = None
+        self._timestamp = timestamp
+
+    @property
+    def _id(self):
+        if self._hash is None:
+            self._hash = Blockchain.hash_op(self._event)
+        return self._hash
+
+    @property
+    def timestamp(self):
+        if isinstance(self._timestamp, string_types):
+            self._timestamp = formatTimeString(self._timestamp)
+        return self._timestamp
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            return getattr(self, key)
+        return self.op[key]
+
+    def __contains__(self, key):
+        return key in self.fields or key in self.op
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def to_dict(self):
+        """Returns the operation in the dict output of :meth:`Blockchain.stream`"""
+        ret = {"type": self.type}
+        ret.update(self.op)
+        ret.update({"_id": self._id, "timestamp": self.timestamp, "block_num": self.block_num,
+                    "trx_num": self.trx_num, "trx_id": self.trx_id})
+        return ret
+
+    def __repr__(self):
+        return "<%s %s %d/%d>" % (self.__class__.__name__, self.type, self.block_num, self.trx_num)
+
+
 class Blockchain(object):
     """ This class allows to access the blockchain and read data
         from it
@@ -233,6 +304,9 @@ class Blockchain(object):
         else:
             self.max_block_wait_repetition = 3
         self.block_interval = self.blockchain.get_block_interval()
+        # urls of nodes without block_api.get_block_range or account_history_api.enum_virtual_ops
+        self.block_range_unsupported = set()
+        self.enum_virtual_ops_unsupported = set()
 
     def is_irreversible_mode(self):
         return self.mode == 'last_irreversible_block_num'
@@ -389,15 +463,36 @@ class Blockchain(object):
         """ Returns the witness participation rate in a range from 0 to 1"""
         return bin(int(self.blockchain.get_dynamic_global_properties(use_stored_data=False)["recent_slots_filled"])).count("1") / 128
 
-    def blocks(self, start=None, stop=None, max_batch_size=None, threading=False, thread_num=8, only_ops=False, only_virtual_ops=False):
+    def blocks(self, start=None, stop=None, max_batch_size=None, threading=False, thread_num=8, only_ops=False, only_virtual_ops=False,
+               adaptive_batch=False, projection=None, prefetch_window=None, range_size=None, checkpoint=None):
         """ Yields blocks starting from ``start``.
 
             :param int start: Starting block
             :param int stop: Stop at this block
             :param int max_batch_size: only for appbase nodes. When not None, batch calls of are used.
                 Cannot be combined with threading
+            :param bool/AdaptiveBatchSize adaptive_batch: When set, the size of the batch calls is tuned per node
+                between 1 and ``max_batch_size`` on latency, errors and reply size. Pass a
+                :class:`blurtapi.batchsize.AdaptiveBatchSize` to read the chosen sizes and the
+                throughput afterwards (default: False)
+            :param list/dict projection: only for batch calls on appbase nodes. Block fields which are kept,
+                e.g. ``["timestamp", "transactions.operations"]``. The batch reply is then parsed incrementally
+                and each block is yielded as soon as it is decoded, with the other fields dropped, so the
+                memory use is bounded by one block instead of one batch. See
+                :class:`blurtapi.streamjson.Projection` (default: None)
             :param bool threading: Enables threading. Cannot be combined with batch calls
             :param int thread_num: Defines the number of threads, when `threading` is set.
+            :param int prefetch_window: only with threading. Number of blocks which are fetched
+                ahead of the yielded block. Blocks are yielded in order as soon as the next block
+                has arrived and a new fetch is started for each yielded block, so at most
+                ``prefetch_window`` blocks are requested or held at a time (default: ``2 * thread_num``)
+            :param int range_size: only for appbase nodes. When at least ``range_size`` blocks up to the
+                current block are requested, they are fetched with ``block_api.get_block_range`` in requests
+                of up to ``range_size`` blocks. Blocks after the current block are fetched with the other
+                modes, which are also used on nodes without ``get_block_range``. Takes precedence over
+                threading and batch calls. ``projection`` is applied (default: None)
+            :param Checkpoint checkpoint: Stores the last processed block and continues after it
+                instead of ``start``, see :class:`blurtpy.checkpoint.Checkpoint` (default: None)
             :param bool only_ops: Only yield operations (default: False).
                 Cannot be combined with ``only_virtual_ops=True``.
             :param bool only_virtual_ops: Only yield virtual operations (default: False)
@@ -408,137 +503,101 @@ class Blockchain(object):
                       confirmed in an irreversible block.
 
         """
+        if checkpoint is not None:
+            blocks = self.blocks(start=checkpoint.start_block(start), stop=stop, max_batch_size=max_batch_size,
+                                 threading=threading, thread_num=thread_num, only_ops=only_ops,
+                                 only_virtual_ops=only_virtual_ops, adaptive_batch=adaptive_batch,
+                                 projection=projection, prefetch_window=prefetch_window, range_size=range_size)
+            try:
+                for block in blocks:
+                    position = (block.block_num, None, None)
+                    checkpoint.delivered(position)
+                    yield block
+                    checkpoint.processed(position)
+            finally:
+                checkpoint.close()
+            return
+        if adaptive_batch is True and max_batch_size is not None:
+            adaptive_batch = AdaptiveBatchSize(max_size=max_batch_size)
+        elif not isinstance(adaptive_batch, AdaptiveBatchSize):
+            adaptive_batch = None
         # Let's find out how often blocks are generated!
         current_block = self.get_current_block()
         current_block_num = current_block.block_num
         if not start:
             start = current_block_num
         head_block_reached = False
-        if threading and FUTURES_MODULE is not None:
-            pool = ThreadPoolExecutor(max_workers=thread_num)
-        elif threading:
-            pool = Pool(thread_num, batch_mode=True)
         if threading:
-            blockchain_instance = [self.blockchain]
-            nodelist = self.blockchain.rpc.nodes.export_working_nodes()
-            for i in range(thread_num - 1):
-                blockchain_instance.append(stm.Blurt(node=nodelist,
-                                                num_retries=self.blockchain.rpc.num_retries,
-                                                num_retries_call=self.blockchain.rpc.num_retries_call,
-                                                timeout=self.blockchain.rpc.timeout))
+            # every thread gets its own rpc, chain detection and caches are shared. The workers
+            # of the instance are reused by the next call, so their connections are not leaked
+            instance_pool = shared_instance_pool(self.blockchain, size=thread_num)
         # We are going to loop indefinitely
-        latest_block = 0
         while True:
             if stop:
                 head_block = stop
             else:
                 current_block_num = self.get_current_block_num()
                 head_block = current_block_num
-            if threading and not head_block_reached:
-                latest_block = start - 1
-                result_block_nums = []
-                for blocknum in range(start, head_block + 1, thread_num):
-                    # futures = []
-                    i = 0
-                    if FUTURES_MODULE is not None:
-                        futures = []
-                    block_num_list = []
-                    # freeze = self.blockchain.rpc.nodes.freeze_current_node
-                    num_retries = self.blockchain.rpc.nodes.num_retries
-                    # self.blockchain.rpc.nodes.freeze_current_node = True
-                    self.blockchain.rpc.nodes.num_retries = thread_num
-                    error_cnt = self.blockchain.rpc.nodes.node.error_cnt
-                    while i < thread_num and blocknum + i <= head_block:
-                        block_num_list.append(blocknum + i)
-                        results = []
-                        if FUTURES_MODULE is not None:
-                            futures.append(pool.submit(Block, blocknum + i, only_ops=only_ops, only_virtual_ops=only_virtual_ops, blockchain_instance=blockchain_instance[i]))
-                        else:
-                            pool.enqueue(Block, blocknum + i, only_ops=only_ops, only_virtual_ops=only_virtual_ops, blockchain_instance=blockchain_instance[i])
-                        i += 1
-                    if FUTURES_MODULE is not None:
-                        try:
-                            results = [r.result() for r in as_completed(futures)]
-                        except Exception as e:
-                            log.error(str(e))
-                    else:
-                        pool.run(True)
-                        pool.join()
-                        for result in pool.results():
-                            results.append(result)
-                        pool.abort()
-                    self.blockchain.rpc.nodes.num_retries = num_retries
-                    # self.blockchain.rpc.nodes.freeze_current_node = freeze
-                    new_error_cnt = self.blockchain.rpc.nodes.node.error_cnt
-                    self.blockchain.rpc.nodes.node.error_cnt = error_cnt
-                    if new_error_cnt > error_cnt:
-                        self.blockchain.rpc.nodes.node.error_cnt += 1
-                    #    self.blockchain.rpc.next()
-
-                    checked_results = []
-                    for b in results:
-                        if b.block_num is not None and int(b.block_num) not in result_block_nums:
-                            b["id"] = b.block_num
-                            b.identifier = b.block_num
-                            checked_results.append(b)
-                            result_block_nums.append(int(b.block_num))
-
-                    missing_block_num = list(set(block_num_list).difference(set(result_block_nums)))
-                    while len(missing_block_num) > 0:
-                        for blocknum in missing_block_num:
-                            try:
-                                block = Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, blockchain_instance=self.blockchain)
-                                checked_results.append(block)
-                                result_block_nums.append(int(block.block_num))
-                            except Exception as e:
-                                log.error(str(e))
-                        missing_block_num = list(set(block_num_list).difference(set(result_block_nums)))
-                    from operator import itemgetter
-                    blocks = sorted(checked_results, key=itemgetter('id'))
-                    for b in blocks:
-                        if latest_block < int(b.block_num):
-                            latest_block = int(b.block_num)
-                        yield b
-
-                if latest_block <= head_block:
-                    for blocknum in range(latest_block + 1, head_block + 1):
-                        if blocknum not in result_block_nums:
-                            block = Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, blockchain_instance=self.blockchain)
-                            result_block_nums.append(blocknum)
-                            yield block
+            if range_size is not None and not head_block_reached and not only_virtual_ops and \
+               self._use_block_range(start, head_block, range_size):
+                for block in self._range_blocks(start, min(head_block, self.get_current_block_num()), range_size,
+                                                projection, only_ops):
+                    start = block.block_num + 1
+                    yield block
+                if stop and start > stop:
+                    return
+                # the remaining blocks are fetched with the other modes
+                range_size = None
+                continue
+            elif threading and not head_block_reached:
+                # blocks after the current head block are waited for one by one
+                current_block_num = self.get_current_block_num()
+                prefetch_stop = min(head_block, current_block_num)
+                for block in self._prefetch_blocks(start, prefetch_stop, instance_pool, thread_num, prefetch_window,
+                                                   only_ops, only_virtual_ops):
+                    yield block
+                for blocknum in range(max(start, prefetch_stop + 1), head_block + 1):
+                    yield self.wait_for_and_get_block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                                                      block_number_check_cnt=5, last_current_block_num=current_block_num)
             elif max_batch_size is not None and (head_block - start) >= max_batch_size and not head_block_reached:
                 if not self.blockchain.is_connected():
                     raise OfflineHasNoRPCException("No RPC available in offline mode!")
                 self.blockchain.rpc.set_next_node_on_empty_reply(False)
-                latest_block = start - 1
-                batches = max_batch_size
-                for blocknumblock in range(start, head_block + 1, batches):
+                blocknumblock = start
+                while blocknumblock <= head_block:
+                    batches = max_batch_size
+                    if adaptive_batch is not None:
+                        batches = adaptive_batch.get(self.blockchain.rpc.url, limit=max_batch_size)
                     # Get full block
                     if (head_block - blocknumblock) < batches:
                         batches = head_block - blocknumblock + 1
-                    # add up to 'batches' calls to the queue
-                    block_batch = []
-                    for blocknum in range(blocknumblock, blocknumblock + batches):
-                        if blocknum == blocknumblock + batches - 1:
-                            add_to_queue = False  # execute the call with the last request
-                        else:
-                            add_to_queue = True  # append request to the queue w/o executing
-                        if only_virtual_ops:
-                            if self.blockchain.rpc.get_use_appbase():
-                                block_batch = self.blockchain.rpc.get_ops_in_block({"block_num": blocknum, 'only_virtual': only_virtual_ops}, api="account_history", add_to_queue=add_to_queue)
-                            else:
-                                block_batch = self.blockchain.rpc.get_ops_in_block(blocknum, only_virtual_ops, add_to_queue=add_to_queue)
-                        else:
-                            if self.blockchain.rpc.get_use_appbase():
-                                block_batch = self.blockchain.rpc.get_block({"block_num": blocknum}, api="block", add_to_queue=add_to_queue)
+                    if projection is not None and not only_virtual_ops and self.blockchain.rpc.get_use_appbase():
+                        for block in self._stream_batch(blocknumblock, batches, projection, only_ops, adaptive_batch):
+                            yield block
+                        blocknumblock += batches
+                        continue
+                    # send up to 'batches' calls as one batch request
+                    block_futures = []
+                    batch_start = time.time()
+                    # backfills must not delay interactive calls on a shared instance
+                    with self.blockchain.rpc.priority("bulk"), self.blockchain.rpc.batch(chunk_size=batches) as rpc_batch:
+                        for blocknum in range(blocknumblock, blocknumblock + batches):
+                            if only_virtual_ops:
+                                if self.blockchain.rpc.get_use_appbase():
+                                    block_futures.append(rpc_batch.get_ops_in_block({"block_num": blocknum, 'only_virtual': only_virtual_ops}, api="account_history"))
+                                else:
+                                    block_futures.append(rpc_batch.get_ops_in_block(blocknum, only_virtual_ops))
                             else:
-                                block_batch = self.blockchain.rpc.get_block(blocknum, add_to_queue=add_to_queue)
-
-                    if not bool(block_batch):
-                        raise BatchedCallsNotSupported()
-                    if not isinstance(block_batch, list):
-                        block_batch = [block_batch]
-                    for block in block_batch:
+                                if self.blockchain.rpc.get_use_appbase():
+                                    block_futures.append(rpc_batch.get_block({"block_num": blocknum}, api="block"))
+                                else:
+                                    block_futures.append(rpc_batch.get_block(blocknum))
+                    if adaptive_batch is not None:
+                        self._record_batch(adaptive_batch, block_futures, time.time() - batch_start)
+                    blocknumblock += batches
+
+                    for block_future in block_futures:
+                        block = block_future.result()
                         if not bool(block):
                             continue
                         if self.blockchain.rpc.get_use_appbase():
@@ -557,7 +616,8 @@ class Blockchain(object):
                 # Blocks from start until head block
                 for blocknum in range(start, head_block + 1):
                     # Get full block
-                    block = self.wait_for_and_get_block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, block_number_check_cnt=5, last_current_block_num=current_block_num)
+                    with self.blockchain.rpc.priority("bulk" if blocknum < current_block_num else "normal"):
+                        block = self.wait_for_and_get_block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops, block_number_check_cnt=5, last_current_block_num=current_block_num)
                     yield block
             # Set new start
             start = head_block + 1
@@ -569,6 +629,266 @@ class Blockchain(object):
             # Sleep for one block
             time.sleep(self.block_interval)
 
+    def virtual_ops(self, start=None, stop=None, op_names=None, range_size=1000):
+        """ Yields the virtual operations from block ``start`` to ``stop``
+
+            The operations of up to ``range_size`` blocks are fetched with one
+            ``account_history_api.enum_virtual_ops`` call, following its pagination,
+            instead of one ``get_ops_in_block`` call per block. Nodes without
+            ``enum_virtual_ops`` are asked block by block.
+
+            :param int start: Starting block (default: current block)
+            :param int stop: Stop at this block, when not set, new blocks are waited for
+            :param list op_names: only yield these operations, e.g. ``["producer_reward"]`` (default: all)
+            :param int range_size: blocks per call (default: 1000)
+
+            The operations are returned as the node sends them, e.g.
+
+            .. code-block:: python
+
+                {'trx_id': '0000000000000000000000000000000000000000', 'block': 5, 'trx_in_block': 4,
+                 'op_in_trx': 0, 'virtual_op': 1, 'timestamp': '2020-07-04T00:00:15',
+                 'op': ['producer_reward', {'producer': 'alice', 'vesting_shares': '1.000000 VESTS'}]}
+
+        """
+        if op_names is not None:
+            op_names = set(op_names)
+        if not start:
+            start = self.get_current_block_num()
+        while True:
+            head_block = self.get_current_block_num()
+            if stop:
+                head_block = min(stop, head_block)
+            while start <= head_block:
+                end = min(start + range_size, head_block + 1)
+                for op in self._enum_virtual_ops(start, end):
+                    if op_names is None or _get_op_name(op["op"]) in op_names:
+                        yield op
+                start = end
+            if stop and start > stop:
+                return
+            # Sleep for one block
+            time.sleep(self.block_interval)
+
+    def _enum_virtual_ops(self, start, end):
+        """Yields the virtual operations of the blocks ``start`` to ``end - 1``"""
+        rpc = self.blockchain.rpc
+        if not rpc.get_use_appbase() or rpc.url in self.enum_virtual_ops_unsupported:
+            for block in self.blocks(start=start, stop=end - 1, only_ops=True, only_virtual_ops=True):
+                for op in block["operations"]:
+                    yield op
+            return
+        args = {"block_range_begin": start, "block_range_end": end}
+        while True:
+            try:
+                with rpc.priority("bulk"):
+                    ret = rpc.enum_virtual_ops(args, api="account_history")
+            except (NoMethodWithName, NoApiWithName, ApiNotSupported) as e:
+                log.info("enum_virtual_ops is not supported by %s, fetching blocks one by one: %s" % (rpc.url, str(e)))
+                self.enum_virtual_ops_unsupported.add(rpc.url)
+                for op in self._enum_virtual_ops(args["block_range_begin"], end):
+                    yield op
+                return
+            for op in ret["ops"]:
+                yield op
+            # the next page starts within the range, after an operation or at a block when
+            # the node cut the range short
+            next_begin = ret.get("next_block_range_begin", end)
+            next_operation = ret.get("next_operation_begin", 0)
+            if next_begin >= end or next_begin < args["block_range_begin"] or \
+               (next_begin == args["block_range_begin"] and not next_operation):
+                return
+            args = {"block_range_begin": next_begin, "block_range_end": end}
+            if next_operation:
+                args["operation_begin"] = next_operation
+
+    def _virtual_op_blocks(self, start, stop, op_names, range_size=1000):
+        """Yields blocks with the virtual operations of :meth:`virtual_ops`, blocks without wanted operations are skipped"""
+        if op_names is not None and len(op_names) > 0:
+            op_names = set(op_names)
+        else:
+            op_names = None
+        ops = []
+        for op in self.virtual_ops(start=start, stop=stop, range_size=range_size):
+            if len(ops) > 0 and op["block"] != ops[0]["block"]:
+                for block in self._virtual_op_block(ops, op_names):
+                    yield block
+                ops = []
+            ops.append(op)
+        for block in self._virtual_op_block(ops, op_names):
+            yield block
+
+    def _virtual_op_block(self, ops, op_names):
+        if len(ops) == 0:
+            return
+        if op_names is not None and not any(_get_op_name(op["op"]) in op_names for op in ops):
+            return
+        block = Block({"block": ops[0]["block"], "timestamp": ops[0]["timestamp"], "id": ops[0]["block"],
+                       "operations": ops}, only_ops=True, only_virtual_ops=True, blockchain_instance=self.blockchain)
+        block.identifier = block.block_num
+        yield block
+
+    def _use_block_range(self, start, stop, range_size):
+        """Returns True when at least ``range_size`` blocks up to the current block can be fetched with get_block_range"""
+        if not self.blockchain.is_connected() or not self.blockchain.rpc.get_use_appbase() or \
+           self.blockchain.rpc.url in self.block_range_unsupported:
+            return False
+        return min(stop, self.get_current_block_num()) - start + 1 >= range_size
+
+    def _range_blocks(self, start, stop, range_size, projection, only_ops):
+        """ Yields the blocks from ``start`` to ``stop`` with get_block_range calls
+            of up to ``range_size`` blocks. Stops early when the node does not support
+            get_block_range or returns no blocks.
+        """
+        rpc = self.blockchain.rpc
+        if projection is not None:
+            projection = Projection(projection).include("block_id")
+        while start <= stop:
+            args = {"starting_block_num": start, "count": min(range_size, stop - start + 1)}
+            cnt = 0
+            try:
+                if projection is None:
+                    with rpc.priority("bulk"):
+                        blocks = rpc.get_block_range(args, api="block")["blocks"]
+                else:
+                    query = rpc.build_query("get_block_range", [args], {"api": "block"})
+                    blocks = rpc.rpcstream(query, path=("result", "blocks"), projection=projection)
+                for block in blocks:
+                    block = Block(block, only_ops=only_ops, blockchain_instance=self.blockchain)
+                    block["id"] = block.block_num
+                    block.identifier = block.block_num
+                    cnt += 1
+                    yield block
+            except (NoMethodWithName, NoApiWithName, ApiNotSupported) as e:
+                if cnt > 0:
+                    raise
+                log.info("get_block_range is not supported by %s, fetching blocks one by one: %s" % (rpc.url, str(e)))
+                self.block_range_unsupported.add(rpc.url)
+                return
+            if cnt == 0:
+                return
+            start += cnt
+
+    def _prefetch_blocks(self, start, stop, instance_pool, thread_num, window, only_ops, only_virtual_ops):
+        """ Yields the blocks from ``start`` to ``stop`` in order, while up to
+            ``window`` following blocks are fetched by ``thread_num`` threads
+
+            A failed block is fetched again on its own, up to ``num_retries`` times
+            of the rpc (-1 for indefinitely), while the other fetches continue.
+        """
+        if window is None:
+            window = 2 * thread_num
+        window = max(window, 1)
+        max_retries = self.blockchain.rpc.num_retries
+
+        def get_block(blocknum):
+            with instance_pool.instance() as blockchain_instance:
+                return Block(blocknum, only_ops=only_ops, only_virtual_ops=only_virtual_ops,
+                             blockchain_instance=blockchain_instance)
+
+        executor = ThreadPoolExecutor(max_workers=thread_num)
+        futures = {}
+        retries = {}
+        next_blocknum = start
+        try:
+            for blocknum in range(start, stop + 1):
+                # keep the window full
+                while next_blocknum <= stop and next_blocknum - blocknum < window:
+                    futures[next_blocknum] = executor.submit(get_block, next_blocknum)
+                    next_blocknum += 1
+                while True:
+                    try:
+                        block = futures[blocknum].result()
+                        if block.block_num is not None:
+                            break
+                        error = "Block %d is empty" % blocknum
+                    except Exception as e:
+                        error = str(e)
+                    retries[blocknum] = retries.get(blocknum, 0) + 1
+                    if max_retries >= 0 and retries[blocknum] > max_retries:
+                        raise BlockDoesNotExistsException("Block %d could not be fetched: %s" % (blocknum, error))
+                    log.warning("Fetching block %d again (%d): %s" % (blocknum, retries[blocknum], error))
+                    futures[blocknum] = executor.submit(get_block, blocknum)
+                del futures[blocknum]
+                retries.pop(blocknum, None)
+                block["id"] = block.block_num
+                block.identifier = block.block_num
+                yield block
+        finally:
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _stream_batch(self, start, count, projection, only_ops, adaptive_batch):
+        """ Yields the blocks of one batch of get_block calls in order while the reply is parsed
+
+            Blocks which are missing in the reply or which failed are sent again one by one.
+        """
+        rpc = self.blockchain.rpc
+        queries = []
+        block_nums = {}
+        for blocknum in range(start, start + count):
+            query = rpc.build_query("get_block", [{"block_num": blocknum}], {"api": "block"})
+            block_nums[query["id"]] = blocknum
+            queries.append(query)
+        block_projection = Projection(projection).include("block_id")
+        spec = {"id": True, "error": True, "result": {"block": block_projection.spec}}
+        replies = rpc.rpcstream(queries, path=(), projection=spec)
+        # replies which arrive before their turn
+        pending = {}
+        exhausted = False
+        truncated = False
+        error = False
+        latency = 0
+        try:
+            for blocknum in range(start, start + count):
+                reply = pending.pop(blocknum, None)
+                while reply is None and not exhausted:
+                    start_time = time.time()
+                    item = next(replies, None)
+                    latency += time.time() - start_time
+                    if item is None:
+                        exhausted = True
+                    elif block_nums.get(item.get("id")) == blocknum:
+                        reply = item
+                    elif item.get("id") in block_nums:
+                        pending[block_nums[item["id"]]] = item
+                if reply is None or "error" in reply:
+                    if reply is None:
+                        truncated = True
+                    else:
+                        error = True
+                        log.debug("Block %d failed in the batch, sending it again: %s" % (blocknum, get_error_message(reply)))
+                    result = rpc.rpcexec(rpc.build_query("get_block", [{"block_num": blocknum}], {"api": "block"}))
+                    block = (result or {}).get("block")
+                    if bool(block):
+                        block = block_projection.apply(block)
+                else:
+                    block = (reply.get("result") or {}).get("block")
+                if not bool(block):
+                    truncated = True
+                    continue
+                block = Block(block, only_ops=only_ops, blockchain_instance=self.blockchain)
+                block["id"] = block.block_num
+                block.identifier = block.block_num
+                yield block
+        finally:
+            replies.close()
+        if adaptive_batch is not None:
+            adaptive_batch.record(rpc.url, count, latency, error=error, truncated=truncated)
+
+    def _record_batch(self, adaptive_batch, futures, latency):
+        """Passes the outcome of a batch of block calls to the batch size controller"""
+        error = False
+        truncated = False
+        for future in futures:
+            if future.exception() is not None:
+                error = True
+            elif not bool(future.result()):
+                truncated = True
+        adaptive_batch.record(self.blockchain.rpc.url, len(futures), latency, error=error, truncated=truncated,
+                              reply_bytes=self.blockchain.rpc.last_reply_size)
+
     def wait_for_and_get_block(self, block_number, blocks_waiting_for=None, only_ops=False, only_virtual_ops=False, block_number_check_cnt=-1, last_current_block_num=None):
         """ Get the desired block from the chain, if the current head block is smaller (for both head and irreversible)
             then we wait, but a maxmimum of blocks_waiting_for * max_block_wait_repetition time before failure.
@@ -651,7 +971,7 @@ class Blockchain(object):
                 print(block["identifier"] + " " + block["timestamp"])
             ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
         if with_virtual_ops:
-            for block in self.blocks(start=start, stop=stop, only_ops=True, only_virtual_ops=True):
+            for block in self._virtual_op_blocks(start, stop, None):
                 if verbose:
                     print(block["identifier"] + " " + block["timestamp"])
                 ops_stat = block.ops_statistics(add_to_ops_stat=ops_stat)
@@ -670,7 +990,14 @@ class Blockchain(object):
             :param int thread_num: Defines the number of threads, when `threading` is set.
             :param bool only_ops: Only yield operations (default: False)
                 Cannot be combined with ``only_virtual_ops=True``
-            :param bool only_virtual_ops: Only yield virtual operations (default: False)
+            :param bool only_virtual_ops: Only yield virtual operations (default: False).
+                On appbase nodes, they are read with ``enum_virtual_ops`` calls of ``range_size``
+                (default: 1000) blocks, see :meth:`virtual_ops`
+            :param Checkpoint checkpoint: Stores the position of the last processed operation and
+                continues after it, see :class:`blurtpy.checkpoint.Checkpoint` (default: None)
+            :param bool op_records: When set to True and ``raw_ops=False``, :class:`OperationRecord`
+                objects are yielded instead of dicts, which compute ``_id`` and ``timestamp``
+                only when they are read (default: False)
 
             The dict output is formated such that ``type`` carries the
             operation type. Timestamp and block_num are taken from the
@@ -716,24 +1043,48 @@ class Blockchain(object):
                 }
 
         """
-        for block in self.blocks(**kwargs):
+        checkpoint = kwargs.pop("checkpoint", None)
+        op_records = kwargs.pop("op_records", False)
+        resume_block_num = None
+        if checkpoint is not None:
+            kwargs["start"] = checkpoint.start_block(kwargs.get("start"))
+            if checkpoint.position is not None and checkpoint.position[1] is not None:
+                resume_block_num = checkpoint.position[0]
+        try:
+            for item in self._stream_ops(opNames, raw_ops, op_records, checkpoint, resume_block_num, kwargs):
+                yield item
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    def _stream_ops(self, opNames, raw_ops, op_records, checkpoint, resume_block_num, kwargs):
+        if kwargs.get("only_virtual_ops", False) and self.blockchain.rpc.get_use_appbase():
+            blocks = self._virtual_op_blocks(kwargs.get("start"), kwargs.get("stop"), opNames,
+                                             range_size=kwargs.get("range_size") or 1000)
+        else:
+            blocks = self.blocks(**kwargs)
+        for block in blocks:
             if "transactions" in block:
                 trx = block["transactions"]
             else:
                 trx = [block]
             block_num = 0
             trx_id = ""
-            _id = ""
+            hashed_op = None
             timestamp = ""
+            # only the block of the checkpoint has processed operations
+            resume = resume_block_num is not None and block.block_num == resume_block_num
             for trx_nr in range(len(trx)):
                 if "operations" not in trx[trx_nr]:
                     continue
-                for event in trx[trx_nr]["operations"]:
+                for op_index, event in enumerate(trx[trx_nr]["operations"]):
+                    if resume and checkpoint.is_processed(block.block_num, trx_nr, op_index):
+                        continue
                     if isinstance(event, list):
                         op_type, op = event
                         trx_id = block["transaction_ids"][trx_nr]
                         block_num = block.get("id")
-                        _id = self.hash_op(event)
+                        hashed_op = event
                         timestamp = block.get("timestamp")
                     elif isinstance(event, dict) and "type" in event and "value" in event:
                         op_type = event["type"]
@@ -742,7 +1093,7 @@ class Blockchain(object):
                         op = event["value"]
                         trx_id = block["transaction_ids"][trx_nr]
                         block_num = block.get("id")
-                        _id = self.hash_op(event)
+                        hashed_op = event
                         timestamp = block.get("timestamp")
                     elif "op" in event and isinstance(event["op"], dict) and "type" in event["op"] and "value" in event["op"]:
                         op_type = event["op"]["type"]
@@ -751,29 +1102,38 @@ class Blockchain(object):
                         op = event["op"]["value"]
                         trx_id = event.get("trx_id")
                         block_num = event.get("block")
-                        _id = self.hash_op(event["op"])
+                        hashed_op = event["op"]
                         timestamp = event.get("timestamp")
                     else:
                         op_type, op = event["op"]
                         trx_id = event.get("trx_id")
                         block_num = event.get("block")
-                        _id = self.hash_op(event["op"])
+                        hashed_op = event["op"]
                         timestamp = event.get("timestamp")
                     if not bool(opNames) or op_type in opNames and block_num > 0:
+                        if checkpoint is not None:
+                            position = (block.block_num, trx_nr, op_index)
+                            checkpoint.delivered(position)
                         if raw_ops:
                             yield {"block_num": block_num,
                                    "trx_num": trx_nr,
                                    "op": [op_type, op],
                                    "timestamp": timestamp}
+                        elif op_records:
+                            yield OperationRecord(op_type, op, hashed_op, timestamp, block_num, trx_nr, trx_id)
                         else:
                             updated_op = {"type": op_type}
-                            updated_op.update(op.copy())
-                            updated_op.update({"_id": _id,
+                            updated_op.update(op)
+                            updated_op.update({"_id": self.hash_op(hashed_op),
                                                "timestamp": timestamp,
                                                "block_num": block_num,
                                                "trx_num": trx_nr,
                                                "trx_id": trx_id})
                             yield updated_op
+                        if checkpoint is not None:
+                            checkpoint.processed(position)
+            if checkpoint is not None:
+                checkpoint.block_processed(block.block_num)
 
     def awaitTxConfirmation(self, transaction, limit=10):
         """ Returns the transaction as seen by the blockchain after being
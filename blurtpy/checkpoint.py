@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+log = logging.getLogger(__name__)
+
+
+class FileCheckpointStore(object):
+    """ Stores the position of a stream as JSON file
+
+        The file is replaced atomically, so it always contains the last
+        complete position, also after a crash during a write.
+
+        :param str path: file name
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Returns the stored position, None when nothing was stored"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        return (data["block_num"], data["trx_num"], data["op_index"])
+
+    def save(self, position):
+        """Stores ``position`` as ``(block_num, trx_num, op_index)``"""
+        block_num, trx_num, op_index = position
+        tmp_path = "%s.tmp" % self.path
+        with open(tmp_path, "w") as f:
+            json.dump({"block_num": block_num, "trx_num": trx_num, "op_index": op_index}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteCheckpointStore(object):
+    """ Stores the positions of streams in a SQLite table, one row per ``name``
+
+        To process every operation exactly once, the results of the consumer
+        and the position must be written in the same transaction: pass the
+        connection of the consumer with ``commit=False`` and call
+        :meth:`Checkpoint.flush` right before the consumer commits.
+
+        :param str path: database file, not used when ``connection`` is given
+        :param str name: name of the stream (default is ``default``)
+        :param connection: open ``sqlite3`` connection (default is None)
+        :param bool commit: When False, the position is written without commit (default is True)
+    """
+    def __init__(self, path=None, name="default", connection=None, commit=True):
+        if connection is None:
+            if path is None:
+                raise ValueError("path or connection must be given")
+            connection = sqlite3.connect(path, check_same_thread=False)
+        self.db = connection
+        self.name = name
+        self.commit = commit
+        self.db.execute("CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, block_num INTEGER, "
+                        "trx_num INTEGER, op_index INTEGER, updated REAL)")
+        if self.commit:
+            self.db.commit()
+
+    def load(self):
+        """Returns the stored position, None when nothing was stored"""
+        row = self.db.execute("SELECT block_num, trx_num, op_index FROM checkpoints WHERE name = ?",
+                              (self.name, )).fetchone()
+        if row is None:
+            return None
+        return tuple(row)
+
+    def save(self, position):
+        """Stores ``position`` as ``(block_num, trx_num, op_index)``"""
+        block_num, trx_num, op_index = position
+        self.db.execute("INSERT OR REPLACE INTO checkpoints (name, block_num, trx_num, op_index, updated) "
+                        "VALUES (?, ?, ?, ?, ?)", (self.name, block_num, trx_num, op_index, time.time()))
+        if self.commit:
+            self.db.commit()
+
+
+class Checkpoint(object):
+    """ Remembers the last processed position of :meth:`blurtpy.blockchain.Blockchain.stream`
+        or :meth:`blurtpy.blockchain.Blockchain.blocks` and resumes from it
+
+        The position is ``(block_num, trx_num, op_index)`` of the last processed
+        operation, ``(block_num, None, None)`` when the whole block was processed.
+        An item counts as processed when the next item is requested from the
+        stream, or when the consumer calls :meth:`flush` while it handles the
+        item. The position is only kept in memory and written to the store
+        every ``interval`` items, at least every ``max_delay`` seconds (checked
+        after each block) and when the stream ends or is closed. With
+        ``interval=None``, it is only written by :meth:`flush`.
+
+        After a restart, the stream continues after the stored position. Items
+        which were processed after the last write are delivered again, unless
+        the consumer writes the position together with its results, see
+        :class:`SQLiteCheckpointStore`, or ``interval`` is 1.
+
+        .. code-block:: python
+
+            from blurtpy.blockchain import Blockchain
+            from blurtpy.checkpoint import Checkpoint, SQLiteCheckpointStore
+
+            checkpoint = Checkpoint(SQLiteCheckpointStore("stream.sqlite", name="transfers"), interval=500)
+            for op in Blockchain().stream(opNames=["transfer"], checkpoint=checkpoint):
+                print(op)
+
+        :param store: :class:`FileCheckpointStore`, :class:`SQLiteCheckpointStore`
+            or any object with ``load()`` and ``save(position)``
+        :param int interval: processed items between two writes, None for writes
+            only on :meth:`flush` (default is 1000)
+        :param float max_delay: seconds after which the position is written at the
+            end of a block, None for no limit, not used with ``interval=None`` (default is 10)
+    """
+    def __init__(self, store, interval=1000, max_delay=10.):
+        self.store = store
+        self.interval = interval
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.position = store.load()
+        self.delivered_position = self.position
+        self.saved_position = self.position
+        self.pending = 0
+        self.last_flush = time.time()
+        self.flushes = 0
+
+    def start_block(self, start=None):
+        """ Returns the first block which is not completely processed, ``start``
+            when nothing was stored
+        """
+        if self.position is None:
+            return start
+        block_num, trx_num, op_index = self.position
+        if trx_num is None:
+            return block_num + 1
+        return block_num
+
+    def is_processed(self, block_num, trx_num, op_index):
+        """Returns True when the operation was processed before the stored position"""
+        if self.position is None:
+            return False
+        last_block_num, last_trx_num, last_op_index = self.position
+        if block_num != last_block_num:
+            return block_num < last_block_num
+        if last_trx_num is None:
+            return True
+        return (trx_num, op_index) <= (last_trx_num, last_op_index)
+
+    def delivered(self, position):
+        """Sets the position of the item which is handed to the consumer"""
+        self.delivered_position = position
+
+    def processed(self, position):
+        """Sets the position of the last processed item, writes it every ``interval`` items"""
+        self.position = position
+        self.pending += 1
+        if self.interval is not None and self.pending >= self.interval:
+            self._write(position)
+
+    def block_processed(self, block_num):
+        """Marks ``block_num`` as completely processed"""
+        self.position = self.delivered_position = (block_num, None, None)
+        if self.interval is not None and self.max_delay is not None and \
+           time.time() - self.last_flush >= self.max_delay:
+            self._write(self.position)
+
+    def close(self):
+        """Writes the position at the end of a stream, unless it is only written by :meth:`flush`"""
+        if self.interval is not None:
+            self._write(self.position)
+
+    def flush(self):
+        """ Writes the position of the last delivered item, which the consumer
+            has processed, e.g. right before it commits its results
+        """
+        self.position = self.delivered_position
+        self._write(self.position)
+
+    def _write(self, position):
+        with self.lock:
+            self.pending = 0
+            self.last_flush = time.time()
+            if position is None or position == self.saved_position:
+                return
+            self.store.save(position)
+            self.saved_position = position
+            self.flushes += 1
+        log.debug("Checkpoint %s stored" % str(position))
@@ -35,6 +35,7 @@ from blurtpy.imageuploader import ImageUploader
 
 from blurtpy.blockchaininstance import BlockChainInstance
 from blurtpy.storage import get_default_config_store
+from blurtapi.cassette import Cassette
 
 click.disable_unicode_literals_warning = True
 log = logging.getLogger(__name__)
@@ -232,8 +233,12 @@ def export_trx(tx, export):
     help='Delay in seconds until transactions are supposed to expire(defaults to 30)')
 @click.option(
     '--verbose', '-v', default=3, help='Verbosity')
+@click.option(
+    '--cassette', help="Records all rpc requests and replies to this cassette file (.jsonl or .jsonl.gz)")
+@click.option(
+    '--replay', is_flag=True, default=False, help="Answers all rpc requests from the cassette file instead of a node")
 @click.version_option(version=__version__)
-def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, keys, use_ledger, path, token, expires, verbose):
+def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, keys, use_ledger, path, token, expires, verbose, cassette, replay):
 
     # Logging
     log = logging.getLogger(__name__)
@@ -281,6 +286,12 @@ def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, ke
     else:
         sc2 = None
     debug = verbose > 0
+    # ask the first three nodes at once, a dead first node must not delay every command
+    rpc_kwargs = {"race_connect": 3}
+    if cassette:
+        rpc_kwargs["cassette"] = Cassette(cassette, mode="replay" if replay else "record")
+    elif replay:
+        raise click.UsageError("--replay needs a --cassette file")
     blurt = False
     if not blurt and not blurt:
         config = get_default_config_store()
@@ -309,7 +320,8 @@ def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, ke
             num_retries=10,
             num_retries_call=5,
             timeout=30,
-            autoconnect=autoconnect
+            autoconnect=autoconnect,
+            **rpc_kwargs
         )
     elif blurt:
         stm = Blurt(
@@ -328,7 +340,8 @@ def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, ke
             num_retries=10,
             num_retries_call=5,
             timeout=30,
-            autoconnect=autoconnect
+            autoconnect=autoconnect,
+            **rpc_kwargs
         )
     else:
         stm = Blurt(
@@ -347,7 +360,8 @@ def cli(node, offline, no_broadcast, no_wallet, unsigned, create_link, blurt, ke
             num_retries=10,
             num_retries_call=5,
             timeout=30,
-            autoconnect=autoconnect
+            autoconnect=autoconnect,
+            **rpc_kwargs
         )
 
     set_shared_blockchain_instance(stm)
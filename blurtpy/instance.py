@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import copy
+import threading
+import time
+from contextlib import contextmanager
 import blurtpy
 
 
@@ -125,3 +129,113 @@ def set_shared_config(config):
     if SharedInstance.instance:
         clear_cache()
         SharedInstance.instance = None
+
+
+class BlockchainInstancePool(object):
+    """ Hands out worker instances of one blockchain instance for the use in threads
+
+        A worker is a shallow copy of ``blockchain_instance`` with its own rpc
+        (see :meth:`blurtapi.graphenerpc.GrapheneRPC.clone`) and its own
+        transaction buffer. The config, the wallet, the stored chain properties
+        and the chain, response and http connection caches are shared, so a
+        new worker neither detects the chain nor sets up a wallet again.
+        Workers are kept and handed out again after they were released.
+
+        .. code-block:: python
+
+            from blurtpy.block import Block
+            from blurtpy.instance import shared_instance_pool
+
+            pool = shared_instance_pool()
+            with pool.instance() as blurt:
+                block = Block(1, blockchain_instance=blurt)
+
+        :param Blurt blockchain_instance: instance which is copied (default is the shared instance)
+        :param int size: maximum number of workers, :meth:`acquire` waits while all
+            of them are in use (default is 8)
+    """
+    def __init__(self, blockchain_instance=None, size=8):
+        self.blockchain = blockchain_instance or shared_blockchain_instance()
+        self.size = size
+        self.condition = threading.Condition()
+        self.idle = []
+        self.created = 0
+        self.startup_time = 0
+
+    def _new_instance(self):
+        start = time.time()
+        instance = copy.copy(self.blockchain)
+        if self.blockchain.rpc is not None:
+            instance.rpc = self.blockchain.rpc.clone()
+        instance.clear()
+        self.startup_time += time.time() - start
+        return instance
+
+    def acquire(self, timeout=None):
+        """ Returns an idle worker or creates a new one
+
+            :param float timeout: seconds to wait for a free worker, waits forever when None
+            :raises RuntimeError: when no worker was free within ``timeout``
+        """
+        with self.condition:
+            while len(self.idle) == 0 and self.created >= self.size:
+                if not self.condition.wait(timeout):
+                    raise RuntimeError("No free blockchain instance after %.1f s" % timeout)
+            if len(self.idle) > 0:
+                return self.idle.pop()
+            self.created += 1
+        try:
+            return self._new_instance()
+        except Exception:
+            with self.condition:
+                self.created -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, instance):
+        """Returns a worker from :meth:`acquire` to the pool"""
+        with self.condition:
+            self.idle.append(instance)
+            self.condition.notify()
+
+    @contextmanager
+    def instance(self, timeout=None):
+        """Context manager for :meth:`acquire` and :meth:`release`"""
+        instance = self.acquire(timeout=timeout)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def stats(self):
+        """Returns the number of created, idle and used workers and the mean startup time of a worker in s"""
+        with self.condition:
+            return {"size": self.size, "created": self.created, "idle": len(self.idle),
+                    "in_use": self.created - len(self.idle),
+                    "startup_time": self.startup_time / self.created if self.created > 0 else 0}
+
+
+class SharedInstancePool(object):
+    """Singelton lock for the instance pools of the blockchain instances"""
+    lock = threading.Lock()
+
+
+def shared_instance_pool(blockchain_instance=None, size=None):
+    """ Returns the :class:`BlockchainInstancePool` of ``blockchain_instance``
+
+        The pool is created on the first call and grows when a larger ``size`` is requested.
+
+        :param Blurt blockchain_instance: Blurt instance (default is the shared instance)
+        :param int size: minimum number of workers of the pool (default is None, 8 for a new pool)
+    """
+    blockchain_instance = blockchain_instance or shared_blockchain_instance()
+    with SharedInstancePool.lock:
+        pool = getattr(blockchain_instance, "_instance_pool", None)
+        if pool is None or pool.blockchain is not blockchain_instance:
+            pool = BlockchainInstancePool(blockchain_instance, size=size or 8)
+            blockchain_instance._instance_pool = pool
+    with pool.condition:
+        if size is not None and size > pool.size:
+            pool.size = size
+            pool.condition.notify_all()
+    return pool
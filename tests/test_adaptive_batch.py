@@ -0,0 +1,94 @@
+import unittest
+
+from blurtapi.batchsize import AdaptiveBatchSize
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtpy import Blurt
+from blurtpy.account import Account
+from blurtpy.blockchain import Blockchain
+
+
+class TestAdaptiveBatchSize(unittest.TestCase):
+    def test_aimd(self):
+        controller = AdaptiveBatchSize(initial=10, max_size=100, target_latency=1., increase=5)
+        self.assertEqual(controller.get("a"), 10)
+        controller.record("a", 10, 0.1)
+        self.assertEqual(controller.get("a"), 20)
+        controller.record("a", 20, 0.1)
+        controller.record("a", 40, 0.1)
+        controller.record("a", 80, 0.1)
+        self.assertEqual(controller.get("a"), 100)
+        controller.record("a", 100, 2.)
+        self.assertEqual(controller.get("a"), 50)
+        # additive increase after the first decrease
+        controller.record("a", 50, 0.1)
+        self.assertEqual(controller.get("a"), 55)
+        controller.record("a", 55, 0.1, truncated=True)
+        self.assertEqual(controller.get("a"), 27)
+        controller.record("a", 27, 0.1, error=True)
+        self.assertEqual(controller.get("a"), 13)
+        # smaller batches at the end of a range do not change the size
+        controller.record("a", 3, 0.1)
+        self.assertEqual(controller.get("a"), 13)
+        self.assertEqual(controller.get("b"), 10)
+
+    def test_reply_size(self):
+        controller = AdaptiveBatchSize(initial=64, max_reply_bytes=1000)
+        controller.record("a", 64, 0.1, reply_bytes=2000)
+        self.assertEqual(controller.get("a"), 32)
+        for i in range(10):
+            controller.record("a", 1, 0.1, error=True)
+        self.assertEqual(controller.get("a"), 1)
+
+    def test_stats(self):
+        controller = AdaptiveBatchSize(initial=10)
+        controller.record("a", 10, 1.)
+        controller.record("a", 20, 0.5)
+        controller.record("a", 40, 0.1, error=True)
+        stats = controller.stats()["a"]
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["items"], 30)
+        self.assertAlmostEqual(stats["throughput"], 20.)
+        self.assertEqual(stats["best_size"], 20)
+        self.assertAlmostEqual(stats["sizes"][10]["throughput"], 10.)
+        with self.assertRaises(ValueError):
+            AdaptiveBatchSize(decrease=1)
+
+
+class TestAdaptiveBackfill(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        chain = LocalChain(head_block_num=400, accounts=["alice", "bob"], transfers_per_block=1)
+        cls.node = LocalNode(chain=chain).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+
+    def test_blocks(self):
+        controller = AdaptiveBatchSize(initial=5)
+        blockchain = Blockchain(blockchain_instance=self.blurt, mode="head")
+        blocks = blockchain.blocks(start=1, stop=300, max_batch_size=100, adaptive_batch=controller)
+        self.assertEqual([b.block_num for b in blocks], list(range(1, 301)))
+        stats = controller.stats()[self.node.url]
+        self.assertEqual(stats["items"], 300)
+        self.assertEqual(stats["size"], 100)
+        self.assertEqual(stats["errors"], 0)
+        self.assertGreater(stats["throughput"], 0)
+
+    def test_history(self):
+        account = Account("alice", blockchain_instance=self.blurt)
+        expected = [h["index"] for h in account.history(use_block_num=False, batch_size=200)]
+        controller = AdaptiveBatchSize(initial=2)
+        history = [h["index"] for h in account.history(use_block_num=False, batch_size=200, adaptive_batch=controller)]
+        self.assertEqual(history, expected)
+        self.assertGreater(controller.stats()[self.node.url]["batches"], 3)
+        reverse = [h["index"] for h in account.history_reverse(use_block_num=False, batch_size=200, adaptive_batch=True)]
+        self.assertEqual(reverse, expected[::-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blurtapi.asyncrpc import AsyncGrapheneRPC, AsyncNodeRPC
+from blurtapi.localnode import LocalNode
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with _Handler.lock:
+            _Handler.in_flight += 1
+            _Handler.max_in_flight = max(_Handler.max_in_flight, _Handler.in_flight)
+        if payload["method"].endswith("get_config"):
+            result = {"BLURT_BLOCKCHAIN_VERSION": "0.8.2"}
+        else:
+            time.sleep(0.05)
+            result = {"block_num": payload["params"]["block_num"]}
+        with _Handler.lock:
+            _Handler.in_flight -= 1
+        data = json.dumps({"jsonrpc": "2.0", "id": payload["id"], "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncRPC(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.server.daemon_threads = True
+        cls.url = "http://127.0.0.1:%d" % cls.server.server_address[1]
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_concurrent_calls(self):
+        async def run():
+            async with AsyncGrapheneRPC(self.url, num_retries=1, max_in_flight=8) as rpc:
+                self.assertTrue(rpc.is_appbase_ready())
+                return await asyncio.gather(*[rpc.get_block({"block_num": n}, api="block") for n in range(16)])
+
+        _Handler.max_in_flight = 0
+        replies = asyncio.run(run())
+        self.assertEqual([r["block_num"] for r in replies], list(range(16)))
+        self.assertGreater(_Handler.max_in_flight, 1)
+        self.assertLessEqual(_Handler.max_in_flight, 8)
+
+    def test_node_rpc(self):
+        async def run():
+            async with AsyncNodeRPC(self.url, num_retries=1) as rpc:
+                return await rpc.get_block({"block_num": 7}, api="block")
+
+        self.assertEqual(asyncio.run(run()), {"block_num": 7})
+
+    def test_adaptive_node_selection(self):
+        with LocalNode(latency=0.03) as slow, LocalNode() as fast:
+            async def run():
+                async with AsyncNodeRPC([slow.url, fast.url], num_retries=5, node_selection="adaptive") as rpc:
+                    replies = []
+                    for i in range(6):
+                        replies.append(await rpc.get_dynamic_global_properties(api="database"))
+                    return rpc.url, replies
+
+            url, replies = asyncio.run(run())
+            self.assertEqual(url, fast.url)
+            self.assertEqual(len(replies), 6)
+            self.assertEqual(fast.get_stats()["calls"]["database_api.get_config"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode, RPCMethodError
+from blurtpy import Blurt
+from blurtpy.blockchain import Blockchain
+
+
+class TestBlockRange(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=500, transfers_per_block=1)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+        self.blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+
+    def _calls(self, method):
+        return self.node.get_stats()["calls"].get(method, 0)
+
+    def test_range_fetch(self):
+        ranges = self._calls("block_api.get_block_range")
+        requests = self.node.get_stats()["requests"]
+        blocks = list(self.blockchain.blocks(start=1, stop=450, range_size=100))
+        self.assertEqual([b.block_num for b in blocks], list(range(1, 451)))
+        self.assertEqual(blocks[10]["id"], 11)
+        self.assertEqual(self._calls("block_api.get_block_range") - ranges, 5)
+        range_requests = self.node.get_stats()["requests"] - requests
+
+        requests = self.node.get_stats()["requests"]
+        list(self.blockchain.blocks(start=1, stop=450))
+        self.assertGreater(self.node.get_stats()["requests"] - requests, 10 * range_requests)
+
+    def test_projection_and_stream(self):
+        blocks = list(self.blockchain.blocks(start=1, stop=200, range_size=100, projection=["transactions.operations"]))
+        self.assertEqual([b.block_num for b in blocks], list(range(1, 201)))
+        self.assertNotIn("witness", blocks[0])
+        ops = list(self.blockchain.stream(opNames=["transfer"], start=1, stop=200, range_size=100))
+        self.assertEqual(len(ops), 200)
+        self.assertEqual(ops[-1]["block_num"], 200)
+
+    def test_fallback(self):
+        def get_block_range(args, appbase):
+            raise RPCMethodError("Assert Exception:method_itr != api_itr->second.end(): Could not find method get_block_range")
+        with LocalNode(chain=LocalChain(head_block_num=200)) as node:
+            node.handler._get_block_range = get_block_range
+            blurt = Blurt(node=node.url, num_retries=2, chain_cache=False)
+            blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+            blocks = blockchain.blocks(start=1, stop=150, range_size=50, max_batch_size=50)
+            self.assertEqual([b.block_num for b in blocks], list(range(1, 151)))
+            self.assertEqual(blockchain.block_range_unsupported, set([node.url]))
+            self.assertEqual(node.get_stats()["calls"]["block_api.get_block_range"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
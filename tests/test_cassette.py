@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from blurtapi.cassette import Cassette
+from blurtapi.chaincache import ChainCache
+from blurtapi.exceptions import CassetteMiss
+from blurtapi.graphenerpc import GrapheneRPC
+
+CONFIG = {"BLURT_BLOCKCHAIN_VERSION": "0.8.2", "BLURT_CHAIN_ID": "cd8d90f29ae273abec3eaa7731e25934c63eb654d55080caff2ebb7f5df6381f"}
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = json.dumps(reply).encode("utf8")
+
+
+class FakeNode(object):
+    def __init__(self):
+        self.head = 100
+
+    def answer(self, request):
+        name = request["method"].split(".")[-1]
+        if name == "get_config":
+            result = CONFIG
+        elif name == "get_dynamic_global_properties":
+            self.head += 1
+            result = {"head_block_number": self.head}
+        else:
+            result = {"block": {"block_id": "%08x" % request["params"]["block_num"]}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        if isinstance(payload, list):
+            return FakeResponse([self.answer(p) for p in payload])
+        return FakeResponse(self.answer(payload))
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "calls.jsonl.gz")
+        cassette = Cassette(self.path, mode="record")
+        rpc = GrapheneRPC("https://fake.node", autoconnect=False, chain_cache=False, num_retries=0, cassette=cassette)
+        rpc.request_send = FakeNode()
+        rpc.rpcconnect()
+        rpc.get_dynamic_global_properties(api="database")
+        rpc.get_dynamic_global_properties(api="database")
+        with rpc.batch() as b:
+            for n in range(1, 4):
+                b.get_block({"block_num": n}, api="block")
+        cassette.close()
+        self.assertEqual(cassette.recorded_cnt, 6)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def get_replay_rpc(self, **kwargs):
+        cassette = Cassette(self.path, **kwargs)
+        return GrapheneRPC("wss://offline.node", chain_cache=False, num_retries=0, cassette=cassette)
+
+    def test_replay_without_network(self):
+        rpc = self.get_replay_rpc()
+        self.assertTrue(rpc.is_appbase_ready())
+        self.assertIsNone(rpc.ws)
+        self.assertEqual(rpc.get_dynamic_global_properties(api="database"), {"head_block_number": 101})
+        self.assertEqual(rpc.get_dynamic_global_properties(api="database"), {"head_block_number": 102})
+        self.assertEqual(rpc.get_dynamic_global_properties(api="database"), {"head_block_number": 102})
+        self.assertEqual(rpc.get_block({"block_num": 2}, api="block"), {"block": {"block_id": "00000002"}})
+        with rpc.batch() as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in [3, 1]]
+        self.assertEqual([f.result()["block"]["block_id"] for f in futures], ["00000003", "00000001"])
+
+    def test_missing_request(self):
+        rpc = self.get_replay_rpc()
+        self.assertRaises(CassetteMiss, rpc.get_block, {"block_num": 42}, api="block")
+
+    def test_simulated_latency(self):
+        rpc = self.get_replay_rpc(latency=0.05)
+        start = time.time()
+        rpc.get_block({"block_num": 1}, api="block")
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test_record_with_warm_chain_cache(self):
+        cache = ChainCache()
+        cache.set("https://fake.node", CONFIG, "appbase")
+        path = os.path.join(self.tmpdir, "warm.jsonl")
+        cassette = Cassette(path, mode="record")
+        rpc = GrapheneRPC("https://fake.node", autoconnect=False, chain_cache=cache, num_retries=0, cassette=cassette)
+        rpc.request_send = FakeNode()
+        rpc.rpcconnect()
+        rpc.get_dynamic_global_properties(api="database")
+        cassette.close()
+        self.assertIsNone(rpc.chain_cache)
+        # replay in a new process, which has no cached chain detection
+        script = ("from blurtapi.cassette import Cassette; from blurtapi.graphenerpc import GrapheneRPC; "
+                  "rpc = GrapheneRPC('https://fake.node', num_retries=0, cassette=Cassette(%r)); "
+                  "print(rpc.get_dynamic_global_properties(api='database')['head_block_number'])" % path)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=root)
+        self.assertEqual(output.strip(), b"101")
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, Cassette, self.path, mode="stream")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from blurtapi.cassette import Cassette
+from blurtapi.chaincache import ChainCache
+from blurtapi.graphenerpc import GrapheneRPC
+
+CONFIG = {"BLURT_BLOCKCHAIN_VERSION": "0.8.2", "BLURT_CHAIN_ID": "cd8d90f29ae273abec3eaa7731e25934c63eb654d55080caff2ebb7f5df6381f"}
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = json.dumps(reply).encode("utf8")
+
+
+class FakeNode(object):
+    def __init__(self):
+        self.methods = []
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        self.methods.append(payload["method"])
+        result = CONFIG if payload["method"].endswith("get_config") else {}
+        return FakeResponse({"jsonrpc": "2.0", "id": payload["id"], "result": result})
+
+
+def connect(cache):
+    node = FakeNode()
+    rpc = GrapheneRPC("https://fake.node", autoconnect=False, num_retries=0, chain_cache=cache)
+    rpc.request_send = node
+    rpc.rpcconnect()
+    return rpc, node
+
+
+class TestChainCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_connect_skips_get_config(self):
+        cache = ChainCache()
+        rpc, node = connect(cache)
+        self.assertEqual(node.methods, ["database_api.get_config"])
+        self.assertEqual(cache.get("https://fake.node")["rpc_method"], "appbase")
+        rpc, node = connect(cache)
+        self.assertEqual(node.methods, [])
+        self.assertTrue(rpc.is_appbase_ready())
+        # only the detection on connect is answered by the cache
+        self.assertEqual(rpc.get_config(api="database"), CONFIG)
+        self.assertEqual(node.methods, ["database_api.get_config"])
+
+    def test_disabled(self):
+        rpc, node = connect(False)
+        rpc.get_config(api="database")
+        self.assertEqual(len(node.methods), 2)
+        self.assertIsNone(rpc.chain_cache)
+        rpc = GrapheneRPC("https://fake.node", autoconnect=False)
+        self.assertIsNone(rpc.chain_cache)
+
+    def test_no_revalidation_on_replay(self):
+        path = os.path.join(self.tmpdir, "calls.jsonl")
+        cassette = Cassette(path, mode="record")
+        rpc = GrapheneRPC("https://fake.node", autoconnect=False, num_retries=0, cassette=cassette)
+        rpc.request_send = FakeNode()
+        rpc.rpcconnect()
+        cassette.close()
+        cache = ChainCache(revalidate_after=0)
+        cache.set("https://fake.node", CONFIG, "appbase")
+        rpc = GrapheneRPC("https://fake.node", num_retries=0, chain_cache=cache, cassette=Cassette(path))
+        self.assertTrue(rpc.is_appbase_ready())
+        self.assertEqual(cache.revalidating, set())
+
+    def test_disk_and_ttl(self):
+        path = os.path.join(self.tmpdir, "chains.json")
+        connect(ChainCache(path=path))
+        rpc, node = connect(ChainCache(path=path))
+        self.assertEqual(node.methods, [])
+        cache = ChainCache(path=path, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("https://fake.node"))
+
+    def test_revalidation(self):
+        cache = ChainCache(revalidate_after=0)
+        cache.set("https://fake.node", CONFIG, "appbase")
+        self.assertTrue(cache.needs_revalidation("https://fake.node"))
+        self.assertFalse(cache.needs_revalidation("https://fake.node"))
+        cache.revalidation_done("https://fake.node", dict(CONFIG, BLURT_BLOCKCHAIN_VERSION="0.8.3"))
+        self.assertEqual(cache.get("https://fake.node")["props"]["BLURT_BLOCKCHAIN_VERSION"], "0.8.3")
+        self.assertTrue(cache.needs_revalidation("https://fake.node"))
+        cache.revalidation_done("https://fake.node", dict(CONFIG, BLURT_CHAIN_ID="00"))
+        self.assertIsNone(cache.get("https://fake.node"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtpy import Blurt
+from blurtpy.blockchain import Blockchain
+from blurtpy.checkpoint import Checkpoint, FileCheckpointStore, SQLiteCheckpointStore
+
+
+def _key(op):
+    return (op["block_num"], op["trx_num"], op["_id"])
+
+
+class TestCheckpointStores(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_file_store(self):
+        store = FileCheckpointStore(os.path.join(self.path, "checkpoint.json"))
+        self.assertIsNone(store.load())
+        store.save((10, 2, 1))
+        self.assertEqual(store.load(), (10, 2, 1))
+        store.save((11, None, None))
+        self.assertEqual(FileCheckpointStore(store.path).load(), (11, None, None))
+        self.assertEqual(os.listdir(self.path), ["checkpoint.json"])
+
+    def test_sqlite_store(self):
+        path = os.path.join(self.path, "checkpoint.sqlite")
+        store = SQLiteCheckpointStore(path, name="a")
+        store.save((10, 2, 1))
+        SQLiteCheckpointStore(path, name="b").save((5, None, None))
+        self.assertEqual(SQLiteCheckpointStore(path, name="a").load(), (10, 2, 1))
+        self.assertEqual(SQLiteCheckpointStore(path, name="b").load(), (5, None, None))
+        self.assertIsNone(SQLiteCheckpointStore(path, name="c").load())
+
+    def test_batched_flushes(self):
+        store = FileCheckpointStore(os.path.join(self.path, "checkpoint.json"))
+        checkpoint = Checkpoint(store, interval=100, max_delay=None)
+        for i in range(250):
+            checkpoint.processed((1, i, 0))
+        self.assertEqual(checkpoint.flushes, 2)
+        self.assertEqual(store.load(), (1, 199, 0))
+        checkpoint.close()
+        self.assertEqual(Checkpoint(store).start_block(), 1)
+        self.assertTrue(Checkpoint(store).is_processed(1, 249, 0))
+        self.assertFalse(Checkpoint(store).is_processed(1, 250, 0))
+
+
+class TestResumableStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=100, transfers_per_block=3)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+        self.blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+        self.expected = [_key(op) for op in self.blockchain.stream(opNames=["transfer"], start=1, stop=40)]
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _stream(self, checkpoint):
+        return self.blockchain.stream(opNames=["transfer"], start=1, stop=40, checkpoint=checkpoint)
+
+    def test_resume_after_crash(self):
+        store = FileCheckpointStore(os.path.join(self.path, "checkpoint.json"))
+        stream = self._stream(Checkpoint(store, interval=10))
+        delivered = [_key(next(stream)) for i in range(26)]
+        # crash: the position of the 20th operation was written, 21 to 26 are delivered again
+        resumed = [_key(op) for op in self._stream(Checkpoint(store, interval=10))]
+        self.assertEqual(resumed, self.expected[20:])
+        self.assertEqual(delivered, self.expected[:26])
+        stream.close()
+
+    def test_exactly_once(self):
+        db = sqlite3.connect(os.path.join(self.path, "consumer.sqlite"))
+        db.execute("CREATE TABLE results (block_num INTEGER, trx_num INTEGER, id TEXT)")
+        store = SQLiteCheckpointStore(connection=db, name="transfers", commit=False)
+        checkpoint = Checkpoint(store, interval=None)
+        for i, op in enumerate(self._stream(checkpoint)):
+            db.execute("INSERT INTO results VALUES (?, ?, ?)", _key(op))
+            if i % 7 == 6:
+                checkpoint.flush()
+                db.commit()
+            if i == 30:
+                # crash before the commit of results 28 to 31
+                db.rollback()
+                break
+        checkpoint = Checkpoint(SQLiteCheckpointStore(connection=db, name="transfers", commit=False), interval=None)
+        for op in self._stream(checkpoint):
+            db.execute("INSERT INTO results VALUES (?, ?, ?)", _key(op))
+        db.commit()
+        results = [tuple(row) for row in db.execute("SELECT block_num, trx_num, id FROM results ORDER BY rowid")]
+        self.assertEqual(results, self.expected)
+        db.close()
+
+    def test_blocks(self):
+        store = FileCheckpointStore(os.path.join(self.path, "blocks.json"))
+        blocks = self.blockchain.blocks(start=1, stop=50, checkpoint=Checkpoint(store))
+        self.assertEqual([next(blocks).block_num for i in range(20)], list(range(1, 21)))
+        # block 20 is processed when the next block is requested
+        blocks.close()
+        self.assertEqual(store.load(), (19, None, None))
+        blocks = self.blockchain.blocks(start=1, stop=50, checkpoint=Checkpoint(store))
+        self.assertEqual([b.block_num for b in blocks], list(range(20, 51)))
+
+
+if __name__ == '__main__':
+    unittest.main()
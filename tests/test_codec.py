@@ -0,0 +1,55 @@
+import json
+import unittest
+
+from blurtapi.codec import JSONCodec, available_codecs, get_codec
+from blurtapi.exceptions import RPCError, RPCErrorDoRetry
+from blurtapi.graphenerpc import GrapheneRPC
+
+
+class FakeResponse(object):
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+class TestCodec(unittest.TestCase):
+    def test_roundtrip(self):
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "call", "params": ["condenser_api", "get_accounts", [["ünïcode"]]]}
+        for name in available_codecs():
+            codec = get_codec(name)
+            data = codec.dumps(payload)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(json.loads(data.decode("utf8")), payload)
+            self.assertEqual(codec.loads(data), payload)
+            self.assertEqual(codec.loads(data.decode("utf8")), payload)
+
+    def test_control_characters_and_big_ints(self):
+        for name in available_codecs():
+            codec = get_codec(name)
+            self.assertEqual(codec.loads(b'{"body": "a\tb"}'), {"body": "a\tb"})
+            self.assertEqual(codec.loads(codec.dumps({"n": 2 ** 70})), {"n": 2 ** 70})
+            self.assertRaises(ValueError, codec.loads, b"<html>502 Bad Gateway</html>")
+
+    def test_get_codec(self):
+        self.assertEqual(get_codec().name, available_codecs()[0])
+        codec = JSONCodec()
+        self.assertIs(get_codec(codec), codec)
+        self.assertRaises(ValueError, get_codec, "pickle")
+
+    def test_server_error_from_status_code(self):
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0)
+        rpc.request_send = lambda data: FakeResponse(b"<html>Some proxy page</html>", status_code=502)
+        self.assertRaises(RPCErrorDoRetry, rpc.get_block, 1, api="condenser")
+        rpc.request_send = lambda data: FakeResponse(b"<html>Some proxy page</html>", status_code=200)
+        with self.assertRaises(RPCError) as cm:
+            rpc.get_block(1, api="condenser")
+        self.assertIn("Expected JSON", str(cm.exception))
+
+    def test_rpcexec_decodes_bytes(self):
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0, json_codec="json")
+        rpc.request_send = lambda data: FakeResponse(b'{"jsonrpc": "2.0", "id": 1, "result": {"body": "\xc3\xa9"}}')
+        self.assertEqual(rpc.get_block(1, api="condenser"), {"body": "é"})
+
+
+if __name__ == '__main__':
+    unittest.main()
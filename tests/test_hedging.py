@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+import unittest
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.hedging import HedgePolicy, get_method_name
+
+
+class FakeResponse(object):
+    def __init__(self, reply, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = json.dumps(reply)
+        self.content = self.text.encode("utf8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeNodes(object):
+    """Answers on every url, after a delay which is set per url, the ``throttled`` urls with HTTP 429"""
+    def __init__(self, delays, throttled=()):
+        self.rpc = None
+        self.delays = delays
+        self.throttled = throttled
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def __call__(self, data, url=None):
+        if url is None:
+            url = self.rpc.url
+        payload = json.loads(data)
+        with self.lock:
+            self.calls.append((url, payload["method"]))
+        time.sleep(self.delays.get(url, 0))
+        if url in self.throttled:
+            return FakeResponse({"error": "Too Many Requests"}, status_code=429, headers={"Retry-After": "5"})
+        return FakeResponse({"jsonrpc": "2.0", "id": payload["id"], "result": {"url": url}})
+
+
+def get_rpc(nodes, policy):
+    rpc = GrapheneRPC(["https://slow.node", "https://fast.node"], disable_chain_detection=True,
+                      node_selection="round_robin", num_retries=0, num_retries_call=0, hedge=policy)
+    rpc.request_send = nodes
+    nodes.rpc = rpc
+    return rpc
+
+
+class TestHedging(unittest.TestCase):
+    def test_method_name(self):
+        self.assertEqual(get_method_name({"method": "condenser_api.get_block"}), ("condenser_api", "get_block"))
+        self.assertEqual(get_method_name([{"method": "condenser_api.get_block"}]), (None, None))
+
+    def test_no_hedge_before_min_samples(self):
+        nodes = FakeNodes({"https://slow.node": 0.05})
+        policy = HedgePolicy(min_samples=5)
+        rpc = get_rpc(nodes, policy)
+        for i in range(5):
+            self.assertEqual(rpc.get_block(1, api="condenser")["url"], "https://slow.node")
+        self.assertEqual(len(nodes.calls), 5)
+        self.assertEqual(policy.stats()["get_block"]["hedged"], 0)
+        self.assertIsNotNone(policy.get_delay("get_block"))
+
+    def test_hedge_wins_on_slow_primary(self):
+        nodes = FakeNodes({"https://slow.node": 1.0})
+        policy = HedgePolicy(min_samples=5)
+        for i in range(5):
+            policy.record("get_block", 0.01)
+        rpc = get_rpc(nodes, policy)
+        start = time.time()
+        self.assertEqual(rpc.get_block(1, api="condenser")["url"], "https://fast.node")
+        self.assertLess(time.time() - start, 0.5)
+        stats = policy.stats()["get_block"]
+        self.assertEqual(stats["hedged"], 1)
+        self.assertEqual(stats["wins"], 1)
+        self.assertEqual(stats["win_rate"], 1.)
+
+    def test_throttled_hedge_is_charged_to_its_node(self):
+        nodes = FakeNodes({"https://slow.node": 0.2}, throttled=["https://fast.node"])
+        policy = HedgePolicy(min_samples=5)
+        for i in range(5):
+            policy.record("get_block", 0.01)
+        rpc = get_rpc(nodes, policy)
+        self.assertEqual(rpc.get_block(1, api="condenser")["url"], "https://slow.node")
+        self.assertFalse(rpc.nodes[0].rate_limiter.cooling_down())
+        self.assertTrue(rpc.nodes[1].rate_limiter.cooling_down())
+
+    def test_broadcast_is_not_hedged(self):
+        nodes = FakeNodes({"https://slow.node": 0.1})
+        policy = HedgePolicy(min_samples=1)
+        policy.record("broadcast_transaction", 0.001)
+        rpc = get_rpc(nodes, policy)
+        rpc.broadcast_transaction({}, api="network_broadcast")
+        self.assertEqual(nodes.calls, [("https://slow.node", "network_broadcast_api.broadcast_transaction")])
+        self.assertEqual(policy.stats(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.httppool import shared_node_session, get_pool_stats
+from blurtapi.localnode import LocalNode
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if payload["method"].endswith("get_config"):
+            result = {"BLURT_BLOCKCHAIN_VERSION": "0.8.2", "BLURT_CHAIN_ID": "cd8d"}
+        else:
+            time.sleep(0.01)
+            result = {"block_num": payload["params"]["block_num"]}
+        data = json.dumps({"jsonrpc": "2.0", "id": payload["id"], "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_address[1]
+
+
+class TestHTTPPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server1, cls.url1 = _start_server()
+        cls.server2, cls.url2 = _start_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in [cls.server1, cls.server2]:
+            server.shutdown()
+            server.server_close()
+
+    def _call_threaded(self, rpc, threads, calls):
+        def call(n):
+            return rpc.get_block({"block_num": n}, api="block")
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(call, range(calls)))
+
+    def test_connections_are_reused(self):
+        rpc = GrapheneRPC(self.url1, num_retries=1, chain_cache=False, pool_maxsize=4)
+        replies = self._call_threaded(rpc, 4, 60)
+        self.assertEqual([r["block_num"] for r in replies], list(range(60)))
+        stats = rpc.pool_stats()[self.url1]
+        self.assertGreaterEqual(stats["requests"], 61)
+        self.assertLessEqual(stats["new_connections"], 5)
+        self.assertEqual(stats["discarded_connections"], 0)
+        self.assertGreater(stats["reuse_ratio"], 0.9)
+
+    def test_requests_use_pool_of_current_node(self):
+        with LocalNode(latency=0.03) as slow, LocalNode() as fast:
+            rpc = GrapheneRPC([slow.url, fast.url], num_retries=5, node_selection="adaptive")
+            for i in range(6):
+                rpc.get_block({"block_num": 1}, api="block")
+            self.assertEqual(rpc.url, fast.url)
+            self.assertIs(rpc.session, rpc._get_session(fast.url))
+            stats = rpc.pool_stats()
+            self.assertEqual(stats[slow.url]["requests"], slow.get_stats()["requests"])
+            self.assertEqual(stats[fast.url]["requests"], fast.get_stats()["requests"])
+            self.assertGreater(stats[fast.url]["requests"], 1)
+
+    def test_small_pool_discards_connections(self):
+        rpc = GrapheneRPC(self.url1, num_retries=1, chain_cache=False, pool_maxsize=1)
+        self._call_threaded(rpc, 6, 30)
+        stats = rpc.pool_stats()[self.url1]
+        self.assertGreater(stats["discarded_connections"], 0)
+        self.assertGreater(stats["new_connections"], 1)
+
+    def test_blocking_pool_keeps_connections(self):
+        rpc = GrapheneRPC(self.url1, num_retries=1, chain_cache=False, pool_maxsize=2, pool_block=True)
+        self._call_threaded(rpc, 6, 30)
+        stats = rpc.pool_stats()[self.url1]
+        self.assertEqual(stats["discarded_connections"], 0)
+        self.assertLessEqual(stats["new_connections"], 2)
+
+    def test_session_per_node(self):
+        session1 = shared_node_session(self.url1, pool_maxsize=3)
+        session2 = shared_node_session(self.url2, pool_maxsize=3)
+        self.assertIsNot(session1, session2)
+        self.assertIs(session1, shared_node_session(self.url1, pool_maxsize=3))
+        rpc = GrapheneRPC([self.url1, self.url2], num_retries=1, chain_cache=False, pool_maxsize=3)
+        self.assertIs(rpc.session, session1)
+        self.assertEqual(set(rpc.pool_stats().keys()), set([self.url1, self.url2]))
+        self.assertIsNone(get_pool_stats(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from blurtapi.chaincache import ChainCache
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtpy import Blurt
+from blurtpy.block import Block
+from blurtpy.blockchain import Blockchain
+from blurtpy.instance import BlockchainInstancePool, shared_instance_pool
+
+
+class TestInstancePool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=100)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=ChainCache())
+
+    def test_workers_share_state(self):
+        pool = BlockchainInstancePool(self.blurt, size=2)
+        worker = pool.acquire()
+        self.assertIsNot(worker.rpc, self.blurt.rpc)
+        self.assertIsNot(worker.txbuffer, self.blurt.txbuffer)
+        self.assertIs(worker.txbuffer.blockchain, worker)
+        self.assertIs(worker.config, self.blurt.config)
+        self.assertIs(worker.wallet, self.blurt.wallet)
+        self.assertIs(worker.rpc.chain_cache, self.blurt.rpc.chain_cache)
+        self.assertEqual(worker.rpc.url, self.blurt.rpc.url)
+        self.assertEqual(worker.rpc.num_retries, 2)
+        pool.release(worker)
+        self.assertIs(pool.acquire(), worker)
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["in_use"], 1)
+
+    def test_size_limit(self):
+        pool = BlockchainInstancePool(self.blurt, size=1)
+        with pool.instance():
+            with self.assertRaises(RuntimeError):
+                pool.acquire(timeout=0.05)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_shared_pool(self):
+        pool = shared_instance_pool(self.blurt, size=2)
+        self.assertIs(shared_instance_pool(self.blurt), pool)
+        self.assertEqual(shared_instance_pool(self.blurt, size=4).size, 4)
+
+    def test_threads(self):
+        pool = BlockchainInstancePool(self.blurt, size=4)
+        config_calls = self.node.get_stats()["calls"]["database_api.get_config"]
+
+        def get_block(n):
+            with pool.instance() as blurt:
+                return Block(n, blockchain_instance=blurt).block_num
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(list(executor.map(get_block, range(1, 41))), list(range(1, 41)))
+        self.assertLessEqual(pool.stats()["created"], 4)
+        # the chain detection of the base instance is used by all workers
+        self.assertEqual(self.node.get_stats()["calls"]["database_api.get_config"], config_calls)
+
+    def test_detection_without_chain_cache(self):
+        with LocalNode(chain=LocalChain(head_block_num=100)) as node:
+            blurt = Blurt(node=node.url, num_retries=2)
+            self.assertIsNone(blurt.rpc.chain_cache)
+            pool = BlockchainInstancePool(blurt, size=4)
+            workers = [pool.acquire() for i in range(4)]
+            self.assertEqual([Block(5, blockchain_instance=w).block_num for w in workers], [5] * 4)
+            self.assertEqual(node.get_stats()["calls"]["database_api.get_config"], 1)
+            self.assertIsNone(blurt.rpc.chain_cache)
+
+    def test_threaded_blocks(self):
+        blockchain = Blockchain(blockchain_instance=self.blurt, mode="head")
+        block_nums = [b.block_num for b in blockchain.blocks(start=10, stop=30, threading=True, thread_num=4)]
+        self.assertEqual(block_nums, list(range(10, 31)))
+
+
+if __name__ == '__main__':
+    unittest.main()
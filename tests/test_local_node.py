@@ -0,0 +1,105 @@
+import json
+import unittest
+
+import requests
+
+from blurtapi.exceptions import NoMethodWithName
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtapi.noderpc import NodeRPC
+
+
+class TestLocalChain(unittest.TestCase):
+    def test_blocks_are_deterministic(self):
+        chain1, chain2 = LocalChain(head_block_num=10), LocalChain(head_block_num=10)
+        self.assertEqual(chain1.get_block(5), chain2.get_block(5))
+        self.assertEqual(int(chain1.get_block(5)["block_id"][:8], 16), 5)
+        self.assertEqual(chain1.get_block(4)["block_id"], chain1.get_block(5)["previous"])
+        self.assertIsNone(chain1.get_block(11))
+
+    def test_account_history(self):
+        chain = LocalChain(head_block_num=20, accounts=["a", "b"], transfers_per_block=1)
+        history = chain.get_account_history("a", -1, 4)
+        self.assertEqual(len(history), 5)
+        last_index = history[-1][0]
+        self.assertEqual([h[0] for h in history], list(range(last_index - 4, last_index + 1)))
+        self.assertEqual(len(chain.get_account_history("a", 3, 10)), 4)
+        rewards = chain.get_account_history("a", -1, 2, operation_filter=set(["producer_reward"]))
+        self.assertEqual([h[1]["op"][0] for h in rewards], ["producer_reward"] * 3)
+
+    def test_broadcast_is_in_next_block(self):
+        chain = LocalChain(head_block_num=10)
+        trx = {"operations": [["transfer", {"from": "alice", "to": "bob", "amount": "1.000 BLURT", "memo": ""}]]}
+        trx_id, block_num, trx_num = chain.broadcast(trx)
+        self.assertEqual(chain.produce_block(), block_num)
+        block = chain.get_block(block_num)
+        self.assertEqual(block["transaction_ids"][-1], trx_id)
+        self.assertEqual(block["transactions"][-1], trx)
+
+    def test_fixture(self):
+        block = LocalChain(head_block_num=7).get_block(7)
+        chain = LocalChain(fixture={"blocks": [block], "config": {"BLURT_BLOCK_INTERVAL": 6}})
+        self.assertEqual(chain.head_block_num, 7)
+        self.assertEqual(chain.get_block(7), block)
+        self.assertEqual(chain.config["BLURT_BLOCK_INTERVAL"], 6)
+
+
+class TestLocalNode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=100)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_dialects(self):
+        for url in [self.node.url, self.node.ws_url]:
+            rpc = NodeRPC(url, num_retries=1, chain_cache=False)
+            appbase = rpc.get_block({"block_num": 3}, api="block")["block"]
+            condenser = rpc.get_block(3, api="condenser")
+            self.assertEqual(appbase, condenser)
+            ops = rpc.get_ops_in_block({"block_num": 3, "only_virtual": True}, api="account_history")["ops"]
+            self.assertEqual(ops, rpc.get_ops_in_block(3, True, api="condenser"))
+            blocks = rpc.get_block_range({"starting_block_num": 98, "count": 5}, api="block")["blocks"]
+            self.assertEqual(len(blocks), 3)
+            accounts = rpc.find_accounts({"accounts": ["alice", "nobody"]}, api="database")["accounts"]
+            self.assertEqual([a["name"] for a in accounts], ["alice"])
+            self.assertEqual(rpc.get_dynamic_global_properties(api="database")["head_block_number"], 100)
+            rpc.rpcclose()
+
+    def test_batch(self):
+        rpc = NodeRPC(self.node.url, num_retries=1, chain_cache=False)
+        with rpc.batch() as batch:
+            replies = [batch.get_block({"block_num": n}, api="block") for n in range(1, 6)]
+        self.assertEqual([int(r.result()["block"]["block_id"][:8], 16) for r in replies], list(range(1, 6)))
+
+    def test_unknown_method(self):
+        rpc = NodeRPC(self.node.url, num_retries=1, num_retries_call=1, chain_cache=False)
+        with self.assertRaises(NoMethodWithName):
+            rpc.get_witness_schedule(api="database")
+
+    def test_injected_faults(self):
+        self.node.inject(429, retry_after=0)
+        response = requests.post(self.node.url, data=json.dumps({"jsonrpc": "2.0", "id": 1, "method": "database_api.get_config", "params": {}}))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "0")
+        rpc = NodeRPC(self.node.url, num_retries=1, num_retries_call=5, chain_cache=False, timeout=5)
+        rpc.nodes.sleep_and_check_retries = lambda *args, **kwargs: None
+        self.node.inject(503, count=2)
+        faults = self.node.get_stats()["faults"]
+        self.assertEqual(rpc.get_block({"block_num": 2}, api="block")["block"]["block_id"][:8], "00000002")
+        self.assertEqual(self.node.get_stats()["faults"], faults + 2)
+
+    def test_failover(self):
+        broken = LocalNode(chain=LocalChain(head_block_num=100), error_rate=1.).start()
+        try:
+            rpc = NodeRPC([broken.url, self.node.url], num_retries=5, num_retries_call=1,
+                          chain_cache=False, timeout=5)
+            self.assertEqual(rpc.get_block({"block_num": 2}, api="block")["block"]["block_id"][:8], "00000002")
+            self.assertGreater(broken.get_stats()["faults"], 0)
+        finally:
+            broken.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
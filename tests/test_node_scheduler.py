@@ -0,0 +1,93 @@
+import json
+import time
+import unittest
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.localnode import LocalNode
+from blurtapi.node import Nodes, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN, CIRCUIT_CLOSED
+
+URLS = ["https://node1.example", "https://node2.example", "https://node3.example"]
+
+
+class TestNodeScheduler(unittest.TestCase):
+    def test_round_robin(self):
+        nodes = Nodes(URLS, 5, 5, node_selection="round_robin")
+        self.assertEqual([next(nodes) for i in range(4)], URLS + URLS[:1])
+
+    def test_best_latency_wins(self):
+        nodes = Nodes(URLS, 5, 5, node_selection="adaptive")
+        for url, latency in zip(URLS, [0.3, 0.05, 0.2]):
+            nodes.current_node_index = URLS.index(url)
+            nodes.record_success(latency)
+        self.assertEqual(next(nodes), URLS[1])
+        self.assertEqual(nodes.scores()[0]["url"], URLS[1])
+
+    def test_error_rate_penalty(self):
+        nodes = Nodes(URLS[:2], -1, 5, node_selection="adaptive")
+        nodes[0].record_success(0.1)
+        nodes[1].record_success(0.2)
+        nodes[0].record_failure()
+        self.assertGreater(nodes[0].score, nodes[1].score)
+        self.assertEqual(nodes.best_node_index(), 1)
+
+    def test_circuit_breaker(self):
+        nodes = Nodes(URLS[:2], -1, 5, failure_threshold=2, backoff_base=10)
+        node = nodes[0]
+        node.record_failure()
+        self.assertEqual(node.circuit, CIRCUIT_CLOSED)
+        node.record_failure()
+        self.assertEqual(node.circuit, CIRCUIT_OPEN)
+        self.assertTrue(5 <= node.open_until - time.time() <= 15)
+        self.assertEqual(nodes.best_node_index(), 1)
+        # half open after the backoff, a failed probe doubles the backoff
+        node.open_until = time.time() - 1
+        self.assertTrue(node.is_available())
+        self.assertEqual(node.circuit, CIRCUIT_HALF_OPEN)
+        node.record_failure()
+        self.assertEqual(node.circuit, CIRCUIT_OPEN)
+        self.assertTrue(10 <= node.open_until - time.time() <= 30)
+        node.open_until = time.time() - 1
+        node.is_available()
+        node.record_success(0.1)
+        self.assertEqual(node.circuit, CIRCUIT_CLOSED)
+
+    def test_rpc_routes_to_fast_node(self):
+        class Response(object):
+            status_code = 200
+            text = json.dumps({"jsonrpc": "2.0", "id": 1, "result": {}})
+            content = text.encode("utf8")
+
+            def json(self):
+                return json.loads(self.text)
+
+        rpc = GrapheneRPC(URLS[:2], disable_chain_detection=True, num_retries=5, node_selection="adaptive")
+        calls = []
+
+        def request_send(payload):
+            calls.append(rpc.url)
+            time.sleep(0.05 if rpc.url == URLS[0] else 0.001)
+            return Response()
+        rpc.request_send = request_send
+        for i in range(6):
+            rpc.get_config(api="database")
+        self.assertEqual(calls[:2], URLS[:2])
+        self.assertEqual(calls[2:], [URLS[1]] * 4)
+
+    def test_default_is_round_robin(self):
+        self.assertEqual(Nodes(URLS, 5, 5).node_selection, "round_robin")
+
+    def test_switch_connects_to_new_node(self):
+        with LocalNode(latency=0.03) as slow, LocalNode() as fast:
+            rpc = GrapheneRPC([slow.url, fast.ws_url], node_selection="adaptive", chain_cache=False, num_retries=5)
+            for i in range(5):
+                rpc.get_dynamic_global_properties(api="database")
+            # the calls moved to the websocket node after its chain was detected
+            self.assertEqual(rpc.url, fast.ws_url)
+            self.assertIsNotNone(rpc.ws)
+            self.assertEqual(fast.get_stats()["calls"]["database_api.get_config"], 1)
+            self.assertGreater(fast.get_stats()["calls"]["database_api.get_dynamic_global_properties"], 0)
+            rpc.rpcclose()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtpy import Blurt
+from blurtpy.blockchain import Blockchain, OperationRecord
+
+
+class TestOperationRecords(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=100, transfers_per_block=3)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+        self.blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+
+    def test_same_as_dicts(self):
+        ops = list(self.blockchain.stream(opNames=["transfer"], start=1, stop=30))
+        records = list(self.blockchain.stream(opNames=["transfer"], start=1, stop=30, op_records=True))
+        self.assertEqual(len(records), 90)
+        self.assertEqual([r.to_dict() for r in records], ops)
+        vops = list(self.blockchain.stream(start=1, stop=30, only_virtual_ops=True))
+        records = list(self.blockchain.stream(start=1, stop=30, only_virtual_ops=True, op_records=True))
+        self.assertEqual([r.to_dict() for r in records], vops)
+
+    def test_record(self):
+        record = next(self.blockchain.stream(opNames=["transfer"], start=5, stop=5, op_records=True))
+        self.assertIsInstance(record, OperationRecord)
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual((record.type, record.block_num, record.trx_num), ("transfer", 5, 0))
+        self.assertEqual(record["type"], "transfer")
+        self.assertEqual(record["amount"], record.op["amount"])
+        self.assertIn("memo", record)
+        self.assertIsNone(record.get("weight"))
+        self.assertIsNone(record._hash)
+        self.assertEqual(record["_id"], Blockchain.hash_op(["transfer", record.op]))
+        self.assertEqual(record.timestamp.year, record["timestamp"].year)
+
+    def test_lazy_timestamp(self):
+        record = OperationRecord("producer_reward", {"producer": "alice"}, ["producer_reward", {"producer": "alice"}],
+                                 "2024-01-01T00:00:03", 1, 0, "0" * 40)
+        self.assertEqual(record._timestamp, "2024-01-01T00:00:03")
+        self.assertEqual(record.timestamp.second, 3)
+        self.assertIsNotNone(record.timestamp.tzinfo)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import time
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtpy import Blurt
+from blurtpy.blockchain import Blockchain
+from blurtpy.instance import shared_instance_pool
+
+
+class TestPrefetchBlocks(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=300), latency=0.005).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        blurt = Blurt(node=self.node.url, num_retries=5, chain_cache=False)
+        self.blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+
+    def _get_block_calls(self):
+        return self.node.get_stats()["calls"].get("block_api.get_block", 0)
+
+    def test_in_order(self):
+        blocks = self.blockchain.blocks(start=1, stop=200, threading=True, thread_num=4, prefetch_window=8)
+        block_nums = [b.block_num for b in blocks]
+        self.assertEqual(block_nums, list(range(1, 201)))
+
+    def test_workers_are_reused(self):
+        for i in range(3):
+            blocks = self.blockchain.blocks(start=1, stop=40, threading=True, thread_num=4)
+            self.assertEqual(len(list(blocks)), 40)
+        stats = shared_instance_pool(self.blockchain.blockchain).stats()
+        self.assertLessEqual(stats["created"], 4)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_window_is_bounded(self):
+        calls = self._get_block_calls()
+        blocks = self.blockchain.blocks(start=1, stop=200, threading=True, thread_num=4, prefetch_window=6)
+        for i in range(3):
+            next(blocks)
+        # wait until all started fetches are done
+        time.sleep(0.5)
+        # one call for the current block, the first block started 6 fetches
+        # and each further block one more
+        self.assertEqual(self._get_block_calls() - calls, 1 + 6 + 2)
+        blocks.close()
+
+    def test_retries(self):
+        chain = LocalChain(head_block_num=120)
+        with LocalNode(chain=chain, error_rate=0.1, seed=1) as node:
+            # failed calls are not repeated by the rpc, but fetched again by the pipeline
+            blurt = Blurt(node=node.url, num_retries=10, num_retries_call=0, chain_cache=False, failure_threshold=100)
+            blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+            block_nums = [b.block_num for b in blockchain.blocks(start=1, stop=120, threading=True, thread_num=8)]
+            self.assertEqual(block_nums, list(range(1, 121)))
+            self.assertGreater(node.get_stats()["faults"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
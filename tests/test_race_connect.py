@@ -0,0 +1,66 @@
+import time
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtapi.noderpc import NodeRPC
+
+
+class TestRaceConnect(unittest.TestCase):
+    def setUp(self):
+        self.slow = LocalNode(chain=LocalChain(head_block_num=100), latency=0.5).start()
+        self.fast = LocalNode(chain=LocalChain(head_block_num=100)).start()
+
+    def tearDown(self):
+        self.slow.stop()
+        self.fast.stop()
+
+    def test_fastest_node_is_used(self):
+        start = time.time()
+        rpc = NodeRPC([self.slow.url, self.fast.url], num_retries=2, chain_cache=False, race_connect=2)
+        self.assertLess(time.time() - start, 0.4)
+        self.assertEqual(rpc.url, self.fast.url)
+        # the slow node is still probed, it must not look like an unknown node
+        self.assertTrue(rpc.nodes[0].latency_is_bound)
+        self.assertEqual(rpc.get_block({"block_num": 1}, api="block")["block"]["block_id"][:8], "00000001")
+        self.assertEqual(rpc.url, self.fast.url)
+        self.assertEqual(self.fast.get_stats()["calls"]["database_api.get_config"], 1)
+
+    def test_runner_up_is_standby(self):
+        rpc = NodeRPC([self.slow.url, self.fast.url], num_retries=2, chain_cache=False, race_connect=2)
+        for i in range(20):
+            if self.slow.url in rpc.standby:
+                break
+            time.sleep(0.1)
+        self.assertIn(self.slow.url, rpc.standby)
+        rpc.nodes.select_url(self.fast.url)
+        rpc.nodes.record_failure()
+        rpc.nodes.record_failure()
+        rpc.nodes.record_failure()
+        rpc.rpcconnect()
+        self.assertEqual(rpc.url, self.slow.url)
+        self.assertNotIn(self.slow.url, rpc.standby)
+        # the chain was detected by the probe, no second get_config
+        self.assertEqual(self.slow.get_stats()["calls"]["database_api.get_config"], 1)
+
+    def test_websocket_standby(self):
+        rpc = NodeRPC([self.fast.ws_url, self.slow.ws_url], num_retries=2, chain_cache=False, race_connect=2)
+        self.assertEqual(rpc.url, self.fast.ws_url)
+        self.assertEqual(rpc.get_block({"block_num": 2}, api="block")["block"]["block_id"][:8], "00000002")
+        self.assertEqual(self.fast.get_stats()["calls"]["database_api.get_config"], 1)
+        for i in range(20):
+            if self.slow.ws_url in rpc.standby:
+                break
+            time.sleep(0.1)
+        self.assertTrue(rpc.standby[self.slow.ws_url]["ws"].connected)
+        rpc.rpcclose()
+        self.assertEqual(rpc.standby, {})
+
+    def test_failed_probe(self):
+        self.fast.inject(503)
+        rpc = NodeRPC([self.fast.url, self.slow.url], num_retries=2, chain_cache=False, race_connect=2)
+        self.assertEqual(rpc.url, self.slow.url)
+        self.assertEqual(rpc.nodes[0].failure_cnt, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import email.utils
+import json
+import threading
+import time
+import unittest
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.ratelimit import TokenBucket, parse_retry_after
+
+
+class FakeResponse(object):
+    def __init__(self, reply, status_code=200, headers=None):
+        self.content = json.dumps(reply).encode("utf8")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class ThrottlingNodes(object):
+    """The first node answers with 429 once, the second node always answers"""
+    def __init__(self):
+        self.rpc = None
+        self.urls = []
+
+    def __call__(self, data, url=None):
+        if url is None:
+            url = self.rpc.url
+        self.urls.append(url)
+        payload = json.loads(data)
+        if url == "https://node1.example" and self.urls.count(url) == 1:
+            return FakeResponse({"error": "Too Many Requests"}, status_code=429, headers={"Retry-After": "30"})
+        return FakeResponse({"jsonrpc": "2.0", "id": payload["id"], "result": {"url": url}})
+
+
+class TestRateLimit(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after(" 2 "), 2.)
+        self.assertIsNone(parse_retry_after("soon"))
+        date = email.utils.formatdate(time.time() + 10, usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(date), 10, delta=1.5)
+
+    def test_rate(self):
+        bucket = TokenBucket(rate=20, burst=1)
+        start = time.time()
+        for i in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+    def test_unlimited_until_throttled(self):
+        bucket = TokenBucket()
+        for i in range(50):
+            self.assertTrue(bucket.try_acquire())
+        bucket.on_throttled(0.2)
+        self.assertTrue(bucket.cooling_down())
+        self.assertFalse(bucket.try_acquire())
+        self.assertIsNotNone(bucket.rate)
+        start = time.time()
+        bucket.acquire()
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        rate = bucket.rate
+        bucket.on_success()
+        self.assertGreater(bucket.rate, rate)
+
+    def test_recovers_to_unlimited(self):
+        bucket = TokenBucket()
+        for i in range(50):
+            bucket.try_acquire()
+        bucket.on_throttled(0)
+        self.assertEqual(bucket.rate, 25.)
+        rates = []
+        for i in range(600):
+            bucket.on_success()
+            rates.append(bucket.rate)
+        # the rate grows up to the 50 requests/s before the 429, then the limit is removed
+        self.assertIsNone(bucket.rate)
+        self.assertLessEqual(max(r for r in rates if r is not None), 50.)
+        self.assertEqual(bucket.burst, 1)
+        for i in range(50):
+            self.assertTrue(bucket.try_acquire())
+
+    def test_waiting_callers_are_served_in_order(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        bucket.acquire()
+        order = []
+
+        def worker(i):
+            bucket.acquire()
+            order.append(i)
+        threads = []
+        for i in range(5):
+            t = threading.Thread(target=worker, args=(i, ))
+            t.start()
+            threads.append(t)
+            time.sleep(0.005)
+        for t in threads:
+            t.join()
+        self.assertEqual(order, list(range(5)))
+
+    def test_throttled_node_is_skipped(self):
+        nodes = ThrottlingNodes()
+        rpc = GrapheneRPC(["https://node1.example", "https://node2.example"], disable_chain_detection=True,
+                          num_retries=5, num_retries_call=5, node_selection="adaptive")
+        rpc.request_send = nodes
+        nodes.rpc = rpc
+        start = time.time()
+        self.assertEqual(rpc.get_config(api="database")["url"], "https://node2.example")
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(nodes.urls, ["https://node1.example", "https://node2.example"])
+        node1 = rpc.nodes[0]
+        self.assertTrue(node1.rate_limiter.cooling_down())
+        self.assertEqual(node1.get_stats()["rate_limit"]["throttled_cnt"], 1)
+
+    def test_round_robin_failover(self):
+        nodes = ThrottlingNodes()
+        rpc = GrapheneRPC(["https://node1.example", "https://node2.example"], disable_chain_detection=True,
+                          num_retries=5, num_retries_call=5)
+        self.assertEqual(rpc.nodes.node_selection, "round_robin")
+        rpc.request_send = nodes
+        nodes.rpc = rpc
+        start = time.time()
+        self.assertEqual(rpc.get_config(api="database")["url"], "https://node2.example")
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(nodes.urls, ["https://node1.example", "https://node2.example"])
+        self.assertEqual(rpc.nodes[0].error_cnt, 0)
+        # the throttled node is skipped while it cools down
+        rpc.rpcconnect()
+        self.assertEqual(rpc.url, "https://node2.example")
+
+
+if __name__ == '__main__':
+    unittest.main()
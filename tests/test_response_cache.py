@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtapi.responsecache import ResponseCache, get_dependent_block_num
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = json.dumps(reply).encode("utf8")
+
+
+class FakeNode(object):
+    """Answers get_block and get_dynamic_global_properties with a LIB of 100"""
+    def __init__(self):
+        self.methods = []
+
+    def answer(self, request):
+        name = request["method"].split(".")[-1]
+        self.methods.append(name)
+        if name == "get_dynamic_global_properties":
+            result = {"head_block_number": 120, "last_irreversible_block_num": 100}
+        else:
+            num = request["params"]["block_num"]
+            result = {"block": {"block_id": "%08x" % num, "transactions": []}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        if isinstance(payload, list):
+            return FakeResponse([self.answer(p) for p in payload])
+        return FakeResponse(self.answer(payload))
+
+
+def get_rpc(node, cache):
+    rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0,
+                      response_cache=cache)
+    rpc.request_send = node
+    return rpc
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_dependent_block_num(self):
+        self.assertEqual(get_dependent_block_num("get_block", [5], {"block_id": "x"}), 5)
+        self.assertEqual(get_dependent_block_num("get_block", {"block_num": 5}, {"block": {}}), 5)
+        self.assertEqual(get_dependent_block_num("get_block_range", {"starting_block_num": 5, "count": 10}, {"blocks": [1]}), 14)
+        self.assertEqual(get_dependent_block_num("get_transaction", ["abcd"], {"block_num": 7}), 7)
+        self.assertIsNone(get_dependent_block_num("get_block", [5], None))
+        self.assertIsNone(get_dependent_block_num("get_account_history", ["alice", -1, 10], [[1, {}]]))
+
+    def test_only_irreversible_blocks_are_cached(self):
+        node = FakeNode()
+        rpc = get_rpc(node, True)
+        self.assertEqual(rpc.get_block({"block_num": 50}, api="block"), {"block": {"block_id": "00000032", "transactions": []}})
+        self.assertEqual(node.methods, ["get_block", "get_dynamic_global_properties"])
+        block = rpc.get_block({"block_num": 50}, api="block")
+        block["block"]["transactions"].append("changed")
+        self.assertEqual(rpc.get_block({"block_num": 50}, api="block")["block"]["transactions"], [])
+        rpc.get_block({"block_num": 110}, api="block")
+        rpc.get_block({"block_num": 110}, api="block")
+        self.assertEqual(node.methods.count("get_block"), 3)
+        stats = rpc.response_cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["stored"], 1)
+        self.assertEqual(stats["rejected"], 2)
+        self.assertEqual(stats["last_irreversible_block_num"], 100)
+
+    def test_batch_uses_cache(self):
+        node = FakeNode()
+        rpc = get_rpc(node, True)
+        rpc.get_dynamic_global_properties(api="database")
+        with rpc.batch() as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in range(1, 11)]
+        with rpc.batch() as b:
+            futures += [b.get_block({"block_num": n}, api="block") for n in range(1, 11)]
+        self.assertEqual(node.methods.count("get_block"), 10)
+        self.assertEqual(futures[0].result(), futures[10].result())
+
+    def test_disk_tier(self):
+        path = os.path.join(self.tmpdir, "cache.sqlite")
+        node = FakeNode()
+        cache = ResponseCache(path=path)
+        rpc = get_rpc(node, cache)
+        rpc.get_dynamic_global_properties(api="database")
+        rpc.get_block({"block_num": 1}, api="block")
+        cache.close()
+        rpc = get_rpc(node, path)
+        self.assertEqual(rpc.get_block({"block_num": 1}, api="block")["block"]["block_id"], "00000001")
+        self.assertEqual(node.methods.count("get_block"), 1)
+        self.assertEqual(rpc.response_cache.stats()["disk_hits"], 1)
+        rpc.response_cache.close()
+
+    def test_chains_share_file(self):
+        path = os.path.join(self.tmpdir, "cache.sqlite")
+        testnet = LocalChain(head_block_num=100)
+        testnet.config["BLURT_CHAIN_ID"] = "11" * 32
+        with LocalNode(chain=LocalChain(head_block_num=100)) as mainnet_node, LocalNode(chain=testnet) as testnet_node:
+            for node in [mainnet_node, testnet_node, mainnet_node]:
+                rpc = GrapheneRPC(node.url, num_retries=0, num_retries_call=0, response_cache=path)
+                rpc.get_block({"block_num": 1}, api="block")
+                rpc.response_cache.close()
+            self.assertEqual(mainnet_node.get_stats()["calls"]["block_api.get_block"], 1)
+            self.assertEqual(testnet_node.get_stats()["calls"]["block_api.get_block"], 1)
+        cache = ResponseCache(path=path)
+        query = {"method": "block_api.get_block", "params": {"block_num": 1}}
+        self.assertTrue(cache.get(cache.get_key(query, chain_id="11" * 32))[0])
+        self.assertFalse(cache.get(cache.get_key(query))[0])
+        cache.close()
+
+    def test_lru_size_limit(self):
+        cache = ResponseCache(max_bytes=100)
+        cache.set_last_irreversible_block_num(1000)
+        for n in range(10):
+            query = {"method": "block_api.get_block", "params": {"block_num": n}}
+            cache.update(query, {"block": {"block_id": "%040d" % n}})
+        self.assertLessEqual(cache.size, 100)
+        self.assertEqual(len(cache), 1)
+        found, result = cache.get(cache.get_key({"method": "block_api.get_block", "params": {"block_num": 9}}))
+        self.assertTrue(found)
+
+
+if __name__ == '__main__':
+    unittest.main()
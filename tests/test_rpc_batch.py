@@ -0,0 +1,122 @@
+import json
+import threading
+import unittest
+
+from blurtapi.exceptions import RPCError
+from blurtapi.graphenerpc import GrapheneRPC
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.text = reply if isinstance(reply, str) else json.dumps(reply)
+        self.content = self.text.encode("utf8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeNode(object):
+    """Answers batches in reverse order; fails block 13, only once when ``flaky`` is set"""
+    def __init__(self, supports_batch=True, flaky=False, broken_batches=0):
+        self.supports_batch = supports_batch
+        self.flaky = flaky
+        self.broken_batches = broken_batches
+        self.failed = 0
+        self.requests = []
+
+    def answer(self, request):
+        num = request["params"]["block_num"]
+        if num == 13 and (not self.flaky or self.failed == 0):
+            self.failed += 1
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"message": "unknown block"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": {"block_num": num}}
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        self.requests.append(payload)
+        if isinstance(payload, list):
+            if not self.supports_batch:
+                return FakeResponse({"jsonrpc": "2.0", "id": None, "error": {"message": "Batch requests are not supported"}})
+            if self.broken_batches > 0:
+                self.broken_batches -= 1
+                return FakeResponse("Loop Detected")
+            return FakeResponse([self.answer(p) for p in reversed(payload)])
+        return FakeResponse(self.answer(payload))
+
+
+def get_rpc(node):
+    rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0)
+    rpc.request_send = node
+    return rpc
+
+
+class TestRPCBatch(unittest.TestCase):
+    def test_batch_maps_replies_by_id(self):
+        node = FakeNode()
+        rpc = get_rpc(node)
+        with rpc.batch(chunk_size=4) as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in range(10, 20)]
+        # the failed call of block 13 is sent again on its own
+        self.assertEqual(len(node.requests), 4)
+        self.assertEqual(node.requests[1]["params"], {"block_num": 13})
+        for n, f in zip(range(10, 20), futures):
+            if n == 13:
+                self.assertRaises(RPCError, f.result)
+            else:
+                self.assertEqual(f.result(), {"block_num": n})
+
+    def test_fallback_to_single_calls(self):
+        node = FakeNode(supports_batch=False)
+        rpc = get_rpc(node)
+        with rpc.batch(chunk_size=2) as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in range(1, 6)]
+        self.assertEqual([f.result()["block_num"] for f in futures], [1, 2, 3, 4, 5])
+        # only the first chunk is tried as a batch
+        self.assertEqual(sum(isinstance(r, list) for r in node.requests), 1)
+
+    def test_failed_call_is_retried(self):
+        node = FakeNode(flaky=True)
+        rpc = get_rpc(node)
+        with rpc.batch(chunk_size=4) as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in range(10, 20)]
+        self.assertEqual([f.result()["block_num"] for f in futures], list(range(10, 20)))
+
+    def test_failed_batch_keeps_batching(self):
+        node = FakeNode(broken_batches=1)
+        rpc = get_rpc(node)
+        batch = rpc.batch(chunk_size=2)
+        with batch as b:
+            futures = [b.get_block({"block_num": n}, api="block") for n in range(1, 7)]
+        self.assertEqual([f.result()["block_num"] for f in futures], [1, 2, 3, 4, 5, 6])
+        self.assertTrue(batch.batch_supported)
+        # the first batch failed and was sent as single calls, the next ones as batches
+        self.assertEqual([isinstance(r, list) for r in node.requests], [True, False, False, True, True])
+
+    def test_exception_inside_block_cancels_calls(self):
+        node = FakeNode()
+        rpc = get_rpc(node)
+        with self.assertRaises(ZeroDivisionError):
+            with rpc.batch() as b:
+                f = b.get_block({"block_num": 1}, api="block")
+                1 / 0
+        self.assertTrue(f.cancelled())
+        self.assertEqual(node.requests, [])
+
+    def test_rpc_queue_is_per_thread(self):
+        node = FakeNode()
+        rpc = get_rpc(node)
+        rpc.get_block({"block_num": 1}, api="block", add_to_queue=True)
+
+        def other_thread():
+            self.assertEqual(rpc.get_block({"block_num": 2}, api="block"), {"block_num": 2})
+        t = threading.Thread(target=other_thread)
+        t.start()
+        t.join()
+        self.assertEqual(len(rpc.rpc_queue), 1)
+        self.assertEqual(rpc.get_block({"block_num": 3}, api="block"), [{"block_num": 1}, {"block_num": 3}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtapi.node import Nodes
+from blurtapi.noderpc import NodeRPC
+
+
+def _run_in_thread(function):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class TestPerCallState(unittest.TestCase):
+    def test_call_retries(self):
+        nodes = Nodes(["https://node1.example", "https://node2.example"], 5, 5)
+        with nodes.call_retries(1):
+            self.assertEqual(nodes.num_retries_call, 1)
+            self.assertEqual(_run_in_thread(lambda: nodes.num_retries_call), 5)
+            with nodes.call_retries(None):
+                self.assertEqual(nodes.num_retries_call, 1)
+        self.assertEqual(nodes.num_retries_call, 5)
+
+    def test_error_cnt_call(self):
+        nodes = Nodes(["https://node1.example", "https://node2.example"], 5, 2)
+        nodes.increase_error_cnt_call()
+        nodes.increase_error_cnt_call()
+        self.assertTrue(nodes.num_retries_call_reached)
+        self.assertEqual(_run_in_thread(lambda: nodes.error_cnt_call), 0)
+        self.assertFalse(_run_in_thread(lambda: nodes.num_retries_call_reached))
+        nodes.reset_error_cnt_call()
+        self.assertEqual(nodes.error_cnt_call, 0)
+
+
+class TestRPCThreads(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=200), latency=0.02).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def _get_blocks(self, rpc, block_nums, threads):
+        def get_block(block_num):
+            block = rpc.get_block({"block_num": block_num}, api="block", num_retries_call=block_num % 3)
+            return int(block["block"]["block_id"][:8], 16)
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(get_block, block_nums))
+
+    def test_concurrent_calls(self):
+        for url in [self.node.url, self.node.ws_url]:
+            rpc = NodeRPC(url, num_retries=1, num_retries_call=4, chain_cache=False)
+            block_nums = list(range(1, 81))
+            self.assertEqual(self._get_blocks(rpc, block_nums, 8), block_nums)
+            self.assertEqual(rpc.num_retries_call, 4)
+            self.assertEqual(rpc.error_cnt_call, 0)
+            rpc.rpcclose()
+
+    def test_scaling(self):
+        pool_size = 8
+        rpc = NodeRPC(self.node.url, num_retries=1, chain_cache=False, pool_maxsize=pool_size)
+        block_nums = list(range(1, 4 * pool_size + 1))
+        durations = {}
+        for threads in [1, pool_size]:
+            start = time.time()
+            self._get_blocks(rpc, block_nums, threads)
+            durations[threads] = time.time() - start
+        # 8 threads are ideally 8 times faster than one thread
+        self.assertGreater(durations[1] / durations[pool_size], pool_size / 2.)
+
+    def test_next_node_on_empty_reply(self):
+        rpc = NodeRPC(self.node.url, num_retries=1, chain_cache=False)
+        rpc.set_next_node_on_empty_reply(True)
+        self.assertFalse(_run_in_thread(lambda: rpc.next_node_on_empty_reply))
+        rpc.get_config(api="database")
+        self.assertFalse(rpc.next_node_on_empty_reply)
+        rpc.get_block({"block_num": 1}, api="block", next_node_on_empty_reply=True)
+        self.assertFalse(rpc.next_node_on_empty_reply)
+
+
+if __name__ == '__main__':
+    unittest.main()
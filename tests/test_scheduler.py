@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from blurtapi.localnode import LocalChain, LocalNode
+from blurtapi.noderpc import NodeRPC
+from blurtapi.scheduler import PriorityScheduler
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    def _start_waiting(self, scheduler, priority, started):
+        def run():
+            ticket = scheduler.acquire(priority)
+            started.append(priority)
+            scheduler.release(ticket)
+        thread = threading.Thread(target=run)
+        thread.start()
+        for i in range(100):
+            if scheduler.stats()[priority]["queued"] > 0:
+                break
+            time.sleep(0.01)
+        return thread
+
+    def test_higher_priority_goes_first(self):
+        scheduler = PriorityScheduler(max_in_flight=1)
+        ticket = scheduler.acquire("bulk")
+        started = []
+        threads = [self._start_waiting(scheduler, "bulk", started),
+                   self._start_waiting(scheduler, "normal", started),
+                   self._start_waiting(scheduler, "interactive", started)]
+        self.assertEqual(started, [])
+        scheduler.release(ticket)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(started, ["interactive", "normal", "bulk"])
+
+    def test_bulk_is_limited_while_busy(self):
+        scheduler = PriorityScheduler(limits={"bulk": 3})
+        tickets = [scheduler.acquire("bulk") for i in range(3)]
+        self.assertEqual(scheduler.stats()["bulk"]["in_flight"], 3)
+        for ticket in tickets:
+            scheduler.release(ticket)
+        interactive = scheduler.acquire("interactive")
+        bulk = scheduler.acquire("bulk")
+        started = []
+        thread = self._start_waiting(scheduler, "bulk", started)
+        self.assertEqual(started, [])
+        self.assertEqual(scheduler.stats()["bulk"]["queued"], 1)
+        scheduler.release(interactive)
+        thread.join()
+        self.assertEqual(started, ["bulk"])
+        scheduler.release(bulk)
+
+    def test_stats(self):
+        scheduler = PriorityScheduler(limits={"interactive": 2})
+        scheduler.release(scheduler.acquire("interactive"))
+        stats = scheduler.stats()
+        self.assertEqual(stats["interactive"]["limit"], 2)
+        self.assertEqual(stats["interactive"]["completed"], 1)
+        self.assertEqual(stats["interactive"]["latency"]["count"], 1)
+        self.assertEqual(stats["interactive"]["wait"]["count"], 1)
+        self.assertEqual(stats["bulk"]["completed"], 0)
+        with self.assertRaises(ValueError):
+            scheduler.acquire("urgent")
+        with self.assertRaises(ValueError):
+            PriorityScheduler(limits={"bulk": 0})
+
+
+class TestSchedulerRPC(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=100), latency=0.05).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_priority_context(self):
+        rpc = NodeRPC(self.node.url, num_retries=1, chain_cache=False, scheduler=True)
+        self.assertEqual(rpc.get_priority(), "normal")
+        with rpc.priority("bulk"):
+            self.assertEqual(rpc.get_priority(), "bulk")
+            rpc.get_block({"block_num": 1}, api="block")
+            rpc.get_block({"block_num": 2}, api="block", priority="interactive")
+            self.assertEqual(rpc.get_priority(), "bulk")
+        self.assertEqual(rpc.get_priority(), "normal")
+        stats = rpc.scheduler.stats()
+        self.assertEqual(stats["bulk"]["completed"], 1)
+        self.assertEqual(stats["interactive"]["completed"], 1)
+        with self.assertRaises(ValueError):
+            rpc.get_block({"block_num": 1}, api="block", priority="urgent")
+
+    def test_interactive_calls_skip_the_backfill(self):
+        scheduler = PriorityScheduler(limits={"bulk": 1})
+        rpc = NodeRPC(self.node.url, num_retries=1, chain_cache=False, scheduler=scheduler)
+
+        def backfill(n):
+            with rpc.priority("bulk"):
+                return rpc.get_block({"block_num": n + 1}, api="block")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(backfill, n) for n in range(16)]
+            time.sleep(0.1)
+            start = time.time()
+            rpc.get_dynamic_global_properties(api="database", priority="interactive")
+            latency = time.time() - start
+            self.assertGreater(scheduler.stats()["bulk"]["queued"], 0)
+            [f.result() for f in futures]
+        # the interactive call waits for at most one bulk call
+        self.assertLess(latency, 0.5)
+        stats = scheduler.stats()
+        self.assertEqual(stats["bulk"]["completed"], 16)
+        self.assertGreater(stats["bulk"]["max_queued"], 1)
+        self.assertEqual(stats["bulk"]["in_flight"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+import unittest
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.singleflight import SingleFlight
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = json.dumps(reply).encode("utf8")
+
+
+class SlowNode(object):
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def __call__(self, data):
+        payload = json.loads(data)
+        with self.lock:
+            self.requests.append(payload["method"])
+        time.sleep(self.delay)
+        return FakeResponse({"jsonrpc": "2.0", "id": payload["id"], "result": {"head_block_number": 1, "list": [1]}})
+
+
+def run_threads(func, n):
+    results = [None] * n
+
+    def worker(i):
+        results[i] = func()
+    threads = [threading.Thread(target=worker, args=(i, )) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_identical_calls_are_coalesced(self):
+        node = SlowNode()
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0,
+                          coalesce_calls=True)
+        rpc.request_send = node
+        results = run_threads(lambda: rpc.get_dynamic_global_properties(api="database"), 8)
+        self.assertEqual(len(node.requests), 1)
+        self.assertTrue(all(r == results[0] for r in results))
+        results[0]["list"].append(2)
+        self.assertEqual(results[1]["list"], [1])
+        stats = rpc.single_flight.stats()
+        self.assertEqual(stats["hits"], 7)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_broadcast_and_disabled(self):
+        node = SlowNode(delay=0.05)
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0,
+                          coalesce_calls=True)
+        rpc.request_send = node
+        run_threads(lambda: rpc.broadcast_transaction({}, api="network_broadcast"), 4)
+        self.assertEqual(len(node.requests), 4)
+        # coalescing is off by default
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0, num_retries_call=0)
+        rpc.request_send = node
+        run_threads(lambda: rpc.get_dynamic_global_properties(api="database"), 4)
+        self.assertEqual(len(node.requests), 8)
+        self.assertIsNone(rpc.single_flight)
+
+    def test_error_is_raised_in_all_callers(self):
+        flights = SingleFlight()
+        errors = []
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError("node error")
+
+        def call():
+            try:
+                flights.do("key", fail)
+            except ValueError as e:
+                errors.append(e)
+        run_threads(call, 4)
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(flights.in_flight, 0)
+        self.assertEqual(flights.stats()["misses"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
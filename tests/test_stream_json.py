@@ -0,0 +1,133 @@
+import json
+import unittest
+
+from blurtapi.exceptions import NoMethodWithName
+from blurtapi.localnode import LocalChain, LocalNode, RPCMethodError
+from blurtapi.noderpc import NodeRPC
+from blurtapi.streamjson import ArrayNotFound, Projection, iter_json_array, ijson
+from blurtpy import Blurt
+from blurtpy.block import Blocks
+from blurtpy.blockchain import Blockchain
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestStreamJSON(unittest.TestCase):
+    parser = "json"
+
+    def setUp(self):
+        blocks = [{"block_id": "%08x" % i, "witness": "wé\"]}",
+                   "transactions": [{"operations": [["transfer", {"amount": 1.5}]], "signatures": ["aa"]}]}
+                  for i in range(20)]
+        self.reply = {"jsonrpc": "2.0", "id": 1, "result": {"other": [1, {"a": "]"}], "blocks": blocks}}
+        self.data = json.dumps(self.reply, ensure_ascii=False).encode("utf8")
+
+    def test_chunk_sizes(self):
+        for size in [1, 3, 64, len(self.data)]:
+            items = list(iter_json_array(_chunks(self.data, size), ("result", "blocks"), parser=self.parser))
+            self.assertEqual(items, self.reply["result"]["blocks"])
+
+    def test_projection(self):
+        projection = Projection(["block_id", "transactions.operations"])
+        items = list(iter_json_array(_chunks(self.data, 100), ("result", "blocks"), projection=projection, parser=self.parser))
+        self.assertEqual(items[2], {"block_id": "00000002", "transactions": [{"operations": [["transfer", {"amount": 1.5}]]}]})
+        self.assertEqual(Projection({"a": True}).include("b.c", "a.d").spec, {"a": True, "b": {"c": True}})
+
+    def test_top_level_array(self):
+        data = json.dumps([{"id": 1, "result": 1}, {"id": 2, "result": [2]}]).encode()
+        self.assertEqual(list(iter_json_array(_chunks(data, 4), (), parser=self.parser)),
+                         [{"id": 1, "result": 1}, {"id": 2, "result": [2]}])
+
+    def test_missing_array(self):
+        with self.assertRaises(ArrayNotFound) as cm:
+            list(iter_json_array([b'{"id": 1, "error": {"message": "x"}}'], ("result", "blocks"), parser=self.parser))
+        self.assertEqual(cm.exception.document["error"]["message"], "x")
+        self.assertEqual(list(iter_json_array([b'{"result": {"blocks": []}}'], ("result", "blocks"), parser=self.parser)), [])
+
+
+@unittest.skipIf(ijson is None, "ijson is not installed")
+class TestStreamIjson(TestStreamJSON):
+    parser = "ijson"
+
+
+class TestStreamRPC(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=300, accounts=["alice", "bob"], transfers_per_block=2)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_rpcstream(self):
+        for url in [self.node.url, self.node.ws_url]:
+            rpc = NodeRPC(url, num_retries=1, chain_cache=False)
+            calls = self.node.get_stats()["calls"].get("block_api.get_block_range", 0)
+            query = rpc.build_query("get_block_range", [{"starting_block_num": 1, "count": 50}], {"api": "block"})
+            blocks = list(rpc.rpcstream(query, path=("result", "blocks"), projection=["block_id", "transactions.operations"]))
+            self.assertEqual(self.node.get_stats()["calls"]["block_api.get_block_range"], calls + 1)
+            self.assertEqual(len(blocks), 50)
+            self.assertEqual(sorted(blocks[0].keys()), ["block_id", "transactions"])
+            self.assertEqual(sorted(blocks[0]["transactions"][0].keys()), ["operations"])
+            rpc.rpcclose()
+
+    def test_error_reply(self):
+        rpc = NodeRPC(self.node.url, num_retries=1, num_retries_call=1, chain_cache=False)
+        query = rpc.build_query("get_witness_schedule", [], {"api": "database"})
+        with self.assertRaises(NoMethodWithName):
+            list(rpc.rpcstream(query))
+
+    def test_blocks(self):
+        blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+        blocks = Blocks(10, count=20, projection=["timestamp", "transactions.operations"], blockchain_instance=blurt)
+        self.assertEqual([b.block_num for b in blocks], list(range(10, 30)))
+        self.assertNotIn("witness", blocks[0])
+        self.assertEqual(len(blocks[0].operations), 2)
+        blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+        blocks = list(blockchain.blocks(start=1, stop=120, max_batch_size=50, projection=["transactions.operations"]))
+        self.assertEqual([b.block_num for b in blocks], list(range(1, 121)))
+        self.assertNotIn("witness", blocks[-1])
+        self.assertEqual(blocks[-1].operations[0][0], "transfer")
+
+    def _batch_blocks(self, node):
+        blurt = Blurt(node=node.url, num_retries=2, num_retries_call=2, chain_cache=False)
+        blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+        return list(blockchain.blocks(start=1, stop=120, max_batch_size=50, projection=["transactions.operations"]))
+
+    def test_blocks_truncated_batch(self):
+        with LocalNode(chain=LocalChain(head_block_num=200, transfers_per_block=1)) as node:
+            handle = node.handler.handle
+
+            def truncated(payload):
+                # answers only the first 20 calls of a batch
+                reply = handle(payload)
+                return reply[:20] if isinstance(payload, list) else reply
+            node.handler.handle = truncated
+            blocks = self._batch_blocks(node)
+            self.assertEqual([b.block_num for b in blocks], list(range(1, 121)))
+            self.assertNotIn("witness", blocks[45])
+            self.assertEqual(blocks[45].operations[0][0], "transfer")
+            # the head block, 3 batches and 60 blocks sent again one by one
+            self.assertEqual(node.get_stats()["calls"]["block_api.get_block"], 1 + 120 + 60)
+
+    def test_blocks_item_error(self):
+        with LocalNode(chain=LocalChain(head_block_num=200, transfers_per_block=1)) as node:
+            get_block = node.handler._get_block
+            failed = []
+
+            def flaky_get_block(args, appbase):
+                if args["block_num"] == 30 and len(failed) == 0:
+                    failed.append(30)
+                    raise RPCMethodError("Internal Error")
+                return get_block(args, appbase)
+            node.handler._get_block = flaky_get_block
+            blocks = self._batch_blocks(node)
+            self.assertEqual([b.block_num for b in blocks], list(range(1, 121)))
+            self.assertEqual(failed, [30])
+            self.assertEqual(node.get_stats()["calls"]["block_api.get_block"], 1 + 120 + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
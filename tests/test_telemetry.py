@@ -0,0 +1,81 @@
+import json
+import unittest
+
+from requests.exceptions import ConnectionError
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.telemetry import Telemetry
+
+
+class FakeResponse(object):
+    status_code = 200
+
+    def __init__(self, reply):
+        self.content = json.dumps(reply).encode("utf8")
+
+
+class FakeNodes(object):
+    """Fails the first request with a connection error"""
+    def __init__(self):
+        self.calls = 0
+
+    def answer(self, request):
+        return {"jsonrpc": "2.0", "id": request["id"], "result": {"block_num": 1}}
+
+    def __call__(self, data):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("connection refused")
+        payload = json.loads(data)
+        if isinstance(payload, list):
+            return FakeResponse([self.answer(p) for p in payload])
+        return FakeResponse(self.answer(payload))
+
+
+class TestTelemetry(unittest.TestCase):
+    def test_disabled_by_default(self):
+        rpc = GrapheneRPC("https://fake.node", disable_chain_detection=True, num_retries=0)
+        self.assertIsNone(rpc.telemetry)
+
+    def test_records_requests_errors_and_failovers(self):
+        events = []
+        telemetry = Telemetry()
+        telemetry.add_hook(lambda event, data: events.append(event))
+        rpc = GrapheneRPC(["https://node1.example", "https://node2.example"], disable_chain_detection=True,
+                          node_selection="round_robin", num_retries=5, num_retries_call=5, telemetry=telemetry)
+        rpc.request_send = FakeNodes()
+        rpc.get_block({"block_num": 1}, api="block")
+        with rpc.batch() as b:
+            for n in range(3):
+                b.get_block({"block_num": n}, api="block")
+        snapshot = telemetry.snapshot()
+        self.assertEqual(events, ["error", "failover", "retry", "request", "request"])
+        node1 = snapshot["methods"]["block_api.get_block"]["https://node1.example"]
+        node2 = snapshot["methods"]["block_api.get_block"]["https://node2.example"]
+        self.assertEqual(node1["errors"], {"ConnectionError": 1})
+        self.assertEqual(node2["requests"], 1)
+        self.assertEqual(node2["retries"], 1)
+        self.assertGreater(node2["response_bytes"], 0)
+        self.assertEqual(node2["latency"]["count"], 1)
+        self.assertEqual(snapshot["failovers"], [{"from_node": "https://node1.example", "to_node": "https://node2.example", "count": 1}])
+        self.assertEqual(snapshot["batch_sizes"]["count"], 1)
+        self.assertEqual(snapshot["batch_sizes"]["buckets"][5], 1)
+
+        text = telemetry.to_prometheus()
+        self.assertIn('blurtpy_rpc_requests_total{method="batch",node="https://node2.example"} 1', text)
+        self.assertIn('blurtpy_rpc_errors_total{error="ConnectionError",method="block_api.get_block",node="https://node1.example"} 1', text)
+        self.assertIn('blurtpy_rpc_request_duration_seconds_count{method="block_api.get_block",node="https://node2.example"} 1', text)
+        self.assertIn("# TYPE blurtpy_rpc_batch_size histogram", text)
+
+    def test_failing_hook_is_ignored(self):
+        telemetry = Telemetry()
+
+        def hook(event, data):
+            raise ValueError("broken hook")
+        telemetry.add_hook(hook)
+        telemetry.record_request("get_block", "https://node1.example", 0.1)
+        self.assertEqual(telemetry.snapshot()["methods"]["get_block"]["https://node1.example"]["requests"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
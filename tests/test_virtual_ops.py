@@ -0,0 +1,98 @@
+import unittest
+
+from blurtapi.localnode import LocalChain, LocalNode, RPCMethodError
+from blurtpy import Blurt
+from blurtpy.blockchain import Blockchain
+
+
+class TestVirtualOps(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = LocalNode(chain=LocalChain(head_block_num=400, transfers_per_block=1)).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        blurt = Blurt(node=self.node.url, num_retries=2, chain_cache=False)
+        self.blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+
+    def _calls(self, method):
+        return self.node.get_stats()["calls"].get(method, 0)
+
+    def test_virtual_ops(self):
+        calls = self._calls("account_history_api.enum_virtual_ops")
+        ops = list(self.blockchain.virtual_ops(start=1, stop=350, range_size=100))
+        self.assertEqual([op["block"] for op in ops], list(range(1, 351)))
+        self.assertEqual(ops[0]["op"][0], "producer_reward")
+        self.assertEqual(self._calls("account_history_api.enum_virtual_ops") - calls, 4)
+        self.assertEqual(len(list(self.blockchain.virtual_ops(start=1, stop=50, op_names=["author_reward"]))), 0)
+
+    def test_pagination(self):
+        pages = []
+
+        def enum_virtual_ops(args, appbase):
+            pages.append(args.get("operation_begin", 0))
+            ops, next_block, next_operation = self.node.chain.enum_virtual_ops(
+                args["block_range_begin"], args["block_range_end"], args.get("operation_begin", 0), limit=7)
+            return {"ops": ops, "next_block_range_begin": next_block, "next_operation_begin": next_operation}
+        self.node.handler._enum_virtual_ops = enum_virtual_ops
+        try:
+            ops = list(self.blockchain.virtual_ops(start=1, stop=50, range_size=25))
+        finally:
+            del self.node.handler._enum_virtual_ops
+        self.assertEqual([op["block"] for op in ops], list(range(1, 51)))
+        # 25 blocks are read with pages of 7 operations
+        self.assertEqual(len(pages), 8)
+
+    def test_truncated_block_range(self):
+        calls = []
+
+        def enum_virtual_ops(args, appbase):
+            # answers at most 10 blocks and points to the next block without an operation id
+            begin, end = args["block_range_begin"], args["block_range_end"]
+            calls.append((begin, end))
+            ops = self.node.chain.enum_virtual_ops(begin, min(end, begin + 10))[0]
+            return {"ops": ops, "next_block_range_begin": min(end, begin + 10), "next_operation_begin": 0}
+        self.node.handler._enum_virtual_ops = enum_virtual_ops
+        try:
+            ops = list(self.blockchain.virtual_ops(start=1, stop=50, range_size=25))
+        finally:
+            del self.node.handler._enum_virtual_ops
+        self.assertEqual([op["block"] for op in ops], list(range(1, 51)))
+        self.assertEqual(calls, [(1, 26), (11, 26), (21, 26), (26, 51), (36, 51), (46, 51)])
+
+    def test_stream(self):
+        requests = self.node.get_stats()["requests"]
+        ops = list(self.blockchain.stream(opNames=["producer_reward"], start=1, stop=300, only_virtual_ops=True))
+        range_requests = self.node.get_stats()["requests"] - requests
+
+        blockchain = Blockchain(blockchain_instance=self.blockchain.blockchain, mode="head")
+        blockchain.enum_virtual_ops_unsupported.add(self.node.url)
+        requests = self.node.get_stats()["requests"]
+        expected = list(blockchain.stream(opNames=["producer_reward"], start=1, stop=300, only_virtual_ops=True))
+        self.assertEqual(ops, expected)
+        self.assertEqual(len(ops), 300)
+        self.assertGreater(self.node.get_stats()["requests"] - requests, 10 * range_requests)
+
+    def test_ops_statistics(self):
+        stats = self.blockchain.ops_statistics(1, stop=100)
+        self.assertEqual(stats["producer_reward"], 100)
+        self.assertEqual(stats["transfer"], 100)
+
+    def test_fallback(self):
+        def enum_virtual_ops(args, appbase):
+            raise RPCMethodError("Assert Exception:method_itr != api_itr->second.end(): Could not find method enum_virtual_ops")
+        with LocalNode(chain=LocalChain(head_block_num=100)) as node:
+            node.handler._enum_virtual_ops = enum_virtual_ops
+            blurt = Blurt(node=node.url, num_retries=2, chain_cache=False)
+            blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+            ops = list(blockchain.stream(start=1, stop=80, only_virtual_ops=True))
+            self.assertEqual([op["block_num"] for op in ops], list(range(1, 81)))
+            self.assertEqual(blockchain.enum_virtual_ops_unsupported, set([node.url]))
+            self.assertEqual(node.get_stats()["calls"]["account_history_api.enum_virtual_ops"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import queue
+import threading
+import unittest
+from unittest import mock
+
+from websocket._exceptions import WebSocketConnectionClosedException, WebSocketTimeoutException
+
+from blurtapi.graphenerpc import GrapheneRPC
+from blurtapi.wsmultiplexer import WebsocketMultiplexer
+
+
+class FakeWebSocket(object):
+    """Answers requests in reverse order, once ``hold`` requests are buffered"""
+    def __init__(self, hold=1):
+        self.hold = hold
+        self.buffer = []
+        self.replies = queue.Queue()
+        self.connects = 0
+        self.drop_next = False
+        self.lock = threading.Lock()
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, url):
+        self.connects += 1
+
+    def send(self, data):
+        payload = json.loads(data)
+        with self.lock:
+            if self.drop_next:
+                self.drop_next = False
+                self.replies.put(WebSocketConnectionClosedException("closed"))
+                return
+            self.buffer.append(payload)
+            if len(self.buffer) < self.hold:
+                return
+            buffered, self.buffer = self.buffer, []
+        for p in reversed(buffered):
+            self.replies.put(json.dumps(self._answer(p)))
+
+    def _answer(self, payload):
+        if isinstance(payload, list):
+            return [self._answer(p) for p in reversed(payload)]
+        if payload["method"].endswith("get_config"):
+            return {"jsonrpc": "2.0", "id": payload["id"], "result": {"BLURT_BLOCKCHAIN_VERSION": "0.8.2"}}
+        return {"jsonrpc": "2.0", "id": payload["id"], "result": payload["params"]}
+
+    def recv(self):
+        reply = self.replies.get()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def shutdown(self):
+        self.replies.put(WebSocketConnectionClosedException("shutdown"))
+
+    def close(self):
+        self.shutdown()
+
+
+def _request(n):
+    return {"jsonrpc": "2.0", "method": "block_api.get_block", "params": {"block_num": n}, "id": 0}
+
+
+class TestWebsocketMultiplexer(unittest.TestCase):
+    def test_out_of_order_replies(self):
+        ws = FakeWebSocket(hold=4)
+        mux = WebsocketMultiplexer(ws, "ws://fake", timeout=5)
+        results = {}
+
+        def worker(n):
+            results[n] = mux.call(_request(n))["result"]["block_num"]
+
+        threads = [threading.Thread(target=worker, args=(n, )) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        mux.close()
+        self.assertEqual(results, {n: n for n in range(8)})
+
+    def test_batch_reply(self):
+        ws = FakeWebSocket()
+        mux = WebsocketMultiplexer(ws, "ws://fake", timeout=5)
+        reply = mux.call([_request(1), _request(2)])
+        mux.close()
+        self.assertEqual(sorted(r["result"]["block_num"] for r in reply), [1, 2])
+        self.assertEqual(sorted(r["id"] for r in reply), [0, 0])
+
+    def test_reissue_after_reconnect(self):
+        ws = FakeWebSocket()
+        ws.drop_next = True
+        mux = WebsocketMultiplexer(ws, "ws://fake", timeout=5)
+        reply = mux.call(_request(3))
+        mux.close()
+        self.assertEqual(reply["result"]["block_num"], 3)
+        self.assertEqual(ws.connects, 1)
+
+    def test_timeout(self):
+        ws = FakeWebSocket(hold=2)
+        mux = WebsocketMultiplexer(ws, "ws://fake", timeout=0.1)
+        with self.assertRaises(WebSocketTimeoutException):
+            mux.call(_request(1))
+        self.assertEqual(mux.pending_count, 0)
+        mux.close()
+
+    def test_graphenerpc_ws_multiplex(self):
+        ws = FakeWebSocket()
+        with mock.patch("blurtapi.graphenerpc.create_ws_instance", return_value=ws):
+            rpc = GrapheneRPC("ws://fake", ws_multiplex=True, num_retries=1)
+        self.assertIsNotNone(rpc.ws_multiplexer)
+        self.assertEqual(rpc.get_block({"block_num": 5}, api="block"), {"block_num": 5})
+        rpc.rpcclose()
+        self.assertIsNone(rpc.ws_multiplexer)
+
+
+if __name__ == "__main__":
+    unittest.main()
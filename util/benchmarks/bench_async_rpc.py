@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Compares AsyncGrapheneRPC with the thread-per-instance pattern.
+
+Usage::
+
+    python util/benchmarks/bench_async_rpc.py --requests 400 --concurrency 16 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def bench_threads(url, n_requests, concurrency):
+    from blurtapi.graphenerpc import GrapheneRPC
+    per_thread = n_requests // concurrency
+
+    def worker():
+        rpc = GrapheneRPC(url, num_retries=1)
+        for i in range(per_thread):
+            rpc.get_block({"block_num": i + 1}, api="block")
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return per_thread * concurrency / (time.time() - start)
+
+
+def bench_async(url, n_requests, concurrency):
+    from blurtapi.asyncrpc import AsyncGrapheneRPC
+
+    async def run():
+        start = time.time()
+        async with AsyncGrapheneRPC(url, num_retries=1, max_in_flight=concurrency) as rpc:
+            await asyncio.gather(*[rpc.get_block({"block_num": i + 1}, api="block") for i in range(n_requests)])
+        return n_requests / (time.time() - start)
+    return asyncio.run(run())
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    node = LocalNodeProcess(latency=args.latency).start()
+    try:
+        threads_rps = bench_threads(node.url, args.requests, args.concurrency)
+        async_rps = bench_async(node.url, args.requests, args.concurrency)
+    finally:
+        node.stop()
+    print("thread-per-instance: %8.1f req/s" % threads_rps)
+    print("AsyncGrapheneRPC:    %8.1f req/s" % async_rps)
+    print("gain:                %8.2fx" % (async_rps / threads_rps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Measures block streaming, node failover and broadcast throughput against local nodes.
+
+``Blockchain.blocks`` reads ``--blocks`` blocks one by one, with threads,
+with batches of ``--batch-size`` blocks, with adaptive batch sizes up to
+``--max-batch-size`` and with ``get_block_range`` calls of ``--batch-size``
+blocks, the failover run does the same with a second node which
+fails ``--error-rate`` of its requests, and the broadcast run signs and
+broadcasts ``--transfers`` transfers. The batch sizes which the adaptive run
+chose are printed at the end.
+
+Usage::
+
+    python util/benchmarks/bench_blockchain.py --blocks 500 --latency 0.005
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def bench_blocks(urls, n_blocks, threading=False, max_batch_size=None, adaptive_batch=False, range_size=None):
+    from blurtpy import Blurt
+    from blurtpy.blockchain import Blockchain
+    blurt = Blurt(node=urls, num_retries=10, chain_cache=False)
+    blockchain = Blockchain(blockchain_instance=blurt)
+    start = time.time()
+    cnt = sum(1 for block in blockchain.blocks(start=1, stop=n_blocks, threading=threading,
+                                               max_batch_size=max_batch_size, adaptive_batch=adaptive_batch,
+                                               range_size=range_size))
+    return cnt / (time.time() - start)
+
+
+def bench_broadcast(url, wif, n_transfers):
+    from blurtpy import Blurt
+    from blurtpy.account import Account
+    blurt = Blurt(node=url, keys=[wif], num_retries=10, chain_cache=False)
+    account = Account("alice", blockchain_instance=blurt)
+    start = time.time()
+    for i in range(n_transfers):
+        account.transfer("bob", 0.001, "BLURT", memo="%d" % i)
+    return n_transfers / (time.time() - start)
+
+
+def main():
+    from blurtapi.batchsize import AdaptiveBatchSize
+    from blurtapi.localnode import LocalNodeProcess
+    from blurtgraphenebase.account import PrivateKey
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--transfers", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-batch-size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    key = PrivateKey()
+    # the head is above the last irreversible block, which is where Blockchain.blocks stops
+    chain_kwargs = {"head_block_num": args.blocks + 100, "public_key": format(key.pubkey, "BLT")}
+    node = LocalNodeProcess(chain_kwargs=chain_kwargs, latency=args.latency).start()
+    flaky = LocalNodeProcess(chain_kwargs=chain_kwargs, latency=args.latency, error_rate=args.error_rate).start()
+    controller = AdaptiveBatchSize(max_size=args.max_batch_size)
+    try:
+        results = [
+            ("blocks", "blocks/s", bench_blocks(node.url, args.blocks)),
+            ("blocks (threading)", "blocks/s", bench_blocks(node.url, args.blocks, threading=True)),
+            ("blocks (batch %d)" % args.batch_size, "blocks/s", bench_blocks(node.url, args.blocks, max_batch_size=args.batch_size)),
+            ("blocks (adaptive)", "blocks/s", bench_blocks(node.url, args.blocks, max_batch_size=args.max_batch_size,
+                                                           adaptive_batch=controller)),
+            ("blocks (range %d)" % args.batch_size, "blocks/s", bench_blocks(node.url, args.blocks, range_size=args.batch_size)),
+            ("blocks (failover)", "blocks/s", bench_blocks([flaky.url, node.url], args.blocks)),
+            ("broadcast", "trx/s", bench_broadcast(node.url, str(key), args.transfers)),
+        ]
+    finally:
+        node.stop()
+        flaky.stop()
+    for name, unit, value in results:
+        print("%-20s %8.1f %s" % (name, value, unit))
+    for url, stats in controller.stats().items():
+        print("adaptive batch size: last %d, best %s, %d batches, %d decreases" % (
+            stats["size"], stats["best_size"], stats["batches"], stats["decreases"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Measures startup and failover time with and without the chain detection cache,
+and the startup time with a slow first node with and without ``race_connect``.
+
+Startup is the creation of a new rpc instance plus its first call, failover
+is a switch to the next node. Both are done against local nodes which
+answer after ``--latency`` seconds, the slow node answers after
+``--slow-latency`` seconds.
+
+Usage::
+
+    python util/benchmarks/bench_connect.py --rounds 10 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def bench_startup(urls, rounds, chain_cache, race_connect=0):
+    from blurtapi.graphenerpc import GrapheneRPC
+    start = time.time()
+    for i in range(rounds):
+        rpc = GrapheneRPC(urls, num_retries=1, chain_cache=chain_cache, race_connect=race_connect)
+        rpc.get_block({"block_num": 1}, api="block")
+    return (time.time() - start) / rounds
+
+
+def bench_failover(urls, rounds, chain_cache):
+    from blurtapi.graphenerpc import GrapheneRPC
+    rpc = GrapheneRPC(urls, num_retries=-1, chain_cache=chain_cache, node_selection="round_robin")
+    start = time.time()
+    for i in range(rounds):
+        rpc.next()
+        rpc.get_block({"block_num": 1}, api="block")
+    return (time.time() - start) / rounds
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    from blurtapi.chaincache import ChainCache
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.)
+    args = parser.parse_args()
+    nodes = [LocalNodeProcess(latency=args.latency).start() for i in range(2)]
+    nodes.append(LocalNodeProcess(latency=args.slow_latency).start())
+    urls = [node.url for node in nodes[:2]]
+    slow_first_urls = [nodes[2].url] + urls
+    try:
+        cache = ChainCache()
+        # fill the cache once, as the first instance of a process does
+        bench_startup(urls, 1, cache)
+        bench_failover(urls, 2, cache)
+        results = [
+            ("startup", bench_startup(urls, args.rounds, False), bench_startup(urls, args.rounds, cache)),
+            ("failover", bench_failover(urls, args.rounds, False), bench_failover(urls, args.rounds, cache)),
+        ]
+        race_results = [
+            ("startup", bench_startup(slow_first_urls, args.rounds, False),
+             bench_startup(slow_first_urls, args.rounds, False, race_connect=3)),
+        ]
+    finally:
+        for node in nodes:
+            node.stop()
+    print("%-10s %12s %12s" % ("", "no cache", "chain cache"))
+    for name, without_cache, with_cache in results:
+        print("%-10s %9.1f ms %9.1f ms  %5.2fx" % (name, without_cache * 1e3, with_cache * 1e3, without_cache / with_cache))
+    print("\nslow first node")
+    print("%-10s %12s %12s" % ("", "sequential", "race"))
+    for name, sequential, race in race_results:
+        print("%-10s %9.1f ms %9.1f ms  %5.2fx" % (name, sequential * 1e3, race * 1e3, sequential / race))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Measures startup time and memory per worker instance against a local node.
+
+Compares ``--workers`` new ``Blurt`` instances, which is how threaded code
+created its workers before, without and with the process wide chain cache,
+with workers from a ``BlockchainInstancePool``.
+Memory is the traced Python allocation which is still held per worker.
+
+Usage::
+
+    python util/benchmarks/bench_instance_pool.py --workers 16 --latency 0.02
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def measure(create, n_workers):
+    tracemalloc.start()
+    start = time.time()
+    workers = [create() for i in range(n_workers)]
+    duration = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return workers, duration / n_workers, memory / n_workers
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    from blurtpy import Blurt
+    from blurtpy.instance import BlockchainInstancePool
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    node = LocalNodeProcess(latency=args.latency).start()
+    try:
+        base = Blurt(node=node.url, num_retries=10)
+        kwargs = {"node": node.url, "num_retries": 10, "num_retries_call": base.rpc.num_retries_call,
+                  "timeout": base.rpc.timeout}
+        cold_workers, cold_time, cold_memory = measure(lambda: Blurt(chain_cache=False, **kwargs), args.workers)
+        new_workers, new_time, new_memory = measure(lambda: Blurt(**kwargs), args.workers)
+        pool = BlockchainInstancePool(base, size=args.workers)
+        pool_workers, pool_time, pool_memory = measure(pool.acquire, args.workers)
+    finally:
+        node.stop()
+    print("%-14s %12s %14s" % ("worker", "startup ms", "memory KiB"))
+    print("%-14s %12.2f %14.1f" % ("new Blurt", cold_time * 1000, cold_memory / 1024.))
+    print("%-14s %12.2f %14.1f" % ("+ chain cache", new_time * 1000, new_memory / 1024.))
+    print("%-14s %12.2f %14.1f" % ("pool", pool_time * 1000, pool_memory / 1024.))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Measures the reply decode throughput of the JSON codecs in blurtapi.codec.
+
+The old decode path of ``GrapheneRPC.rpcexec`` (``response.text``, then
+``json.loads`` and a debug ``json.dumps`` of the reply) is compared with
+decoding the reply bytes by every installed codec. Recorded replies can be
+given as files, otherwise replies shaped like ``get_block_range`` and
+``get_account_history`` are generated. For ``get_block_range`` the
+incremental parsers of ``blurtapi.streamjson`` are compared with a full
+decode, with and without a projection on the operations, including the peak
+memory of the decode.
+
+Usage::
+
+    python util/benchmarks/bench_json_codec.py --repeat 20
+    python util/benchmarks/bench_json_codec.py --replies get_block_range.json get_account_history.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def make_block(num, n_trx):
+    transactions = []
+    for t in range(n_trx):
+        transactions.append({
+            "ref_block_num": num % 65536, "ref_block_prefix": 1234567890 + t,
+            "expiration": "2024-01-01T00:00:30",
+            "operations": [{"type": "comment_operation", "value": {
+                "parent_author": "", "parent_permlink": "blurt", "author": "author%d" % t,
+                "permlink": "post-%d-%d" % (num, t), "title": "Títle %d" % t,
+                "body": "Lorem ipsum dolor sit amet, ünïcode body text. " * 20,
+                "json_metadata": json.dumps({"tags": ["blurt", "test"], "app": "blurtpy"})}}],
+            "extensions": [], "signatures": ["1f" + "ab" * 64]})
+    return {"previous": "%08x" % (num - 1) + "0" * 32, "timestamp": "2024-01-01T00:00:00",
+            "witness": "witness", "transaction_merkle_root": "0" * 40, "extensions": [],
+            "witness_signature": "20" + "cd" * 64, "transactions": transactions,
+            "block_id": "%08x" % num + "0" * 32, "signing_key": "BLT" + "x" * 50,
+            "transaction_ids": ["%040x" % (num * 1000 + t) for t in range(n_trx)]}
+
+
+def generated_replies():
+    block_range = {"jsonrpc": "2.0", "id": 1,
+                   "result": {"blocks": [make_block(n, 10) for n in range(1, 101)]}}
+    history = {"jsonrpc": "2.0", "id": 2, "result": [
+        [i, {"trx_id": "%040x" % i, "block": 1000 + i, "trx_in_block": 0, "op_in_trx": 0,
+             "virtual_op": 0, "timestamp": "2024-01-01T00:00:00",
+             "op": ["transfer", {"from": "alice", "to": "bob", "amount": "1.000 BLURT", "memo": "memo %d" % i}]}]
+        for i in range(1000)]}
+    return {"get_block_range": json.dumps(block_range).encode("utf8"),
+            "get_account_history": json.dumps(history).encode("utf8")}
+
+
+def old_decode(content):
+    text = content.decode("utf8")
+    ret = json.loads(text, strict=False)
+    json.dumps(text)
+    return ret
+
+
+def bench(decode, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(content)
+    return len(content) * repeat / (time.perf_counter() - start) / 1e6
+
+
+def peak_memory(decode, content):
+    tracemalloc.start()
+    decode(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench_stream(content, repeat):
+    from blurtapi.codec import get_codec
+    from blurtapi.streamjson import CHUNK_SIZE, Projection, iter_json_array, ijson
+
+    def chunks(data):
+        return (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+    def consume(parser, projection):
+        def decode(data):
+            for block in iter_json_array(chunks(data), ("result", "blocks"), projection=projection, parser=parser):
+                pass
+        return decode
+    codec = get_codec()
+    projection = Projection(["block_id", "timestamp", "transactions.operations"])
+    runs = [("%s full decode" % codec.name, codec.loads)]
+    for parser in ["json", "ijson"]:
+        if parser == "ijson" and ijson is None:
+            continue
+        runs.append(("stream %s" % parser, consume(parser, None)))
+        runs.append(("stream %s + projection" % parser, consume(parser, projection)))
+    print("get_block_range streaming (%.1f kB)" % (len(content) / 1e3))
+    for name, decode in runs:
+        mbs = bench(decode, content, repeat)
+        print("  %-28s %8.1f MB/s  peak %8.1f kB" % (name, mbs, peak_memory(decode, content) / 1e3))
+
+
+def main():
+    from blurtapi.codec import available_codecs, get_codec
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--replies", nargs="*", help="files with recorded JSON-RPC replies")
+    args = parser.parse_args()
+    if args.replies:
+        replies = {}
+        for path in args.replies:
+            with open(path, "rb") as f:
+                replies[os.path.basename(path)] = f.read()
+    else:
+        replies = generated_replies()
+    for name, content in replies.items():
+        print("%s (%.1f kB)" % (name, len(content) / 1e3))
+        baseline = bench(old_decode, content, args.repeat)
+        print("  %-22s %8.1f MB/s" % ("old rpcexec path", baseline))
+        for codec_name in available_codecs():
+            codec = get_codec(codec_name)
+            mbs = bench(codec.loads, content, args.repeat)
+            print("  %-22s %8.1f MB/s  %5.2fx" % (codec_name, mbs, mbs / baseline))
+    if "get_block_range" in replies:
+        bench_stream(replies["get_block_range"], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Measures the throughput of one shared ``NodeRPC`` instance used by several threads.
+
+Each thread sends ``get_block`` calls with their own ``num_retries_call`` to a
+local node which answers after ``--latency`` seconds. With an http connection
+pool of ``--pool-size`` connections, the throughput should grow linearly with
+the number of threads up to the pool size.
+
+Usage::
+
+    python util/benchmarks/bench_rpc_threads.py --calls 200 --latency 0.02 --pool-size 8
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    from blurtapi.noderpc import NodeRPC
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--pool-size", type=int, default=8)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    node = LocalNodeProcess(latency=args.latency).start()
+    try:
+        rpc = NodeRPC(node.url, num_retries=2, chain_cache=False, pool_maxsize=args.pool_size)
+
+        def get_block(block_num):
+            return rpc.get_block({"block_num": block_num % 1000 + 1}, api="block", num_retries_call=block_num % 3 + 1)
+        print("%8s %10s %9s" % ("threads", "calls/s", "speedup"))
+        baseline = None
+        threads = 1
+        while threads <= 2 * args.pool_size:
+            start = time.time()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(get_block, range(args.calls)))
+            rate = args.calls / (time.time() - start)
+            if baseline is None:
+                baseline = rate
+            print("%8d %10.1f %8.2fx" % (threads, rate, rate / baseline))
+            threads *= 2
+        rpc.rpcclose()
+    finally:
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Compares ``Blockchain.stream`` with dict output and with ``op_records=True``.
+
+The transfers of ``--blocks`` blocks with ``--transfers`` transfers each are
+streamed from a local node with ``get_block_range`` calls. The consumer reads
+the type and amount of each operation, and in the ``+_id`` run also ``_id``
+and ``timestamp``. Memory is the size and number of the objects which
+``blurtpy/blockchain.py`` allocated for the operations, measured with
+``tracemalloc`` while all operations are kept in a list.
+
+Usage::
+
+    python util/benchmarks/bench_stream_records.py --blocks 2000 --transfers 50
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def stream(url, n_blocks, op_records):
+    from blurtpy import Blurt
+    from blurtpy.blockchain import Blockchain
+    blurt = Blurt(node=url, num_retries=10, chain_cache=False)
+    blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+    return blockchain.stream(opNames=["transfer"], start=1, stop=n_blocks, range_size=100, op_records=op_records)
+
+
+def bench_rate(url, n_blocks, op_records, read_id):
+    start = time.time()
+    cnt = 0
+    for op in stream(url, n_blocks, op_records):
+        op["type"]
+        op["amount"]
+        if read_id:
+            op["_id"]
+            op["timestamp"]
+        cnt += 1
+    return cnt / (time.time() - start)
+
+
+def bench_memory(url, n_blocks, op_records):
+    tracemalloc.start()
+    ops = list(stream(url, n_blocks, op_records))
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, "*blurtpy/blockchain.py")])
+    tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    size = sum(stat.size for stat in stats)
+    count = sum(stat.count for stat in stats)
+    return size / len(ops), count / len(ops)
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--transfers", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    node = LocalNodeProcess(chain_kwargs={"head_block_num": args.blocks, "transfers_per_block": args.transfers}).start()
+    try:
+        print("%-12s %10s %10s %12s %12s" % ("output", "ops/s", "+_id ops/s", "bytes/op", "objects/op"))
+        for name, op_records in [("dict", False), ("op_records", True)]:
+            rate = bench_rate(node.url, args.blocks, op_records, False)
+            rate_id = bench_rate(node.url, args.blocks, op_records, True)
+            size, count = bench_memory(node.url, args.blocks, op_records)
+            print("%-12s %10.1f %10.1f %12.1f %12.2f" % (name, rate, rate_id, size, count))
+    finally:
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()
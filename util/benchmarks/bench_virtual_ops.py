@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Compares virtual operation streaming with ``enum_virtual_ops`` ranges and with ``get_ops_in_block`` calls.
+
+``Blockchain.stream(only_virtual_ops=True)`` reads the virtual operations of
+``--blocks`` blocks from a local node which answers after ``--latency``
+seconds, with ``enum_virtual_ops`` calls of ``--range-size`` blocks. As one
+call per block takes several minutes for 100k blocks, the
+``get_ops_in_block`` run only reads the first ``--per-block-blocks`` blocks and
+the time for the whole range is extrapolated.
+
+Usage::
+
+    python util/benchmarks/bench_virtual_ops.py --blocks 100000 --latency 0.002
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+
+def bench_stream(url, n_blocks, per_block=False):
+    from blurtpy import Blurt
+    from blurtpy.blockchain import Blockchain
+    blurt = Blurt(node=url, num_retries=10, chain_cache=False)
+    blockchain = Blockchain(blockchain_instance=blurt, mode="head")
+    if per_block:
+        blockchain.enum_virtual_ops_unsupported.add(url)
+    start = time.time()
+    cnt = sum(1 for op in blockchain.stream(start=1, stop=n_blocks, only_virtual_ops=True))
+    return cnt, time.time() - start
+
+
+def main():
+    from blurtapi.localnode import LocalNodeProcess
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=100000)
+    parser.add_argument("--per-block-blocks", type=int, default=2000)
+    parser.add_argument("--range-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    node = LocalNodeProcess(chain_kwargs={"head_block_num": args.blocks}, latency=args.latency).start()
+    try:
+        print("%-18s %8s %10s %10s %12s" % ("source", "blocks", "ops", "ops/s", "est. total s"))
+        cnt, duration = bench_stream(node.url, args.per_block_blocks, per_block=True)
+        print("%-18s %8d %10d %10.1f %12.1f" % ("get_ops_in_block", args.per_block_blocks, cnt, cnt / duration,
+                                                duration * args.blocks / args.per_block_blocks))
+        cnt, duration = bench_stream(node.url, args.blocks)
+        print("%-18s %8d %10d %10.1f %12.1f" % ("enum_virtual_ops", args.blocks, cnt, cnt / duration, duration))
+    finally:
+        node.stop()
+
+
+if __name__ == "__main__":
+    main()